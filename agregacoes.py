@@ -0,0 +1,122 @@
+"""Cubo de agregação das ocorrências usado pelos relatórios (geral, por sala e por tutor).
+
+Células: Sala × Tutor × PROFESSOR × Mês × Status de exibição.
+Medidas: total de ocorrências e, para cada setor de atendimento, quantos
+atendimentos ficaram 'No Prazo', 'Fora do Prazo' ou 'Não Atendido'.
+
+O cubo é montado numa única passada (groupby) e atualizado por diferença quando
+linhas são inseridas ou editadas; as contribuições linha a linha também. Um intervalo de datas é respondido somando as
+células dos meses inteiros; só os meses parcialmente cobertos nas pontas do
+intervalo são lidos linha a linha (por busca binária na data).
+"""
+from __future__ import annotations
+
+from importacao_tardia import modulo_tardio
+
+pd = modulo_tardio('pandas')
+
+CHAVES = ['Sala', 'Tutor', 'PROFESSOR', 'Mes', 'Status']
+RESULTADOS_PRAZO = ['No Prazo', 'Fora do Prazo', 'Não Atendido']
+SEM_DATA = 'SEM DATA'
+
+
+def colunas_medidas(setores) -> list[str]:
+    return ['Total'] + [f'{setor}|{resultado}' for setor in setores for resultado in RESULTADOS_PRAZO]
+
+
+def montar_contribuicoes(df: pd.DataFrame, status_df: pd.DataFrame, dias: pd.Series, setores) -> pd.DataFrame:
+    """Uma linha por ocorrência com o ID, as chaves do cubo, o dia e as medidas (0/1), ordenada por dia."""
+    contrib = pd.DataFrame({
+        'ID': df['Nº Ocorrência'].to_numpy(),
+        'Sala': df['Sala'].to_numpy(),
+        'Tutor': df['Tutor'].to_numpy(),
+        'PROFESSOR': df['PROFESSOR'].to_numpy(),
+        'Dia': dias.to_numpy(),
+        'Status': status_df['DisplayStatus'].to_numpy(),
+        'Total': 1,
+    })
+    contrib['Mes'] = contrib['Dia'].dt.strftime('%Y-%m').fillna(SEM_DATA)
+    for setor in setores:
+        prazo = status_df[f'Prazo {setor}'].to_numpy()
+        for resultado in RESULTADOS_PRAZO:
+            contrib[f'{setor}|{resultado}'] = (prazo == resultado).astype('int64')
+    return _ordenar_contribuicoes(contrib)
+
+
+def _ordenar_contribuicoes(contrib: pd.DataFrame) -> pd.DataFrame:
+    # Por dia e, no mesmo dia, por ID decrescente: a mesma ordem venha o frame de onde vier
+    return contrib.sort_values(['Dia', 'ID'], ascending=[True, False], kind='stable', ignore_index=True)
+
+
+def atualizar_contribuicoes(contrib: pd.DataFrame, contrib_antigas: pd.DataFrame,
+                            contrib_novas: pd.DataFrame) -> pd.DataFrame:
+    """Aplica uma alteração de linhas às contribuições: tira as versões antigas e põe as novas."""
+    mantidas = contrib[~contrib['ID'].isin(contrib_antigas['ID'])]
+    return _ordenar_contribuicoes(pd.concat([mantidas, contrib_novas], ignore_index=True))
+
+
+def construir_cubo(contrib: pd.DataFrame, setores) -> pd.DataFrame:
+    """Soma as contribuições por célula (Sala, Tutor, PROFESSOR, Mes, Status)."""
+    return contrib.groupby(CHAVES, sort=True)[colunas_medidas(setores)].sum()
+
+
+def atualizar_cubo(cubo: pd.DataFrame, contrib_antigas: pd.DataFrame, contrib_novas: pd.DataFrame,
+                   setores) -> pd.DataFrame:
+    """Aplica uma alteração de linhas ao cubo: soma as versões novas e subtrai as antigas."""
+    if cubo.empty:
+        return construir_cubo(contrib_novas, setores)
+    delta = construir_cubo(contrib_novas, setores).sub(construir_cubo(contrib_antigas, setores), fill_value=0)
+    atualizado = cubo.add(delta, fill_value=0)
+    return atualizado[atualizado['Total'] != 0].astype('int64').sort_index()
+
+
+def _meses_do_intervalo(meses, inicio, fim):
+    """Separa os meses do cubo em cobertos por inteiro e cobertos em parte pelo intervalo [inicio, fim]."""
+    inteiros, parciais = [], []
+    for mes in meses:
+        if mes == SEM_DATA:
+            continue
+        primeiro = pd.Timestamp(f'{mes}-01')
+        ultimo = primeiro + pd.offsets.MonthEnd(0)
+        if (inicio is not None and ultimo < inicio) or (fim is not None and primeiro > fim):
+            continue
+        if (inicio is None or primeiro >= inicio) and (fim is None or ultimo <= fim):
+            inteiros.append(mes)
+        else:
+            parciais.append(mes)
+    return inteiros, parciais
+
+
+def consultar(cubo: pd.DataFrame, obter_contribuicoes, inicio, fim, agrupar_por, setores) -> pd.DataFrame:
+    """Medidas agregadas por 'agrupar_por' (lista de chaves) no intervalo [inicio, fim].
+
+    inicio/fim são pd.Timestamp (datas locais) ou None. obter_contribuicoes é chamado
+    só quando há meses parcialmente cobertos.
+    """
+    medidas = colunas_medidas(setores)
+    if cubo.empty:
+        return pd.DataFrame(columns=medidas)
+    if inicio is None and fim is None:
+        return cubo.groupby(level=agrupar_por).sum()
+
+    meses = cubo.index.get_level_values('Mes')
+    inteiros, parciais = _meses_do_intervalo(meses.unique(), inicio, fim)
+    resultado = cubo[meses.isin(inteiros)].groupby(level=agrupar_por).sum()
+
+    if parciais:
+        contrib = obter_contribuicoes()
+        dias = contrib['Dia']
+        partes = []
+        for mes in parciais:
+            primeiro = pd.Timestamp(f'{mes}-01')
+            de = max(primeiro, inicio) if inicio is not None else primeiro
+            ate = min(primeiro + pd.offsets.MonthEnd(0), fim) if fim is not None else primeiro + pd.offsets.MonthEnd(0)
+            # contribuições ordenadas por dia: a janela sai por busca binária
+            ini = dias.searchsorted(de, side='left')
+            fim_pos = dias.searchsorted(ate, side='right')
+            partes.append(contrib.iloc[ini:fim_pos])
+        linhas = pd.concat(partes)
+        if not linhas.empty:
+            resultado = resultado.add(linhas.groupby(agrupar_por)[medidas].sum(), fill_value=0)
+
+    return resultado.astype('int64')
@@ -1,32 +1,49 @@
+from __future__ import annotations
+
 import os
 import json
+import bisect
+import gzip
+import hashlib
+import unicodedata
 import re
 import base64
+import threading
+import time
+from contextlib import contextmanager
 from io import BytesIO
 from flask import send_file
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
 from dateutil import parser as date_parser
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, abort
-import pandas as pd
-from supabase import create_client, Client 
-from fpdf import FPDF # Importado novamente para garantir escopo
-
-# --- PLACEHOLDERS (NECESSÁRIOS PARA O CÓDIGO RODAR SEM ERROS) ---
-# Se você tiver o código dessas funções/variáveis, substitua os placeholders.
-PRAZO_DIAS = 7
-SETORES_ATENDIMENTO = ['PROFESSOR', 'TUTOR', 'COORDENAÇÃO', 'GESTÃO']
-FORMATO_ENTRADA = None # Permite que o Pandas infira o formato da data do Supabase
-def calcular_relatorio_estatistico_tutor(df, start, end): return {}
-def calcular_status_prazo(row):
-    # Simula o status baseado nas colunas DT, DC, DG
-    status = {}
-    if row.get('DT') not in ('', 'None'):
-        status['TUTOR'] = 'No Prazo'
-    return status
-def calcular_relatorio_estatistico(): return {}
-def calcular_relatorio_por_sala(): return []
-# ------------------------------------------------------------------
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, send_file, abort, make_response, session, has_request_context, g
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import wraps
+from typing import TYPE_CHECKING
+import agregacoes
+import busca_textual
+import cache_compartilhado
+import cache_paginas
+import exportacao_dados
+import exportacao_pdf
+import graficos
+import importacao_tardia
+import metricas
+import snapshot_local
+from importacao_tardia import disponivel, modulo_tardio
+from repositorio import (
+    BACKEND, SQLITE_PATH, RepositorioOcorrencias, RepositorioSupabase, RepositorioSQLite,
+    normalizar_texto, obter_cliente_supabase
+)
+
+# Módulos pesados: importados no primeiro uso (ou no mestre do gunicorn com --preload)
+np = modulo_tardio('numpy')
+pd = modulo_tardio('pandas')
+pdf_ocorrencias = modulo_tardio('pdf_ocorrencias') # fpdf: só na geração de PDF
+if TYPE_CHECKING:
+    from supabase import Client
+
+FORMATO_ENTRADA = 'ISO8601' # Formato do PostgREST/SQLite; outros formatos caem no caminho lento
 
 # --- Configuração de Fuso Horário ---
 try:
@@ -36,51 +53,159 @@ except ImportError:
     # Fallback para ambientes sem zoneinfo (como Render mais antigos ou Py < 3.9) [cite: 1]
     TZ_SAO = timezone(timedelta(hours=-3))
 
-# --- Imports para FPDF e Matplotlib ---
-try:
-    import matplotlib.pyplot as plt
-    plt.switch_backend('Agg')
-    HAS_MATPLOTLIB = True
-except ImportError:
-    HAS_MATPLOTLIB = False
+# --- Rotas: registradas pelo decorador @rota e ligadas ao Flask em criar_app() ---
+_rotas = []
 
-# --- Configuração da Aplicação Flask ---
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'default_key_insegura_para_teste_local') 
+def rota(regra: str, **opcoes):
+    """Como @app.route, mas só registra a rota; criar_app() a associa à aplicação."""
+    def registrar(funcao):
+        _rotas.append((regra, funcao, opcoes))
+        return funcao
+    return registrar
 
 # --- Variáveis globais para cache ---
 _df_cache = None
 _alunos_cache = None
+_alunos_por_sala = None # Índice do cadastro de alunos: SALA -> [{'Aluno', 'Tutor'}]
+_roster_alunos = None   # Mapa SALA -> alunos já serializado (JSON, gzip e ETag), montado uma vez por carga do cadastro
+_busca_alunos = None    # [(nome normalizado, aluno, sala, tutor)] em ordem, para a busca por prefixo
 _professores_cache = None 
 _salas_cache = None      
+_repositorio = None # Repositório local (SQLite) é reaproveitado entre requisições
+
+# --- Carga única por tabela (single-flight) ---
+# Só uma thread por vez busca cada tabela; as outras esperam o resultado ou, se já
+# existe um valor anterior, seguem com ele até a troca (stale-while-revalidate).
+# limpar_caches() não descarta as tabelas de referência: marca-as como vencidas.
+_travas_carga = {nome: threading.RLock() for nome in ('ocorrencias', 'alunos', 'professores', 'salas')}
+_tabelas_vencidas = set()
+
+# --- Sincronização incremental (delta) do cache de ocorrências ---
+# Após uma escrita, o cache não é descartado: a próxima leitura busca apenas as
+# linhas novas (ID acima da marca d'água) ou alteradas (coluna de última
+# modificação / IDs alterados neste worker) e as mescla no DataFrame em cache.
+# A recarga completa só acontece no intervalo agendado ou sob demanda.
+SINCRONIZACAO_DELTA = os.environ.get('IDR_SINCRONIZACAO_DELTA', '1') != '0'
+DELTA_INTERVALO_SEG = float(os.environ.get('IDR_DELTA_INTERVALO_SEG', '30'))
+RECARGA_COMPLETA_SEG = float(os.environ.get('IDR_RECARGA_COMPLETA_SEG', '1800'))
+_df_marca = {'id': 0, 'atualizado_em': None} # Marca d'água: maior ID e maior data de modificação vistos
+_df_recarregado_em = 0.0   # time.time() da última carga completa
+_df_sincronizado_em = 0.0  # time.time() da última sincronização (completa ou delta)
+_df_pendente = False       # Houve escrita neste worker desde a última sincronização
+_ids_pendentes = set()     # IDs alterados neste worker que devem ser relidos
+_recarga_forcada = False   # Próxima leitura faz carga completa (limpar_caches)
+
+# --- Snapshot em disco (snapshot_local.py) e modo somente leitura ---
+# O worker novo adota o último snapshot gravado em disco e o revalida em segundo
+# plano. Se o banco não responde, as páginas seguem com os dados em cache (somente
+# leitura) e a próxima tentativa só acontece depois de ESPERA_APOS_FALHA_SEG.
+ESPERA_APOS_FALHA_SEG = float(os.environ.get('IDR_ESPERA_APOS_FALHA_SEG', '30'))
+ORIGEM_DADOS = f"sqlite:{os.path.abspath(SQLITE_PATH)}" if BACKEND == 'sqlite' else f"supabase:{os.environ.get('SUPABASE_URL', '')}"
+_df_restaurado = False  # Cache veio do snapshot em disco e ainda não foi revalidado no banco
+_falha_remota_em = None # time.time() da última atualização que falhou (None = banco respondendo)
+
+# --- Versão dos dados de ocorrências ---
+# Com o cache compartilhado (cache_compartilhado.py) a versão é o contador comum a
+# todos os workers; sem ele, é um contador local. Estruturas derivadas do DataFrame
+# podem usar a versão para saber quando precisam ser recalculadas.
+_df_versao = -1
+_derivados = {} # nome -> (versão dos dados, valor) das estruturas derivadas do DataFrame
+# nome -> função(valor, linhas_antigas, linhas_novas) que atualiza a estrutura derivada
+# a partir de um delta, sem reconstruí-la do frame inteiro
+_atualizadores_incrementais = {}
+_ultimo_delta = None # (linhas antigas, linhas novas) da última sincronização incremental
+# DataFrame, versão e estruturas derivadas mudam juntos sob esta trava (troca curta, sem E/S):
+# quem lê a versão e o frame por ela nunca vê um sem o outro
+_trava_troca = threading.RLock()
+_travas_derivados = {} # nome -> trava da construção (uma por vez por estrutura)
+
+# --- Cache de páginas renderizadas (cache_paginas.py) ---
+# No motor local (filtros no banco) as páginas não passam pelo DataFrame: sem o
+# cache compartilhado, a versão usada na chave é este contador de escritas do worker.
+_versao_escritas = 0
+_cache_paginas = cache_paginas.CachePaginas(cache_paginas.LIMITE_BYTES)
+
+# --- Cadastro de alunos no navegador (/api/alunos) ---
+ROSTER_MAX_AGE_SEG = int(os.environ.get('IDR_ROSTER_MAX_AGE_SEG', '300'))
+
+# --- Paginação do /index ---
+POR_PAGINA_PADRAO = int(os.environ.get('IDR_POR_PAGINA', '50'))
+POR_PAGINA_MAX = 500
 
 # -------------------- Conexão Supabase --------------------
 
+def avisar(mensagem: str, categoria: str = "danger"):
+    """flash() na requisição; fora dela (aquecimento, threads de carga) só vai para o log."""
+    if has_request_context():
+        flash(mensagem, categoria)
+    else:
+        print(mensagem)
+
 def conectar_supabase() -> Client | None:
-    """Configura e retorna o cliente Supabase. Prioriza Variáveis de Ambiente."""
+    """Retorna o cliente Supabase do processo (criado uma vez e reaproveitado). Prioriza Variáveis de Ambiente."""
     try:
         url: str | None = os.environ.get("SUPABASE_URL")
         key: str | None = os.environ.get("SUPABASE_KEY")
         
         if not url or not key:
             print("ERRO: Variáveis de ambiente SUPABASE_URL ou SUPABASE_KEY não configuradas.")
-            flash("Erro de configuração. Chaves do Supabase ausentes.", "danger")
+            avisar("Erro de configuração. Chaves do Supabase ausentes.", "danger")
             return None
 
-        supabase_client: Client = create_client(url, key)
+        supabase_client: Client = obter_cliente_supabase(url, key)
         return supabase_client
     except Exception as e:
         print(f"Erro ao conectar com Supabase: {e}")
-        flash(f"Erro ao conectar com Supabase: {e}", "danger")
+        avisar(f"Erro ao conectar com Supabase: {e}", "danger")
         return None
 
+def obter_repositorio() -> RepositorioOcorrencias | None:
+    """Retorna o repositório de dados do motor configurado em IDR_BACKEND."""
+    global _repositorio
+    if BACKEND == 'sqlite':
+        if _repositorio is None:
+            _repositorio = RepositorioSQLite(SQLITE_PATH)
+        return _repositorio
+
+    supabase = conectar_supabase()
+    if not supabase:
+        return None
+    return RepositorioSupabase(supabase)
+
 def limpar_caches():
-    """Limpa o cache após operações de escrita (POST)."""
-    global _df_cache, _alunos_cache, _professores_cache, _salas_cache
-    _df_cache = None
-    _alunos_cache = None
-    _professores_cache = None
-    _salas_cache = None
+    """Vence todos os caches (recarga completa sob demanda).
+
+    Os valores atuais continuam sendo servidos às outras requisições enquanto
+    a primeira leitura de cada tabela faz a recarga.
+    """
+    _tabelas_vencidas.update(('alunos', 'professores', 'salas'))
+    forcar_recarga_ocorrencias()
+    _cache_paginas.limpar()
+    graficos.limpar()
+
+def forcar_recarga_ocorrencias():
+    """A próxima leitura relê a tabela 'ocorrencias' inteira (as de referência continuam valendo)."""
+    global _df_pendente, _recarga_forcada, _versao_escritas
+    with _travas_carga['ocorrencias']:
+        _df_marca.update(id=0, atualizado_em=None)
+        _ids_pendentes.clear()
+        _df_pendente = False
+        _recarga_forcada = True
+    _versao_escritas += 1
+
+def registrar_escrita_ocorrencias(ids=()):
+    """Marca o cache de ocorrências para sincronização incremental após uma escrita."""
+    global _df_pendente, _versao_escritas
+    _versao_escritas += 1
+    if SINCRONIZACAO_DELTA:
+        _ids_pendentes.update(int(i) for i in ids)
+        _df_pendente = True
+    else:
+        forcar_recarga_ocorrencias()
+    if cache_compartilhado.HABILITADO:
+        # Atualiza agora e publica a nova versão: os outros workers apenas
+        # adotam o snapshot, sem ir ao banco cada um
+        carregar_dados()
 
 def get_proximo_id_supabase(supabase: Client):
     """Busca o maior ID e retorna o próximo (id + 1)."""
@@ -114,148 +239,846 @@ FINAL_COLUMNS_MAP = {
     'STATUS': 'Status',
     'TUTOR': 'Tutor' 
 }
+# Inverso: nome interno do App -> coluna do DB
+COLUNAS_BANCO = {app_col: db_col for db_col, app_col in FINAL_COLUMNS_MAP.items()}
+
+# Tipos do DataFrame em cache: categorias para as colunas com poucos valores distintos,
+# strings Arrow para o texto livre; as datas ficam como Timestamp e só viram texto na exibição
+COLUNAS_CATEGORICAS = ['Sala', 'Aluno', 'Tutor', 'PROFESSOR', 'Status', 'FT', 'FC', 'FG']
+COLUNAS_TEXTO_LIVRE = ['Descrição da Ocorrência', 'Atendimento Professor', 'ATT', 'ATC', 'ATG']
+TIPO_TEXTO_LIVRE = 'string[pyarrow]' if disponivel('pyarrow') else 'string'
+FORMATOS_EXIBICAO = {
+    'DCO': '%d/%m/%Y', 'HCO': '%H:%M',
+    'DT': '%d/%m/%Y %H:%M', 'DC': '%d/%m/%Y %H:%M', 'DG': '%d/%m/%Y %H:%M',
+}
+
+@contextmanager
+def _carga_unica(nome: str, valor_atual):
+    """Entra na carga da tabela 'nome': produz True se esta thread deve buscá-la.
+
+    Sem valor anterior, espera a carga em andamento. Com valor anterior (vencido),
+    não espera: produz False e o chamador segue com o valor atual.
+    """
+    trava = _travas_carga[nome]
+    if not trava.acquire(blocking=valor_atual is None):
+        yield False
+        return
+    try:
+        # Enquanto esperava, outra thread pode ter concluído a carga
+        yield nome in _tabelas_vencidas or valor_atual is None and _em_cache_referencia(nome) is None
+    finally:
+        trava.release()
+
+def _em_cache_referencia(nome: str):
+    return {'alunos': _alunos_cache, 'professores': _professores_cache, 'salas': _salas_cache}[nome]
+
+def _referencia_em_dia(nome: str) -> bool:
+    if _em_cache_referencia(nome) is None:
+        return False
+    # Banco fora do ar: o cadastro vencido serve até a próxima tentativa
+    return nome not in _tabelas_vencidas or (
+        _falha_remota_em is not None and time.time() - _falha_remota_em < ESPERA_APOS_FALHA_SEG
+    )
 
 def carregar_professores():
     global _professores_cache
-    if _professores_cache is not None:
+    metricas.cache('professores', _referencia_em_dia('professores'))
+    if _referencia_em_dia('professores'):
         return _professores_cache
 
-    supabase = conectar_supabase()
-    if not supabase: return []
+    with _carga_unica('professores', _professores_cache) as buscar:
+        if not buscar:
+            return _professores_cache
+        repo = obter_repositorio()
+        if not repo: return _professores_cache or []
 
-    try:
-        response = supabase.table('Professores').select('Professor').order('Professor').execute()
-        professores = sorted([d['Professor'].strip() for d in response.data if d.get('Professor')])
+        try:
+            professores = sorted([d['Professor'].strip() for d in repo.listar_professores() if d.get('Professor')])
+        except Exception as e:
+            print(f"Erro ao ler a tabela 'Professores' no Supabase: {e}")
+            return _professores_cache or []
         _professores_cache = professores
+        _tabelas_vencidas.discard('professores')
         return professores
-    except Exception as e:
-        print(f"Erro ao ler a tabela 'Professores' no Supabase: {e}")
-        return []
 
 def carregar_salas():
     global _salas_cache
-    if _salas_cache is not None:
+    metricas.cache('salas', _referencia_em_dia('salas'))
+    if _referencia_em_dia('salas'):
         return _salas_cache
 
-    supabase = conectar_supabase()
-    if not supabase: return []
+    with _carga_unica('salas', _salas_cache) as buscar:
+        if not buscar:
+            return _salas_cache
+        repo = obter_repositorio()
+        if not repo: return _salas_cache or []
 
-    try:
-        response = supabase.table('Salas').select('Sala').order('Sala').execute()
-        salas = sorted([d['Sala'].strip() for d in response.data if d.get('Sala')])
+        try:
+            salas = sorted([d['Sala'].strip() for d in repo.listar_salas() if d.get('Sala')])
+        except Exception as e:
+            print(f"Erro ao ler a tabela 'Salas' no Supabase: {e}")
+            return _salas_cache or []
         _salas_cache = salas
+        _tabelas_vencidas.discard('salas')
         return salas
-    except Exception as e:
-        print(f"Erro ao ler a tabela 'Salas' no Supabase: {e}")
-        return []
+
+def normalizar_nome(texto: str) -> str:
+    """Maiúsculas e sem acentos, para comparar nomes digitados com o cadastro."""
+    decomposto = unicodedata.normalize('NFKD', str(texto).strip().upper())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
 
 def carregar_dados_alunos():
-    global _alunos_cache
-    if _alunos_cache is not None:
+    metricas.cache('alunos', _referencia_em_dia('alunos'))
+    if _referencia_em_dia('alunos'):
         return _alunos_cache
 
-    supabase = conectar_supabase()
-    if not supabase:
-        return pd.DataFrame({'Sala': [], 'Aluno': [], 'Tutor': []})
+    with _carga_unica('alunos', _alunos_cache) as buscar:
+        if not buscar:
+            return _alunos_cache
+        return _recarregar_alunos()
+
+def _recarregar_alunos():
+    vazio = pd.DataFrame({'Sala': [], 'Aluno': [], 'Tutor': []})
+    repo = obter_repositorio()
+    if not repo:
+        return _alunos_cache if _alunos_cache is not None else vazio
 
     try:
-        response = supabase.table('Alunos').select('Sala, Aluno, Tutor').execute() 
-        df_alunos = pd.DataFrame(response.data)
+        with metricas.medir('sgce_carga_segundos', carga='alunos', fase='busca'):
+            df_alunos = pd.DataFrame(repo.listar_alunos(), columns=['Sala', 'Aluno', 'Tutor'])
     except Exception as e:
         print(f"Erro ao ler a tabela 'Alunos' no Supabase: {e}") 
-        return pd.DataFrame({'Sala': [], 'Aluno': [], 'Tutor': []})
+        return _alunos_cache if _alunos_cache is not None else vazio
 
     df_alunos['Tutor'] = df_alunos['Tutor'].fillna('SEM TUTOR').str.strip().str.upper()
     df_alunos['Aluno'] = df_alunos['Aluno'].str.strip()
     df_alunos['Sala'] = df_alunos['Sala'].str.strip()
-    
+    return _instalar_alunos(df_alunos)
+
+def _instalar_alunos(df_alunos: pd.DataFrame) -> pd.DataFrame:
+    """Publica o cadastro já normalizado com os índices derivados (por sala, roster e busca)."""
+    global _alunos_cache, _alunos_por_sala, _roster_alunos, _busca_alunos
+    alunos_por_sala = {
+        sala: grupo[['Aluno', 'Tutor']].to_dict('records')
+        for sala, grupo in df_alunos.groupby(df_alunos['Sala'].str.upper(), sort=False)
+    }
+    # Mapa completo já serializado e comprimido: o /api/alunos só copia bytes
+    corpo = json.dumps(alunos_por_sala, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    roster = {
+        'json': corpo,
+        'gzip': gzip.compress(corpo, compresslevel=6),
+        'etag': hashlib.sha1(corpo).hexdigest(),
+    }
+    busca = sorted(
+        (normalizar_nome(aluno['Aluno']), aluno['Aluno'], sala, aluno['Tutor'])
+        for sala, alunos in alunos_por_sala.items() for aluno in alunos
+        if aluno['Aluno']
+    )
+    # Troca no fim: quem lê durante a carga vê o cadastro anterior inteiro
+    _alunos_por_sala, _roster_alunos, _busca_alunos = alunos_por_sala, roster, busca
     _alunos_cache = df_alunos
+    _tabelas_vencidas.discard('alunos')
     return df_alunos
 
 
 def carregar_dados() -> pd.DataFrame:
     """Carrega dados da tabela 'ocorrencias' e formata como DataFrame para o App."""
-    global _df_cache
-    if _df_cache is not None:
-        return _df_cache
+    df = _obter_ocorrencias()
+    if modo_somente_leitura():
+        _avisar_somente_leitura()
+    return df
 
-    supabase = conectar_supabase()
-    if not supabase: return pd.DataFrame()
+def _obter_ocorrencias() -> pd.DataFrame:
+    if _df_cache is not None and not _cache_ocorrencias_expirado():
+        metricas.cache('ocorrencias', True)
+        return _df_cache
+    metricas.cache('ocorrencias', False)
+
+    trava = _travas_carga['ocorrencias']
+    if not trava.acquire(blocking=False):
+        if _df_cache is not None and not _df_pendente:
+            # Outra thread já está atualizando: segue com o snapshot atual até a troca
+            return _df_cache
+        trava.acquire() # sem cache, ou com escrita deste worker a refletir: espera a carga em andamento
+    restaurado = False
+    try:
+        if _df_cache is None and _restaurar_snapshot_local():
+            restaurado = True
+        # A carga que estava em andamento pode já ter deixado o cache em dia
+        elif _df_cache is None or _cache_ocorrencias_expirado():
+            _preencher_cache_ocorrencias()
+    finally:
+        trava.release()
+    if restaurado:
+        _revalidar_em_segundo_plano()
+
+    return _df_cache if _df_cache is not None else pd.DataFrame()
+
+def _preencher_cache_ocorrencias():
+    if cache_compartilhado.HABILITADO:
+        try:
+            with cache_compartilhado.trava():
+                # Enquanto esperava a trava, outro worker pode já ter publicado os dados
+                if not _adotar_snapshot_compartilhado() or _cache_ocorrencias_expirado():
+                    _atualizar_cache_ocorrencias()
+        except OSError as e:
+            print(f"Cache compartilhado indisponível: {e}")
+            _atualizar_cache_ocorrencias()
+    else:
+        _atualizar_cache_ocorrencias()
+
+def _instantes_sincronizacao() -> tuple[float, float]:
+    """(última sincronização, última carga completa), comuns aos workers quando compartilhado."""
+    if cache_compartilhado.HABILITADO:
+        estado = cache_compartilhado.ler_estado()
+        return estado.sincronizado_em, estado.recarregado_em
+    return _df_sincronizado_em, _df_recarregado_em
+
+def _cache_ocorrencias_expirado() -> bool:
+    """Indica se o cache local precisa de sincronização, adoção de snapshot ou recarga."""
+    if _df_pendente or _recarga_forcada:
+        return True
+    if cache_compartilhado.HABILITADO and cache_compartilhado.ler_estado().versao != _df_versao:
+        return True
+    if _falha_remota_em is not None and time.time() - _falha_remota_em < ESPERA_APOS_FALHA_SEG:
+        return False # banco fora do ar: não tenta de novo a cada requisição
+    if _df_restaurado:
+        return True
+    if not SINCRONIZACAO_DELTA:
+        return False
+    sincronizado_em, recarregado_em = _instantes_sincronizacao()
+    agora = time.time()
+    return agora - sincronizado_em >= DELTA_INTERVALO_SEG or agora - recarregado_em >= RECARGA_COMPLETA_SEG
+
+def _adotar_snapshot_compartilhado() -> bool:
+    """Adota o snapshot publicado por outro worker. Retorna False se for preciso ir ao banco."""
+    if _recarga_forcada:
+        return False
+    estado = cache_compartilhado.ler_estado()
+    if _df_cache is not None and estado.versao == _df_versao:
+        return True
+    try:
+        lido = cache_compartilhado.carregar_snapshot(ORIGEM_DADOS)
+    except Exception as e:
+        print(f"Erro ao ler o snapshot compartilhado: {e}")
+        return False
+    if not lido:
+        return False
+    meta, df = lido
+    if meta.get('versao') != estado.versao:
+        return False
+    _trocar_snapshot(df, meta['versao'])
+    _df_marca.update(meta['marca'])
+    return True
+
+def _atualizar_cache_ocorrencias():
+    """Atualiza o cache local a partir do banco (delta ou carga completa) e publica a nova versão."""
+    global _recarga_forcada
+    _, recarregado_em = _instantes_sincronizacao()
+    completa = (
+        _df_cache is None or _recarga_forcada or not SINCRONIZACAO_DELTA
+        or time.time() - recarregado_em >= RECARGA_COMPLETA_SEG
+    )
+    if completa:
+        # Carga completa (inicial, agendada ou sob demanda; também descarta linhas removidas)
+        df = _recarregar_ocorrencias()
+        if df is not None:
+            _recarga_forcada = False
+            _trocar_snapshot(df, _publicar_versao_ocorrencias(df, completa=True))
+        resultado = True if df is not None else None
+    else:
+        resultado = sincronizar_ocorrencias()
+        if resultado:
+            df, delta = resultado
+            _trocar_snapshot(df, _publicar_versao_ocorrencias(df, completa=False), delta)
+        elif resultado is not None and cache_compartilhado.HABILITADO:
+            cache_compartilhado.marcar_sincronizado()
+    _registrar_resultado_remoto(ok=resultado is not None)
+    if resultado:
+        _salvar_snapshot_local(forcar=completa)
+
+def _registrar_resultado_remoto(ok: bool):
+    """Entra/sai do modo somente leitura conforme a última ida ao banco."""
+    global _falha_remota_em, _df_restaurado
+    if ok:
+        if _falha_remota_em is not None:
+            print("Banco de dados respondendo de novo: modo somente leitura encerrado.")
+        _falha_remota_em = None
+        _df_restaurado = False
+    elif _df_cache is not None:
+        if _falha_remota_em is None:
+            print("Banco de dados indisponível: servindo o cache em modo somente leitura.")
+        _falha_remota_em = time.time()
+
+def modo_somente_leitura() -> bool:
+    """Se as páginas estão sendo servidas do cache/snapshot porque o banco não responde."""
+    return _falha_remota_em is not None
+
+def _avisar_somente_leitura():
+    """Avisa (uma vez por requisição) que os dados exibidos podem estar desatualizados."""
+    if not has_request_context() or g.get('aviso_somente_leitura'):
+        return
+    g.aviso_somente_leitura = True
+    sincronizado_em, _ = _instantes_sincronizacao()
+    quando = datetime.fromtimestamp(sincronizado_em, TZ_SAO).strftime('%d/%m/%Y %H:%M') if sincronizado_em else '?'
+    flash(f"Banco de dados indisponível: exibindo os dados de {quando} (somente leitura).", "warning")
+
+def _salvar_snapshot_local(forcar: bool = False):
+    """Grava em segundo plano o snapshot em disco (a cada INTERVALO_GRAVACAO_SEG, ou já numa carga completa)."""
+    if not snapshot_local.HABILITADO or _df_cache is None or not (forcar or snapshot_local.vencido()):
+        return
+    df = _df_cache # o DataFrame em cache nunca é alterado no lugar: a thread pode lê-lo depois
+    sincronizado_em, recarregado_em = _instantes_sincronizacao()
+    meta = {
+        'origem': ORIGEM_DADOS, 'marca': dict(_df_marca),
+        'sincronizado_em': sincronizado_em, 'recarregado_em': recarregado_em,
+    }
+    referencias = {
+        'alunos': _alunos_cache.to_dict('records') if _alunos_cache is not None else None,
+        'professores': _professores_cache,
+        'salas': _salas_cache,
+    }
+
+    def gravar():
+        try:
+            snapshot_local.gravar(df, referencias, meta)
+        except Exception as e:
+            print(f"Erro ao gravar o snapshot local: {e}")
+    threading.Thread(target=gravar, name='snapshot-local', daemon=True).start()
+
+def _restaurar_snapshot_local() -> bool:
+    """Partida a quente: adota o snapshot em disco (com a trava de carga das ocorrências).
+
+    Com o cache compartilhado já publicado por outro worker, o caminho normal
+    (adotar a versão compartilhada) é o mais novo e o disco não é usado.
+    """
+    global _df_sincronizado_em, _df_recarregado_em, _df_restaurado
+    if not snapshot_local.HABILITADO or _df_cache is not None or _recarga_forcada:
+        return False
+    if cache_compartilhado.HABILITADO and cache_compartilhado.ler_estado().versao > 0:
+        return False
+    inicio = time.perf_counter()
+    lido = snapshot_local.carregar(ORIGEM_DADOS)
+    if lido is None:
+        return False
+    meta, df, referencias = lido
+
+    versao = _df_versao + 1
+    if cache_compartilhado.HABILITADO:
+        try:
+            with cache_compartilhado.trava():
+                if cache_compartilhado.ler_estado().versao > 0:
+                    return False # outro worker publicou enquanto o disco era lido
+                versao = cache_compartilhado.publicar(df, {'marca': meta['marca'], 'origem': ORIGEM_DADOS}, completo=False)
+                cache_compartilhado.definir_instantes(meta['sincronizado_em'], meta['recarregado_em'])
+        except OSError as e:
+            print(f"Cache compartilhado indisponível: {e}")
+    _df_marca.update(meta['marca'])
+    _df_sincronizado_em, _df_recarregado_em = meta['sincronizado_em'], meta['recarregado_em']
+    _df_restaurado = True
+    _trocar_snapshot(df, versao)
+    _restaurar_referencias(referencias)
+    print(f"Snapshot local adotado: {len(df)} ocorrências em {(time.perf_counter() - inicio) * 1000:.0f} ms.")
+    return True
+
+def _restaurar_referencias(referencias: dict):
+    """Cadastros do snapshot em disco, vencidos: a revalidação os relê do banco."""
+    global _professores_cache, _salas_cache
+    if _professores_cache is None and 'professores' in referencias:
+        _professores_cache = referencias['professores']
+        _tabelas_vencidas.add('professores')
+    if _salas_cache is None and 'salas' in referencias:
+        _salas_cache = referencias['salas']
+        _tabelas_vencidas.add('salas')
+    if _alunos_cache is None and 'alunos' in referencias:
+        _instalar_alunos(pd.DataFrame(referencias['alunos'], columns=['Sala', 'Aluno', 'Tutor']))
+        _tabelas_vencidas.add('alunos')
+
+def _revalidar_em_segundo_plano():
+    """Confere no banco, numa thread, os dados adotados do snapshot em disco; as requisições seguem com eles."""
+    threading.Thread(target=carregar_tabelas, name='revalidacao', daemon=True).start()
+
+def _trocar_snapshot(df: pd.DataFrame, versao: int, delta=None):
+    """Troca DataFrame e versão de uma vez; com um delta, atualiza junto as estruturas derivadas."""
+    global _df_cache, _df_versao, _ultimo_delta
+    with _trava_troca:
+        versao_anterior = _df_versao
+        _df_cache = df
+        _df_versao = versao
+        if delta is not None:
+            _ultimo_delta = delta
+            _propagar_delta_derivados(versao_anterior)
+
+def _propagar_delta_derivados(versao_anterior: int):
+    """Atualiza por delta as estruturas derivadas que estavam em dia com a versão anterior."""
+    if _ultimo_delta is None:
+        return
+    antigas, novas = _ultimo_delta
+    for nome, atualizar in _atualizadores_incrementais.items():
+        item = _derivados.get(nome)
+        if item is None or item[0] != versao_anterior:
+            continue
+        try:
+            _derivados[nome] = (_df_versao, atualizar(item[1], antigas, novas))
+        except Exception as e:
+            print(f"Erro ao atualizar '{nome}' por delta, será reconstruído: {e}")
+            _derivados.pop(nome, None)
 
+def _publicar_versao_ocorrencias(df: pd.DataFrame, completa: bool) -> int:
+    """Próxima versão dos dados; com cache compartilhado, grava o snapshot para os outros workers."""
+    if cache_compartilhado.HABILITADO:
+        try:
+            return cache_compartilhado.publicar(df, {'marca': dict(_df_marca), 'origem': ORIGEM_DADOS}, completa)
+        except Exception as e:
+            print(f"Erro ao publicar o snapshot compartilhado: {e}")
+            return cache_compartilhado.ler_estado().versao
+    return _df_versao + 1
+
+def _recarregar_ocorrencias() -> pd.DataFrame | None:
+    """Lê a tabela 'ocorrencias' inteira (o chamador troca o cache). Retorna None em caso de erro."""
+    global _df_recarregado_em, _df_sincronizado_em, _df_pendente
+    repo = obter_repositorio()
+    if not repo: return None
+    escritas = _versao_escritas
+
+    marca = {'id': 0, 'atualizado_em': None}
+    blocos = []
     try:
-        # Acessa a tabela 'ocorrencias' e ordena por 'ID' (MAIÚSCULO)
-        response = supabase.table('ocorrencias').select('*').order('ID', desc=True).execute()
-        data = response.data
+        # Tabela 'ocorrencias' por 'ID' (MAIÚSCULO) decrescente, em blocos: cada um vira
+        # DataFrame assim que chega e as linhas (dicts) do bloco são descartadas. A fase
+        # 'busca' inclui aqui a montagem dos blocos, que é intercalada com a leitura
+        with metricas.medir('sgce_carga_segundos', carga='ocorrencias', fase='busca'):
+            for linhas in repo.listar_ocorrencias_em_blocos():
+                _atualizar_marca_dagua(linhas, repo.coluna_atualizacao, marca)
+                blocos.append(montar_dataframe_ocorrencias(linhas))
     except Exception as e:
-        print(f"Erro ao ler a tabela 'ocorrencias' no Supabase: {e}")
-        flash(f"Erro ao carregar dados do Supabase: {e}", "danger")
-        return pd.DataFrame()
+        print(f"Erro ao ler a tabela 'ocorrencias' ({repo.nome}): {e}")
+        if _df_cache is None: # Falha na recarga agendada: segue com o cache atual
+            avisar(f"Erro ao carregar dados ({repo.nome}): {e}", "danger")
+        return None
 
-    expected_cols_app = list(FINAL_COLUMNS_MAP.values())
+    df = concatenar_ocorrencias(blocos) if blocos else montar_dataframe_ocorrencias([])
+    _df_marca.update(marca)
+    _ids_pendentes.clear()
+    # Escrita registrada durante a leitura pode não estar nela: continua pendente
+    _df_pendente = _versao_escritas != escritas
+    _df_recarregado_em = _df_sincronizado_em = time.time()
+    return df
 
-    if not data:
-        df = pd.DataFrame([], columns=expected_cols_app)
-    else:
-        df = pd.DataFrame(data)
-        
-        # Mapeamento: Renomeia as colunas do DB (MAIÚSCULO) para as chaves do App/Pandas [cite: 14]
-        rename_map = {db_col: app_col for db_col, app_col in FINAL_COLUMNS_MAP.items() if db_col in df.columns}
-        df = df.rename(columns=rename_map)
-
-    # 1. Garante todas as colunas restantes e o tipo de valor padrão
-    for col in expected_cols_app:
-        if col not in df.columns: 
-            df[col] = 0 if col == 'Nº Ocorrência' else ''
-    
-    # 2. Processamento de datas e tipos 
-    if 'Nº Ocorrência' in df.columns:
-        df['Nº Ocorrência'] = pd.to_numeric(df['Nº Ocorrência'], errors='coerce').fillna(0).astype(int)
+def obter_derivado(nome: str, construtor):
+    """Estrutura derivada do DataFrame de ocorrências, recalculada só quando a versão dos dados muda."""
+    df = carregar_dados()
+    with _trava_troca:
+        if _df_cache is not None:
+            df = _df_cache
+        versao = _df_versao
+        item = _derivados.get(nome)
+    acertou = item is not None and item[0] == versao
+    metricas.cache(f'derivado:{nome}', acertou)
+    if acertou:
+        return item[1]
+    with _travas_derivados.setdefault(nome, threading.Lock()):
+        item = _derivados.get(nome) # outra thread pode ter acabado de construir
+        if item is not None and item[0] == versao:
+            return item[1]
+        valor = construtor(df)
+        with _trava_troca:
+            # Só guarda se os dados não mudaram durante a construção
+            if _df_versao == versao:
+                _derivados[nome] = (versao, valor)
+    return valor
+
+def _atualizar_marca_dagua(linhas: list[dict], coluna_atualizacao: str | None, marca: dict | None = None):
+    """Avança a marca d'água (maior ID / maior data de modificação) com as linhas lidas."""
+    marca = _df_marca if marca is None else marca
+    ids = [r['ID'] for r in linhas if r.get('ID') is not None]
+    if ids:
+        marca['id'] = max(marca['id'], max(int(i) for i in ids))
+    if coluna_atualizacao:
+        datas = [r[coluna_atualizacao] for r in linhas if r.get(coluna_atualizacao)]
+        if marca['atualizado_em']:
+            datas.append(marca['atualizado_em'])
+        if datas:
+            marca['atualizado_em'] = max(datas)
+
+def sincronizar_ocorrencias() -> bool | None:
+    """Busca só as ocorrências novas/alteradas desde a marca d'água e mescla no cache.
+
+    Retorna (novo DataFrame, delta) se houve mudança (o chamador troca o cache),
+    False se não havia novidades e None em caso de erro.
+    """
+    global _df_sincronizado_em, _df_pendente
+    repo = obter_repositorio()
+    if not repo or _df_cache is None:
+        return None
+
+    escritas = _versao_escritas
+    ids_pendentes = set(_ids_pendentes)
+    try:
+        with metricas.medir('sgce_carga_segundos', carga='ocorrencias_delta', fase='busca'):
+            linhas = repo.listar_ocorrencias_desde(_df_marca['id'], _df_marca['atualizado_em'])
+        faltantes = ids_pendentes - {r.get('ID') for r in linhas}
+        if faltantes:
+            # Sem coluna de modificação no banco: relê os IDs alterados neste worker
+            linhas += repo.buscar_ocorrencias(faltantes)
+    except Exception as e:
+        # Mantém o cache atual; a próxima leitura tenta de novo
+        print(f"Erro na sincronização incremental de 'ocorrencias' ({repo.nome}): {e}")
+        return None
 
-    # CORREÇÃO CRÍTICA DE INDENTAÇÃO E U+00A0
-    for col in ['DCO', 'DT', 'DC', 'DG', 'HCO']:
+    _ids_pendentes.difference_update(ids_pendentes)
+    _df_pendente = _versao_escritas != escritas
+    _df_sincronizado_em = time.time()
+    if not linhas:
+        return False
+    resultado = _mesclar_linhas(linhas)
+    _atualizar_marca_dagua(linhas, repo.coluna_atualizacao)
+    return resultado
+
+def _mesclar_linhas(linhas: list[dict]):
+    """(cache com as linhas alteradas substituídas, delta (antigas, novas) para as estruturas derivadas)."""
+    df_novas = montar_dataframe_ocorrencias(linhas)
+    antigas = _df_cache[_df_cache['Nº Ocorrência'].isin(df_novas['Nº Ocorrência'])]
+    return mesclar_ocorrencias(_df_cache, df_novas), (antigas, df_novas)
+
+def aplicar_escrita_no_cache(linhas: list[dict]) -> bool:
+    """Aplica ao cache as linhas devolvidas por uma escrita, sem reler o banco.
+
+    A marca d'água não avança: a próxima sincronização relê essas linhas, mas não
+    perde alterações de outros workers anteriores a elas. Retorna False se não
+    havia cache em dia para atualizar (o chamador registra a escrita para sincronização).
+    """
+    global _versao_escritas
+    if _df_cache is None or not linhas:
+        return False
+    _versao_escritas += 1
+    with _travas_carga['ocorrencias']:
+        if cache_compartilhado.HABILITADO:
+            try:
+                with cache_compartilhado.trava():
+                    # Só aplica sobre a versão publicada mais recente
+                    if not _adotar_snapshot_compartilhado():
+                        return False
+                    _aplicar_linhas_e_publicar(linhas)
+                return True
+            except OSError as e:
+                print(f"Cache compartilhado indisponível: {e}")
+        _aplicar_linhas_e_publicar(linhas)
+    return True
+
+def _aplicar_linhas_e_publicar(linhas: list[dict]):
+    df, delta = _mesclar_linhas(linhas)
+    _trocar_snapshot(df, _publicar_versao_ocorrencias(df, completa=False), delta)
+    _salvar_snapshot_local()
+
+def mesclar_ocorrencias(df: pd.DataFrame, df_novas: pd.DataFrame) -> pd.DataFrame:
+    """Substitui/acrescenta as linhas de df_novas em df, mantendo a ordem por ID decrescente."""
+    if df.empty:
+        return df_novas
+    restantes = df[~df['Nº Ocorrência'].isin(df_novas['Nº Ocorrência'])]
+    # Categorias iguais nos dois lados: o concat mantém as colunas categóricas
+    restantes, df_novas = _unificar_categorias(restantes, df_novas)
+    mesclado = pd.concat([df_novas, restantes], ignore_index=True)
+    return mesclado.sort_values(by='Nº Ocorrência', ascending=False, kind='stable', ignore_index=True)
+
+def concatenar_ocorrencias(blocos: list[pd.DataFrame]) -> pd.DataFrame:
+    """Junta blocos já montados (na ordem dada), com as categorias unificadas para manter os tipos compactos."""
+    if len(blocos) == 1:
+        return blocos[0]
+    blocos = [b.copy(deep=False) for b in blocos]
+    for col in COLUNAS_CATEGORICAS:
+        if all(isinstance(b[col].dtype, pd.CategoricalDtype) for b in blocos):
+            categorias = blocos[0][col].cat.categories
+            for b in blocos[1:]:
+                categorias = categorias.union(b[col].cat.categories)
+            for b in blocos:
+                b[col] = b[col].cat.set_categories(categorias)
+    return pd.concat(blocos, ignore_index=True)
+
+def _unificar_categorias(a: pd.DataFrame, b: pd.DataFrame):
+    a, b = a.copy(deep=False), b.copy(deep=False)
+    for col in COLUNAS_CATEGORICAS:
+        if isinstance(a[col].dtype, pd.CategoricalDtype) and isinstance(b[col].dtype, pd.CategoricalDtype):
+            categorias = a[col].cat.categories.union(b[col].cat.categories)
+            a[col] = a[col].cat.set_categories(categorias)
+            b[col] = b[col].cat.set_categories(categorias)
+    return a, b
+
+def compactar_ocorrencias(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas de texto para os tipos compactos (categorias e strings Arrow)."""
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in COLUNAS_TEXTO_LIVRE:
         if col in df.columns:
-            df[col] = pd.to_datetime(
-                df[col], 
-                format=FORMATO_ENTRADA, 
-                errors='coerce', 
-                utc=True
-            ).dt.tz_convert(TZ_SAO)
+            df[col] = df[col].astype(TIPO_TEXTO_LIVRE)
+    return df
 
+def formatar_exibicao(df: pd.DataFrame) -> pd.DataFrame:
+    """Cópia com as datas/horas como texto (DD/MM/AAAA, HH:MM), para templates e PDFs."""
+    saida = df.copy(deep=False)
+    for col, formato in FORMATOS_EXIBICAO.items():
+        if col in saida.columns and pd.api.types.is_datetime64_any_dtype(saida[col]):
+            saida[col] = saida[col].dt.strftime(formato).fillna('')
+    return saida
+
+def relatorio_memoria(df: pd.DataFrame) -> dict:
+    """Bytes ocupados por coluna (memória profunda, incluindo o texto)."""
+    uso = df.memory_usage(deep=True)
+    return {
+        'linhas': len(df),
+        'total_bytes': int(uso.sum()),
+        'colunas': {
+            col: {'tipo': 'índice' if col == 'Index' else str(df[col].dtype), 'bytes': int(n)}
+            for col, n in uso.items()
+        },
+    }
+
+COLUNAS_DATA = ['DCO', 'DT', 'DC', 'DG', 'HCO']
+
+def _interpretar_iso(texto: pd.Series) -> pd.Series:
+    """ISO-8601 em UTC; o que não for ISO vira NaT.
+
+    O to_datetime fica lento quando cada texto traz o próprio deslocamento
+    (+00:00, -03:00): a parte local é lida sem fuso e o deslocamento, que é o
+    mesmo em quase todas as linhas, é descontado por grupo.
+    """
+    valores = np.full(len(texto), np.datetime64('NaT'), dtype='datetime64[ns]')
+    sufixo = texto.str[-6:]
+    com_fuso = (sufixo.str[0].isin(['+', '-']) & (sufixo.str[3] == ':')).to_numpy()
+    ultimo = texto.str[-1]
+    sufixo = sufixo.where(com_fuso, ultimo.where(ultimo == 'Z'))
+    for deslocamento in sufixo.dropna().unique():
+        mascara = (sufixo == deslocamento).to_numpy()
+        local = pd.to_datetime(texto[mascara].str[:-len(deslocamento)], format=FORMATO_ENTRADA, errors='coerce', utc=True)
+        if deslocamento != 'Z':
+            if not (deslocamento[1:3] + deslocamento[4:]).isdigit():
+                continue  # fica NaT e passa pelo fallback
+            sinal = -1 if deslocamento[0] == '-' else 1
+            local = local - sinal * pd.Timedelta(hours=int(deslocamento[1:3]), minutes=int(deslocamento[4:]))
+        valores[mascara] = local.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+    # Sem deslocamento (ex.: SQLite): horário tratado como UTC, como no to_datetime(utc=True)
+    mascara = sufixo.isna().to_numpy()
+    if mascara.any():
+        local = pd.to_datetime(texto[mascara], format=FORMATO_ENTRADA, errors='coerce', utc=True)
+        valores[mascara] = local.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+    return pd.Series(valores, index=texto.index).dt.tz_localize('UTC')
+
+def converter_datas(valores) -> pd.Series:
+    """Converte textos de data/hora do banco em Timestamp no fuso de SP.
+
+    Cada valor distinto é interpretado uma única vez (datas e horas se repetem
+    muito). O caminho rápido é o ISO-8601; só as linhas que ele rejeitar passam
+    pela inferência de formato, elemento a elemento.
+    """
+    serie = pd.Series(valores)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie if serie.dt.tz is not None else serie.dt.tz_localize('UTC')
+        return datas.dt.tz_convert(TZ_SAO)
+    codigos, unicos = pd.factorize(serie)
+    texto = pd.Series(unicos, dtype=object).astype(str).str.strip()
+    datas = _interpretar_iso(texto)
+    malformadas = datas.isna() & ~texto.isin(['', 'None', 'nan', 'NaT'])
+    if malformadas.any():
+        datas[malformadas] = pd.to_datetime(texto[malformadas], format='mixed', dayfirst=True, errors='coerce', utc=True)
+    # Uma conversão de fuso por valor distinto; -1 (nulo) vira NaT no take
+    datas = datas.dt.tz_convert(TZ_SAO).array.take(codigos, allow_fill=True)
+    return pd.Series(datas, index=serie.index)
+
+def montar_dataframe_ocorrencias(data: list[dict]) -> pd.DataFrame:
+    """Converte linhas do banco no DataFrame normalizado usado pelo App."""
+    expected_cols_app = list(FINAL_COLUMNS_MAP.values())
+
+    with metricas.medir('sgce_carga_segundos', etapa='montagem', carga='ocorrencias', fase='montagem'):
+        if not data:
+            df = pd.DataFrame([], columns=expected_cols_app)
+        else:
+            df = pd.DataFrame(data)
             
-            # Coluna DCO é formatada para o display no HTML (DD/MM/AAAA) [cite: 15, 16]
-            if col == 'DCO':
-                df['DCO'] = df['DCO'].dt.strftime('%d/%m/%Y')
-                
-            # Coluna HCO é formatada para o display no HTML (HH:MM)
-            elif col == 'HCO':
-                df['HCO'] = df['HCO'].dt.strftime('%H:%M')
+            # Mapeamento: Renomeia as colunas do DB (MAIÚSCULO) para as chaves do App/Pandas [cite: 14]
+            rename_map = {db_col: app_col for db_col, app_col in FINAL_COLUMNS_MAP.items() if db_col in df.columns}
+            df = df.rename(columns=rename_map)
+
+        # 1. Garante todas as colunas restantes e o tipo de valor padrão
+        for col in expected_cols_app:
+            if col not in df.columns: 
+                df[col] = 0 if col == 'Nº Ocorrência' else ''
+        
+        # 2. Processamento de datas e tipos 
+        if 'Nº Ocorrência' in df.columns:
+            df['Nº Ocorrência'] = pd.to_numeric(df['Nº Ocorrência'], errors='coerce').fillna(0).astype(int)
+
+    # Datas ficam como Timestamp (fuso de SP); DCO/HCO são formatadas só na exibição
+    with metricas.medir('sgce_carga_segundos', etapa='datas', carga='ocorrencias', fase='datas'):
+        for col in COLUNAS_DATA:
+            if col in df.columns:
+                df[col] = converter_datas(df[col])
           
     # 3. Limpeza de colunas de texto
-    text_cols = ['PROFESSOR', 'Sala', 'Aluno', 'Tutor', 'Descrição da Ocorrência', 
-                 'Atendimento Professor', 'ATT', 'ATC', 'ATG', 'Status', 'FT', 'FC', 'FG']
-    for col in text_cols:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip().str.upper().fillna('')
+    with metricas.medir('sgce_carga_segundos', etapa='texto', carga='ocorrencias', fase='texto'):
+        text_cols = ['PROFESSOR', 'Sala', 'Aluno', 'Tutor', 'Status', 'FT', 'FC', 'FG']
+        for col in text_cols:
+            if col in df.columns:
+                df[col] = df[col].astype(str).str.strip().str.upper().fillna('')
+        # Texto livre mantém a grafia original (é exibido e regravado pela edição)
+        free_text_cols = ['Descrição da Ocorrência', 'Atendimento Professor', 'ATT', 'ATC', 'ATG']
+        for col in free_text_cols:
+            if col in df.columns:
+                df[col] = df[col].fillna('').astype(str).str.strip()
+
+        return compactar_ocorrencias(df)
+
+# -------------------- Carga Concorrente das Tabelas --------------------
+# Num worker frio cada tabela é uma ida ao banco. Buscadas em paralelo, a
+# primeira requisição espera pela mais lenta, e não pela soma das quatro.
+
+def _tabelas_em_cache() -> dict:
+    return {
+        'professores': _referencia_em_dia('professores'),
+        'salas': _referencia_em_dia('salas'),
+        'alunos': _referencia_em_dia('alunos'),
+        'ocorrencias': _df_cache is not None and not _cache_ocorrencias_expirado(),
+    }
+
+_CARREGADORES = {
+    'professores': carregar_professores,
+    'salas': carregar_salas,
+    'alunos': carregar_dados_alunos,
+    'ocorrencias': carregar_dados,
+}
 
-    _df_cache = df
-    return df
+def carregar_tabelas(*nomes: str):
+    """Carrega em paralelo as tabelas pedidas (padrão: todas) que ainda não estão em cache.
+
+    As ocorrências ficam de fora quando o repositório filtra no banco: nesse
+    motor as rotas não montam o DataFrame completo.
+    """
+    repo = obter_repositorio() # criado antes das threads: todas usam o mesmo
+    if not repo:
+        return
+    nomes = nomes or tuple(_CARREGADORES)
+    if repo.filtros_no_banco:
+        nomes = tuple(n for n in nomes if n != 'ocorrencias')
+    em_cache = _tabelas_em_cache()
+    frias = [n for n in nomes if not em_cache[n]]
+    if len(frias) < 2:
+        for nome in frias:
+            _CARREGADORES[nome]()
+        return
+    with metricas.medir('sgce_carga_segundos', etapa='carga', carga='tabelas', fase='paralela'):
+        with ThreadPoolExecutor(max_workers=len(frias), thread_name_prefix='carga') as pool:
+            futuros = {pool.submit(_CARREGADORES[nome]): nome for nome in frias}
+            for futuro in as_completed(futuros):
+                try:
+                    futuro.result()
+                except Exception as e:
+                    # A rota chama o carregador de novo e trata o erro como sempre
+                    print(f"Erro na carga paralela de '{futuros[futuro]}': {e}")
+
+def aquecer_caches():
+    """Preenche todos os caches do worker (gunicorn: post_worker_init, antes de aceitar conexões).
+
+    Com um snapshot em disco, adota-o e revalida em segundo plano: o worker
+    aceita conexões sem esperar o banco.
+    """
+    inicio = time.perf_counter()
+    try:
+        with _travas_carga['ocorrencias']:
+            restaurado = _restaurar_snapshot_local()
+        if restaurado:
+            _revalidar_em_segundo_plano()
+        else:
+            carregar_tabelas()
+    except Exception as e:
+        print(f"Erro ao aquecer os caches: {e}")
+        return
+    print(f"Caches aquecidos em {time.perf_counter() - inicio:.2f}s (pid {os.getpid()}).")
 
 # -------------------- Lógica de Relatórios (Funções Auxiliares) --------------------
 
+def _porcentagem(parte: int, total: int) -> str:
+    return f"({parte / total * 100:.1f}%)" if total else "(0.0%)"
+
+def _soma_setores(linha, resultado: str) -> int:
+    """Soma, entre os setores, os atendimentos com o resultado de prazo informado."""
+    return int(sum(linha[f'{setor}|{resultado}'] for setor in SETORES_ATENDIMENTO))
+
+def calcular_relatorio_estatistico(start=None, end=None) -> dict:
+    """Resumo geral do período: total, total por status e desempenho de atendimento por setor."""
+    por_status = consultar_cubo(start, end, ['Status'])
+    totais = por_status.sum() if not por_status.empty else None
+
+    setores = []
+    for setor in SETORES_ATENDIMENTO:
+        no_prazo, fora, nao = (
+            int(totais[f'{setor}|{r}']) if totais is not None else 0 for r in agregacoes.RESULTADOS_PRAZO
+        )
+        acionados = no_prazo + fora + nao
+        setores.append({
+            'Setor': setor,
+            'Total': acionados,
+            'Respondidas <7 dias': no_prazo, 'Porc <7 dias': _porcentagem(no_prazo, acionados),
+            'Respondidas >7 dias': fora, 'Porc >7 dias': _porcentagem(fora, acionados),
+            'Não Respondidas': nao, 'Porc Não Resp': _porcentagem(nao, acionados),
+        })
+
+    return {
+        'total': int(totais['Total']) if totais is not None else 0,
+        'por_status': {status: int(linha['Total']) for status, linha in por_status.iterrows()},
+        'setores': setores,
+    }
+
+def calcular_relatorio_por_sala(start=None, end=None) -> list[dict]:
+    """Ocorrências por sala no período, com o desempenho de atendimento somado entre os setores."""
+    por_sala = consultar_cubo(start, end, ['Sala'])
+    total_geral = int(por_sala['Total'].sum()) if not por_sala.empty else 0
+    relatorio = []
+    for sala, linha in por_sala.iterrows():
+        total = int(linha['Total'])
+        relatorio.append({
+            'Sala': sala,
+            'Total Ocorrências': total,
+            'Porcentagem': f"{total / total_geral * 100:.1f}%" if total_geral else "0.0%",
+            'Respondidas <7 dias': _soma_setores(linha, 'No Prazo'),
+            'Respondidas >7 dias': _soma_setores(linha, 'Fora do Prazo'),
+            'Não Respondidas': _soma_setores(linha, 'Não Atendido'),
+        })
+    return relatorio
+
+def calcular_relatorio_estatistico_tutor(start=None, end=None) -> dict:
+    """Por tutor: total de ocorrências e atendimentos do tutor no prazo, fora do prazo e não atendidos."""
+    por_tutor = consultar_cubo(start, end, ['Tutor'])
+    return {
+        tutor: {
+            'total': int(linha['Total']),
+            'prazo': int(linha['TUTOR|No Prazo']),
+            'fora': int(linha['TUTOR|Fora do Prazo']),
+            'nao': int(linha['TUTOR|Não Atendido']),
+        }
+        for tutor, linha in por_tutor.iterrows()
+    }
+
 def calcular_relatorio_tutor_ocorrencias():
     """Calcula a quantidade de ocorrências por aluno, agrupando o resultado por Tutor."""
+    carregar_tabelas('alunos', 'ocorrencias')
     try:
         df_alunos = carregar_dados_alunos()
     except Exception:
         df_completo = carregar_dados()
         df_alunos = df_completo[['Tutor', 'Aluno', 'Sala']].drop_duplicates().dropna(subset=['Tutor', 'Aluno'])
         
-    df_ocorrencias = carregar_dados()
-    
     if df_alunos.empty: return {}
 
-    df_ocorrencias['Aluno'] = df_ocorrencias['Aluno'].str.strip()
-    ocorrencias_por_aluno = df_ocorrencias.groupby('Aluno').size().reset_index(name='Quantidade Ocorrências')
+    repo = obter_repositorio()
+    if repo and repo.filtros_no_banco:
+        # Contagem feita no banco (GROUP BY indexado), sem montar o DataFrame completo
+        contagem = repo.contar_ocorrencias_por_aluno()
+        ocorrencias_por_aluno = pd.DataFrame(list(contagem.items()), columns=['Aluno', 'Quantidade Ocorrências'])
+    else:
+        df_ocorrencias = carregar_dados()
+        ocorrencias_por_aluno = (df_ocorrencias.groupby('Aluno', observed=True).size()
+                                 .reset_index(name='Quantidade Ocorrências'))
+        ocorrencias_por_aluno['Aluno'] = ocorrencias_por_aluno['Aluno'].astype(str)
 
     alunos_e_tutores = df_alunos[['Tutor', 'Aluno', 'Sala']].drop_duplicates(subset=['Aluno']).dropna(subset=['Tutor', 'Aluno'])
     
@@ -273,92 +1096,537 @@ def calcular_relatorio_tutor_ocorrencias():
     return relatorio_final
 
 
-def calculate_display_status_and_color(row):
-    """Calcula o status de exibição e a cor baseados nos flags FT/FC/FG."""
-    status_db = row['Status']
-    ft_done = row['FT'].upper() == 'SIM'
-    fc_done = row['FC'].upper() == 'SIM'
-    fg_done = row['FG'].upper() == 'SIM'
+# -------------------- Motor de Status e Prazos (vetorizado) --------------------
 
-    # 1. ASSINADA
-    if status_db == 'ASSINADA':
-        row['DisplayStatus'] = 'ASSINADA'
-        row['DisplayColor'] = 'success' 
-        return row
-    
-    # 2. ATENDIMENTO (Requer ação) [cite: 19]
-    if not ft_done or not fc_done or not fg_done:
-        row['DisplayStatus'] = 'ATENDIMENTO'
-        row['DisplayColor'] = 'danger' 
-        return row
-    
-    # 3. FINALIZADA (Todos os atendimentos feitos, mas não assinada) [cite: 20]
-    if ft_done and fc_done and fg_done:
-        row['DisplayStatus'] = 'FINALIZADA'
-        row['DisplayColor'] = 'warning' 
-        return row
-        
-    # Fallback
-    row['DisplayStatus'] = status_db
-    row['DisplayColor'] = 'secondary'
-    return row
+PRAZO_DIAS = 7
+SETORES_ATENDIMENTO = ['PROFESSOR', 'TUTOR', 'COORDENAÇÃO', 'GESTÃO']
+# Setor -> (flag "requer atendimento", data do atendimento)
+COLUNAS_SETOR = {'TUTOR': ('FT', 'DT'), 'COORDENAÇÃO': ('FC', 'DC'), 'GESTÃO': ('FG', 'DG')}
+STATUS_NO_PRAZO = 'No Prazo'
+STATUS_FORA_PRAZO = 'Fora do Prazo'
+STATUS_NAO_ATENDIDO = 'Não Atendido'
+
+def calcular_status_exibicao(df: pd.DataFrame) -> pd.DataFrame:
+    """Calcula DisplayStatus e DisplayColor de todas as linhas de uma vez, baseados em Status e nos flags FT/FC/FG."""
+    # Flags já normalizados em maiúsculas (comparação direta nos códigos das categorias)
+    assinada = (df['Status'] == 'ASSINADA').to_numpy()
+    # Flag SIM = setor acionado e ainda sem atendimento (mesma regra do prazo e da edição)
+    pendentes = ((df['FT'] == 'SIM') | (df['FC'] == 'SIM') | (df['FG'] == 'SIM')).to_numpy()
+    # 1. ASSINADA; 2. ATENDIMENTO (requer ação); 3. FINALIZADA (nenhum atendimento pendente, mas não assinada)
+    condicoes = [assinada, pendentes]
+    return pd.DataFrame({
+        'DisplayStatus': np.select(condicoes, ['ASSINADA', 'ATENDIMENTO'], default='FINALIZADA'),
+        'DisplayColor': np.select(condicoes, ['success', 'danger'], default='warning'),
+    }, index=df.index)
+
+def _datas_ocorrencia(df: pd.DataFrame) -> pd.Series:
+    """Data (sem hora, fuso de SP) de registro da ocorrência (DCO)."""
+    dco = df['DCO']
+    if pd.api.types.is_datetime64_any_dtype(dco):
+        if dco.dt.tz is not None:
+            dco = dco.dt.tz_convert(TZ_SAO).dt.tz_localize(None)
+        return dco.dt.normalize()
+    return pd.to_datetime(dco, format='%d/%m/%Y', errors='coerce')
+
+def calcular_status_prazo(df: pd.DataFrame) -> pd.DataFrame:
+    """Status de prazo de cada setor (No Prazo / Fora do Prazo / Não Atendido), comparando DCO com DT/DC/DG.
+
+    Vazio quando o setor não foi acionado. O atendimento do professor é registrado
+    junto com a ocorrência, então conta como no prazo quando preenchido.
+    """
+    dco = _datas_ocorrencia(df)
+    atp_vazio = df['Atendimento Professor'].str.strip().isin(['', 'NONE', 'NAN'])
+    resultado = {
+        'Prazo PROFESSOR': np.where(atp_vazio, STATUS_NAO_ATENDIDO, STATUS_NO_PRAZO)
+    }
+    for setor, (col_flag, col_data) in COLUNAS_SETOR.items():
+        # Colunas já convertidas para o fuso de SP na carga
+        data = df[col_data]
+        dias = (data.dt.tz_localize(None).dt.normalize() - dco).dt.days
+        atendido = data.notna().to_numpy()
+        pendente = ~atendido & (df[col_flag] == 'SIM').to_numpy()
+        resultado[f'Prazo {setor}'] = np.select(
+            [atendido & (dias <= PRAZO_DIAS).to_numpy(), atendido, pendente],
+            [STATUS_NO_PRAZO, STATUS_FORA_PRAZO, STATUS_NAO_ATENDIDO],
+            default=''
+        )
+    return pd.DataFrame(resultado, index=df.index)
+
+def calcular_status_ocorrencias(df: pd.DataFrame) -> pd.DataFrame:
+    """Status de exibição + prazos por setor, alinhados pelo índice do DataFrame de ocorrências."""
+    if df.empty:
+        colunas = ['DisplayStatus', 'DisplayColor'] + [f'Prazo {s}' for s in SETORES_ATENDIMENTO]
+        return pd.DataFrame(columns=colunas, index=df.index)
+    return pd.concat([calcular_status_exibicao(df), calcular_status_prazo(df)], axis=1)
+
+def obter_status_ocorrencias() -> pd.DataFrame:
+    """Status do cache de ocorrências, recalculado só quando a versão dos dados muda."""
+    return obter_derivado('status', calcular_status_ocorrencias)
+
+def _atualizar_status(status_df: pd.DataFrame, antigas: pd.DataFrame, novas: pd.DataFrame) -> pd.DataFrame:
+    """Status por delta: calcula só as linhas novas e copia as demais, realinhadas ao cache já trocado.
+
+    As linhas mantidas seguem na mesma ordem (ID decrescente) no cache novo; as
+    antigas saem pelas suas posições no cache anterior (o índice de 'antigas').
+    """
+    df = _df_cache
+    alteradas = df['Nº Ocorrência'].isin(novas['Nº Ocorrência']).to_numpy()
+    mantidas = status_df.drop(index=antigas.index)
+    if len(mantidas) != len(df) - alteradas.sum():
+        raise ValueError('status fora de sincronia com o cache')
+    recalculadas = calcular_status_ocorrencias(novas).set_axis(novas['Nº Ocorrência'].to_numpy())
+    recalculadas = recalculadas.loc[df['Nº Ocorrência'].to_numpy()[alteradas]].set_axis(df.index[alteradas])
+    return pd.concat([mantidas.set_axis(df.index[~alteradas]), recalculadas]).sort_index()
+
+_atualizadores_incrementais['status'] = _atualizar_status
+
+# -------------------- Cubo de Agregação dos Relatórios --------------------
+
+def _contribuicoes_cubo(df: pd.DataFrame, status_df=None) -> pd.DataFrame:
+    if status_df is None:
+        status_df = calcular_status_ocorrencias(df)
+    return agregacoes.montar_contribuicoes(df, status_df, _datas_ocorrencia(df), SETORES_ATENDIMENTO)
+
+def _construir_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(columns=agregacoes.colunas_medidas(SETORES_ATENDIMENTO))
+    return agregacoes.construir_cubo(_contribuicoes_cubo(df, obter_status_ocorrencias()), SETORES_ATENDIMENTO)
+
+def _atualizar_cubo(cubo: pd.DataFrame, antigas: pd.DataFrame, novas: pd.DataFrame) -> pd.DataFrame:
+    return agregacoes.atualizar_cubo(cubo, _contribuicoes_cubo(antigas), _contribuicoes_cubo(novas),
+                                     SETORES_ATENDIMENTO)
+
+_atualizadores_incrementais['cubo'] = _atualizar_cubo
+
+def _atualizar_contribuicoes(contrib: pd.DataFrame, antigas: pd.DataFrame, novas: pd.DataFrame) -> pd.DataFrame:
+    return agregacoes.atualizar_contribuicoes(contrib, _contribuicoes_cubo(antigas), _contribuicoes_cubo(novas))
+
+_atualizadores_incrementais['contribuicoes'] = _atualizar_contribuicoes
+
+def _data_filtro(valor: str | None):
+    """Converte a data de filtro (AAAA-MM-DD, campo <input type=date>) em Timestamp; None se vazia ou inválida."""
+    if not valor:
+        return None
+    try:
+        return pd.Timestamp(datetime.strptime(valor, '%Y-%m-%d'))
+    except ValueError:
+        return None
+
+def consultar_cubo(start: str | None, end: str | None, agrupar_por: list[str]) -> pd.DataFrame:
+    """Medidas do cubo agrupadas por 'agrupar_por' no intervalo de datas [start, end]."""
+    cubo = obter_derivado('cubo', _construir_cubo)
+    return agregacoes.consultar(
+        cubo,
+        lambda: obter_derivado('contribuicoes', lambda df: _contribuicoes_cubo(df, obter_status_ocorrencias())),
+        _data_filtro(start), _data_filtro(end), agrupar_por, SETORES_ATENDIMENTO
+    )
+
+# -------------------- Índices em Memória --------------------
+
+def construir_indices_ocorrencias(df: pd.DataFrame) -> dict:
+    """Índices hash sobre o DataFrame de ocorrências, com posições de linha em ordem de ID decrescente.
+
+    'id': Nº Ocorrência -> posição; 'sala_aluno': Sala -> Aluno -> posições;
+    'tutor': Tutor -> posições; 'df': o próprio frame indexado.
+    """
+    if df.empty:
+        return {'df': df, 'id': {}, 'sala_aluno': {}, 'tutor': {}}
+    por_sala_aluno = {}
+    for (sala, aluno), posicoes in df.groupby(['Sala', 'Aluno'], sort=False, observed=True).indices.items():
+        por_sala_aluno.setdefault(sala, {})[aluno] = posicoes
+    return {
+        'df': df,
+        'id': dict(zip(df['Nº Ocorrência'].tolist(), range(len(df)))),
+        'sala_aluno': por_sala_aluno,
+        'tutor': df.groupby('Tutor', sort=False, observed=True).indices,
+    }
+
+def obter_indices_ocorrencias() -> dict:
+    """Índices da versão atual do cache (reconstruídos junto com o cache)."""
+    return obter_derivado('indices', construir_indices_ocorrencias)
+
+def obter_tutores() -> list[str]:
+    """Tutores com ocorrências (para os filtros)."""
+    repo = obter_repositorio()
+    if repo and repo.filtros_no_banco:
+        return repo.listar_tutores()
+    return obter_derivado(
+        'tutores', lambda d: sorted(d['Tutor'].unique().tolist()) if not d.empty and 'Tutor' in d.columns else []
+    )
+
+def ocorrencia_do_cache(oid: int) -> dict | None:
+    """Ocorrência no formato do banco (colunas MAIÚSCULAS), lida do cache sem ir ao banco."""
+    indices = obter_indices_ocorrencias()
+    pos = indices['id'].get(oid)
+    if pos is None:
+        return None
+    linha = formatar_exibicao(indices['df'].iloc[[pos]]).iloc[0]
+    ocorrencia = {}
+    for col_app, col_banco in COLUNAS_BANCO.items():
+        valor = linha.get(col_app, '')
+        if isinstance(valor, pd.Timestamp):
+            valor = valor.isoformat()
+        elif pd.isna(valor):
+            valor = ''
+        ocorrencia[col_banco] = valor
+    ocorrencia['ID'] = int(ocorrencia['ID'])
+    return ocorrencia
+
+def filtrar_ocorrencias(df: pd.DataFrame, tutor=None, status=None, status_df=None) -> pd.DataFrame:
+    """Aplica os filtros de tutor e de status de exibição.
+
+    status_df é o resultado de calcular_status_ocorrencias do frame completo (alinhado
+    pelo índice); sem ele, o status é calculado só para as linhas de df.
+    """
+    if tutor:
+        df = df[df['Tutor'] == tutor]
+    if status:
+        if status_df is not None:
+            display = status_df['DisplayStatus'].reindex(df.index)
+        else:
+            display = calcular_status_exibicao(df)['DisplayStatus']
+        df = df[display == status]
+    return df
+
+def paginar_ocorrencias(df: pd.DataFrame, tutor=None, status=None, apos=None, antes=None, limite=50,
+                        status_df=None) -> pd.DataFrame:
+    """Página por keyset (Nº Ocorrência) sobre o DataFrame ordenado por ID decrescente.
+
+    O cursor é localizado por busca binária e os filtros são aplicados bloco a
+    bloco a partir dele, parando assim que a página estiver completa: sem
+    filtros o custo não depende do tamanho da tabela.
+    """
+    if df.empty:
+        return df
+    ids_negativos = -df['Nº Ocorrência'].to_numpy() # crescente, para o searchsorted
+    tamanho_bloco = max(limite * 4, 1000)
+    partes, obtidas = [], 0
+
+    if antes is None:
+        # Próximas páginas: IDs menores que o cursor 'apos'
+        pos = 0 if apos is None else int(np.searchsorted(ids_negativos, -apos, side='right'))
+        while pos < len(df) and obtidas < limite:
+            bloco = filtrar_ocorrencias(df.iloc[pos:pos + tamanho_bloco], tutor, status, status_df)
+            partes.append(bloco)
+            obtidas += len(bloco)
+            pos += tamanho_bloco
+        return pd.concat(partes).head(limite) if partes else df.iloc[0:0]
+
+    # Página anterior: IDs maiores que o cursor 'antes', os mais próximos dele
+    fim = int(np.searchsorted(ids_negativos, -antes, side='left'))
+    while fim > 0 and obtidas < limite:
+        inicio = max(0, fim - tamanho_bloco)
+        bloco = filtrar_ocorrencias(df.iloc[inicio:fim], tutor, status, status_df)
+        partes.insert(0, bloco)
+        obtidas += len(bloco)
+        fim = inicio
+    return pd.concat(partes).tail(limite) if partes else df.iloc[0:0]
+
+def estimar_total_ocorrencias(df: pd.DataFrame, tutor=None, status=None, amostra=2000,
+                              status_df=None) -> tuple[int, bool]:
+    """Total de ocorrências com os filtros: exato sem filtros ou em tabelas pequenas, senão estimado por amostragem."""
+    if not tutor and not status:
+        return len(df), True
+    if len(df) <= amostra:
+        return len(filtrar_ocorrencias(df, tutor, status, status_df)), True
+    amostra_df = df.iloc[::len(df) // amostra]
+    fracao = len(filtrar_ocorrencias(amostra_df, tutor, status, status_df)) / len(amostra_df)
+    return int(round(fracao * len(df))), False
+
+# -------------------- Busca Textual --------------------
+
+def obter_indice_busca() -> busca_textual.IndiceTextual:
+    """Índice invertido dos campos de texto livre (busca_textual.py), atualizado por delta."""
+    return obter_derivado('busca', busca_textual.construir_indice)
+
+_atualizadores_incrementais['busca'] = busca_textual.atualizar_indice
+
+def buscar_ocorrencias_texto(consulta: str, tutor=None, status=None, status_df=None) -> pd.DataFrame:
+    """Ocorrências do cache que contêm os termos da consulta, com os filtros, da mais relevante à menos."""
+    pontuacao = busca_textual.buscar(obter_indice_busca(), consulta)
+    indices = obter_indices_ocorrencias()
+    encontrados = [(oid, p) for oid, p in pontuacao.items() if oid in indices['id']]
+    if not encontrados:
+        return indices['df'].iloc[0:0]
+    df = indices['df'].iloc[[indices['id'][oid] for oid, _ in encontrados]]
+    df = df.assign(_relevancia=[p for _, p in encontrados])
+    df = filtrar_ocorrencias(df, tutor, status, status_df)
+    return df.sort_values(['_relevancia', 'Nº Ocorrência'], ascending=False).drop(columns='_relevancia')
+
+# -------------------- Cache de Páginas --------------------
+
+def versao_dados() -> int:
+    """Versão atual das ocorrências (sincroniza o cache se preciso), parte da chave do cache de páginas."""
+    repo = obter_repositorio()
+    if repo and repo.filtros_no_banco:
+        if cache_compartilhado.HABILITADO:
+            return cache_compartilhado.ler_estado().versao
+        return _versao_escritas
+    carregar_dados()
+    return _df_versao
+
+def pagina_em_cache(view):
+    """Guarda o HTML das respostas GET no cache de páginas e responde 304 pelo ETag.
+
+    Não usa o cache quando há mensagens flash pendentes ou quando a própria view
+    mexe na sessão (flash de erro): essas páginas valem só para aquela requisição.
+    """
+    @wraps(view)
+    def envolver(*args, **kwargs):
+        if not cache_paginas.HABILITADO or request.method != 'GET' or session.get('_flashes'):
+            return view(*args, **kwargs)
+        chave = (
+            request.endpoint, tuple(sorted(kwargs.items())),
+            cache_paginas.normalizar_argumentos(request.args),
+            # Sem o cache compartilhado cada worker tem o seu contador de versão
+            None if cache_compartilhado.HABILITADO else os.getpid(),
+            versao_dados(),
+        )
+        etag = cache_paginas.etag(chave)
+        if request.if_none_match.contains(etag):
+            metricas.incrementar('sgce_cache_total', cache='paginas', resultado='nao_modificado')
+            resposta = Response(status=304)
+        else:
+            entrada = _cache_paginas.obter(chave)
+            metricas.cache('paginas', entrada is not None)
+            if entrada is None:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200 or session.modified or resposta.is_streamed:
+                    return resposta
+                if versao_dados() != chave[-1]:
+                    return resposta # A view carregou dados mais novos que a chave (ex.: primeira carga)
+                _cache_paginas.guardar(chave, resposta.get_data(), resposta.mimetype)
+            else:
+                corpo, mimetype = entrada
+                resposta = Response(corpo, mimetype=mimetype)
+        resposta.set_etag(etag)
+        # O navegador guarda a página, mas revalida a cada acesso (If-None-Match)
+        resposta.cache_control.private = True
+        resposta.cache_control.no_cache = True
+        return resposta
+    return envolver
+
+# -------------------- Gráficos dos Relatórios --------------------
+# O desenho e a memoização ficam em graficos.py; aqui só as séries, tiradas do cubo.
+
+def _periodo_relatorio(start: str | None, end: str | None) -> str:
+    inicio, fim = _data_filtro(start), _data_filtro(end)
+    if inicio is not None and fim is not None:
+        return f"{inicio:%d/%m/%Y} a {fim:%d/%m/%Y}"
+    if inicio is not None:
+        return f"A partir de {inicio:%d/%m/%Y}"
+    if fim is not None:
+        return f"Até {fim:%d/%m/%Y}"
+    return "Período Completo"
+
+GRAFICOS_RELATORIO_GERAL = ('mes', 'sala', 'prazo_setor')
+GRAFICOS_RELATORIO_TUTOR = ('tutor',)
+
+def series_grafico(nome: str, start: str | None, end: str | None) -> dict:
+    """Argumentos de graficos.desenhar() para o gráfico 'nome' no intervalo [start, end]."""
+    titulo = f"{graficos.GRAFICOS[nome]} ({_periodo_relatorio(start, end)})"
+    if nome == 'prazo_setor':
+        por_status = consultar_cubo(start, end, ['Status'])
+        totais = por_status.sum() if not por_status.empty else None
+        series = {
+            resultado: [int(totais[f'{setor}|{resultado}']) if totais is not None else 0
+                        for setor in SETORES_ATENDIMENTO]
+            for resultado in agregacoes.RESULTADOS_PRAZO
+        }
+        return {'titulo': titulo, 'rotulos': list(SETORES_ATENDIMENTO), 'series': series}
+
+    chave = {'mes': 'Mes', 'sala': 'Sala', 'tutor': 'Tutor'}[nome]
+    agregado = consultar_cubo(start, end, [chave])['Total']
+    if nome == 'mes':
+        agregado = agregado.drop(agregacoes.SEM_DATA, errors='ignore')
+        rotulos = [f"{mes[5:]}/{mes[:4]}" for mes in agregado.index]
+    else:
+        rotulos = [str(r) for r in agregado.index]
+    return {
+        'titulo': titulo, 'rotulos': rotulos, 'series': {'Total': [int(v) for v in agregado]},
+        'horizontal': nome != 'mes',
+    }
+
+def chave_grafico(nome: str, start: str | None, end: str | None) -> tuple:
+    """(gráfico, filtros, versão dos dados): datas inválidas valem como ausentes, como nos relatórios."""
+    inicio, fim = _data_filtro(start), _data_filtro(end)
+    return (
+        nome,
+        inicio.date().isoformat() if inicio is not None else None,
+        fim.date().isoformat() if fim is not None else None,
+        versao_dados(),
+    )
+
+def pre_agendar_graficos(nomes, start: str | None, end: str | None):
+    """Começa a desenhar os gráficos da página enquanto o HTML segue para o navegador."""
+    for nome in nomes:
+        graficos.pre_agendar(chave_grafico(nome, start, end), lambda nome=nome: series_grafico(nome, start, end))
+
+def obter_grafico(nome: str, start: str | None, end: str | None) -> bytes | None:
+    return graficos.obter(chave_grafico(nome, start, end), lambda: series_grafico(nome, start, end))
 
 # -------------------- Rotas do Flask --------------------
 
-@app.route("/")
+@rota("/")
 def home():
     return render_template("home.html")
 
-@app.route("/relatorio_inicial", methods=["GET", "POST"])
+@rota("/relatorio_inicial", methods=["GET", "POST"])
 def relatorio_inicial():
     return render_template("relatorio_inicial.html")
 
-@app.route("/relatorio_tutoraluno", methods=["GET", "POST"])
+@rota("/relatorio_tutoraluno", methods=["GET", "POST"])
 def relatorio_tutoraluno():
-    return render_template("relatorio_tutoraluno.html")
+    return render_template("relatorio_tutoraluno.html", dados=calcular_relatorio_tutor_ocorrencias())
 
-@app.route("/index")
+@rota("/index")
+@pagina_em_cache
 def index():
-    df = carregar_dados()
-   
-    tutores_disp = sorted(df['Tutor'].unique().tolist()) if not df.empty and 'Tutor' in df.columns else []
     status_disp = ['ATENDIMENTO', 'FINALIZADA', 'ASSINADA', 'ABERTA']
 
     filtro_tutor = request.args.get('tutor')
     filtro_status = request.args.get('status')
-    
-    ocorrencias_filtradas = df.copy()
-    
-    ocorrencias_filtradas = ocorrencias_filtradas.apply(calculate_display_status_and_color, axis=1)
-
-    if filtro_tutor:
-        ocorrencias_filtradas = ocorrencias_filtradas[ocorrencias_filtradas['Tutor'] == filtro_tutor]
-    
-    if filtro_status:
-        ocorrencias_filtradas = ocorrencias_filtradas[ocorrencias_filtradas['DisplayStatus'] == filtro_status]
-    
-    if 'Nº Ocorrência' in ocorrencias_filtradas.columns:
-        ocorrencias_filtradas = ocorrencias_filtradas.sort_values(by='Nº Ocorrência', ascending=False)
-
+    busca = request.args.get('q', '').strip()
+    pagina_busca = max(request.args.get('pagina', 1, type=int), 1)
+
+    # Paginação por keyset: 'apos' = último Nº exibido (página seguinte),
+    # 'antes' = primeiro Nº exibido (página anterior)
+    cursor_apos = request.args.get('apos', type=int)
+    cursor_antes = request.args.get('antes', type=int) if cursor_apos is None else None
+    por_pagina = min(max(request.args.get('por_pagina', POR_PAGINA_PADRAO, type=int), 1), POR_PAGINA_MAX)
+    mostrar_total = request.args.get('total') == '1'
+    total, total_exato = None, True
+
+    # Busca uma linha a mais para saber se existe página além desta
+    repo = obter_repositorio()
+    if busca:
+        # Busca textual: índice invertido sobre o cache, resultados por relevância
+        # (paginados por posição, já que a ordem não é a do Nº)
+        carregar_dados()
+        tutores_disp = obter_tutores()
+        status_df = obter_status_ocorrencias()
+        resultado = buscar_ocorrencias_texto(busca, filtro_tutor, filtro_status, status_df)
+        total = len(resultado)
+        inicio = (pagina_busca - 1) * por_pagina
+        pagina = resultado.iloc[inicio:inicio + por_pagina + 1]
+    elif repo and repo.filtros_no_banco:
+        # Motor local: filtros e cursor rodam como SQL indexado (LIMIT)
+        tutores_disp = obter_tutores()
+        linhas = repo.consultar_ocorrencias(tutor=filtro_tutor, status=filtro_status,
+                                            apos=cursor_apos, antes=cursor_antes, limite=por_pagina + 1)
+        pagina = montar_dataframe_ocorrencias(linhas)
+        status_df = calcular_status_ocorrencias(pagina)
+        if mostrar_total:
+            total = repo.contar_ocorrencias(tutor=filtro_tutor, status=filtro_status)
+    else:
+        df = carregar_dados()
+        tutores_disp = obter_tutores()
+        # Status/prazos do frame inteiro, calculados uma vez por versão dos dados
+        status_df = obter_status_ocorrencias()
+        if filtro_tutor:
+            # Índice por tutor: pagina só as linhas do tutor (o índice do frame é preservado)
+            indices = obter_indices_ocorrencias()
+            df = indices['df'].iloc[indices['tutor'].get(filtro_tutor, [])]
+        pagina = paginar_ocorrencias(df, None, filtro_status, apos=cursor_apos, antes=cursor_antes,
+                                     limite=por_pagina + 1, status_df=status_df)
+        if mostrar_total:
+            total, total_exato = estimar_total_ocorrencias(df, None, filtro_status, status_df=status_df)
+
+    if busca:
+        tem_anterior = pagina_busca > 1
+        tem_proxima = len(pagina) > por_pagina
+        pagina = pagina.head(por_pagina)
+    elif cursor_antes is not None:
+        tem_anterior = len(pagina) > por_pagina
+        pagina = pagina.tail(por_pagina)
+        # Há página seguinte só se restar alguma linha mais antiga que a última exibida
+        # (o cursor pode ser o último Nº do filtro ou ter sido excluído)
+        ultimo = int(pagina['Nº Ocorrência'].min()) if not pagina.empty else cursor_antes + 1
+        if repo and repo.filtros_no_banco:
+            tem_proxima = bool(repo.consultar_ocorrencias(tutor=filtro_tutor, status=filtro_status,
+                                                          apos=ultimo, limite=1))
+        else:
+            tem_proxima = not paginar_ocorrencias(df, None, filtro_status, apos=ultimo, limite=1,
+                                                  status_df=status_df).empty
+    else:
+        tem_anterior = cursor_apos is not None
+        tem_proxima = len(pagina) > por_pagina
+        pagina = pagina.head(por_pagina)
 
-    ocorrencias_lista = ocorrencias_filtradas.to_dict('records')
+    pagina = formatar_exibicao(pagina.join(status_df.reindex(pagina.index)))
+    ocorrencias_lista = pagina.to_dict('records')
 
+    ids_pagina = [r['Nº Ocorrência'] for r in ocorrencias_lista]
     return render_template("index.html",
                            registros=ocorrencias_lista,
                            tutores_disp=tutores_disp,
                            tutor_sel=filtro_tutor,
                            status_disp=status_disp,
-                           status_sel=filtro_status)
+                           status_sel=filtro_status,
+                           por_pagina=por_pagina,
+                           cursor_anterior=ids_pagina[0] if ids_pagina and tem_anterior else None,
+                           cursor_proxima=ids_pagina[-1] if ids_pagina and tem_proxima else None,
+                           total=total,
+                           total_exato=total_exato,
+                           mostrar_total=mostrar_total,
+                           busca=busca,
+                           pagina_busca=pagina_busca)
 
 # -------------------- API para Nova Ocorrência --------------------
 
-@app.route("/api/alunos_por_sala/<sala>")
+@rota("/api/alunos_por_sala/<sala>")
 def alunos_por_sala(sala):
     """Retorna lista de alunos e seus tutores para uma sala específica."""
-    df_alunos = carregar_dados_alunos()
-    alunos_filtrados = df_alunos[df_alunos['Sala'].str.upper() == sala.upper()]
-    resultado = alunos_filtrados[['Aluno', 'Tutor']].to_dict('records')
-    return jsonify(resultado)
+    carregar_dados_alunos()
+    return jsonify((_alunos_por_sala or {}).get(sala.strip().upper(), []))
+
+@rota("/api/alunos")
+def roster_alunos():
+    """Mapa completo SALA -> [{'Aluno', 'Tutor'}] numa resposta só, com ETag e gzip."""
+    carregar_dados_alunos()
+    if _roster_alunos is None:
+        return jsonify({})
+    if request.if_none_match.contains(_roster_alunos['etag']):
+        resposta = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        resposta = Response(_roster_alunos['gzip'], mimetype='application/json')
+        resposta.headers['Content-Encoding'] = 'gzip'
+    else:
+        resposta = Response(_roster_alunos['json'], mimetype='application/json')
+    resposta.set_etag(_roster_alunos['etag'])
+    resposta.vary.add('Accept-Encoding')
+    resposta.cache_control.private = True
+    resposta.cache_control.max_age = ROSTER_MAX_AGE_SEG
+    return resposta
+
+@rota("/api/alunos/busca")
+def buscar_alunos():
+    """Alunos cujo nome começa com 'q' (sem diferenciar acentos/maiúsculas), opcionalmente só de uma sala."""
+    carregar_dados_alunos()
+    prefixo = normalizar_nome(request.args.get('q', ''))
+    sala = request.args.get('sala', '').strip().upper()
+    limite = min(max(request.args.get('limite', 20, type=int), 1), 100)
+    if not prefixo or not _busca_alunos:
+        return jsonify([])
+    encontrados = []
+    inicio = bisect.bisect_left(_busca_alunos, (prefixo,))
+    for nome, aluno, sala_aluno, tutor in _busca_alunos[inicio:]:
+        if not nome.startswith(prefixo) or len(encontrados) >= limite:
+            break
+        if not sala or sala_aluno == sala:
+            encontrados.append({'Aluno': aluno, 'Sala': sala_aluno, 'Tutor': tutor})
+    return jsonify(encontrados)
+
+@rota("/metrics")
+def metrics():
+    """Métricas de desempenho no formato do Prometheus (somadas entre os workers)."""
+    metricas.gravar(forcar=True)
+    return Response(metricas.exposicao(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@rota("/api/memoria")
+def memoria_ocorrencias():
+    """Uso de memória do cache de ocorrências, em bytes por coluna."""
+    return jsonify(relatorio_memoria(carregar_dados()))
 
 # -------------------- Rota de Nova Ocorrência (Corrigida) --------------------
 
@@ -366,14 +1634,17 @@ def alunos_por_sala(sala):
 
 # app.py (dentro da função nova)
 
-@app.route("/nova", methods=["GET", "POST"])
+@rota("/nova", methods=["GET", "POST"])
 def nova():
-    supabase = conectar_supabase()
-    if not supabase:
+    repo = obter_repositorio()
+    if not repo:
         flash("Erro ao conectar ao banco de dados.", "danger")
         return redirect(url_for("index"))
 
     if request.method == "POST":
+        if modo_somente_leitura():
+            flash("Banco de dados indisponível: o sistema está em modo somente leitura.", "warning")
+            return redirect(url_for("index"))
         try:
             # Captura dos campos do formulário
             professor = request.form.get("professor")
@@ -418,9 +1689,10 @@ def nova():
                 "STATUS": "ATENDIMENTO" 
             }
 
-            # Insere no Supabase e limpa o cache
-            supabase.table("ocorrencias").insert(dados_insercao).execute()
-            limpar_caches()
+            # Insere no banco e aplica a linha devolvida ao cache (sem reler a tabela)
+            linha = repo.inserir_ocorrencia(dados_insercao)
+            if not aplicar_escrita_no_cache([linha] if linha else []):
+                registrar_escrita_ocorrencias([linha['ID']] if linha else ())
             flash("Ocorrência registrada com sucesso!", "success")
             return redirect(url_for("index"))
 
@@ -431,102 +1703,17 @@ def nova():
             return redirect(url_for("index"))
     
     # RENDERIZA O FORMULÁRIO (GET)
+    # Alunos junto: o formulário pede o /api/alunos logo em seguida
+    carregar_tabelas('professores', 'salas', 'alunos')
     return render_template("nova.html",
                            professores=carregar_professores(),
                            salas=carregar_salas())
     
 # -------------------- Rota de Geração de PDF do Aluno --------------------
-# O código do PDF é extenso, garantindo que todas as funções auxiliares e rotas estejam inclusas
-# e que a função gerar_pdf_ocorrencias (não usada diretamente na rota) e a classe PDF estejam presentes.
-
-# PDF GENERATION CLASS
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.set_draw_color(0, 51, 102) 
-        self.cell(0, 10, 'RELATÓRIO DE REGISTRO DE OCORRÊNCIAS', 'B', 1, 'C')
-        self.set_font('Arial', '', 10)
-        self.cell(0, 5, 'E.E. PEI PROFESSOR IRENE DIAS RIBEIRO', 0, 1, 'C')
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}/{{nb}}', 0, 0, 'C')
-
-def _adicionar_ocorrencia_ao_pdf(pdf, ocorrencia):
-    """Adiciona os detalhes de uma única ocorrência ao objeto PDF."""
-    w_label = 45
-    w_value = 145
-    
-    pdf.set_font('Arial', 'B', 10)
-    pdf.set_fill_color(240, 240, 240)
-    
-    def add_meta_row(label, value):
-        value_display = str(value).split(' ')[0] if label == 'Data:' and value else str(value)
-
-        pdf.set_font('Arial', 'B', 10)
-        pdf.cell(w_label, 7, label, 'LR', 0, 'L', 1) 
-        pdf.set_font('Arial', '', 10)
-        pdf.cell(w_value, 7, value_display, 'LR', 1, 'L', 0) 
-
-    pdf.set_draw_color(0, 0, 0)
-    pdf.cell(w_label + w_value, 0, '', 'T', 1, 'L') 
-    
-    add_meta_row('Aluno:', ocorrencia.get('Aluno', 'N/D'))
-    add_meta_row('Tutor:', ocorrencia.get('Tutor', 'N/D'))
-    add_meta_row('Data:', ocorrencia.get('DCO', 'N/D'))
-    add_meta_row('Professor:', ocorrencia.get('PROFESSOR', 'N/D'))
-    
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(w_label, 7, 'Sala:', 'LBR', 0, 'L', 1) 
-    pdf.set_font('Arial', '', 10)
-    pdf.cell(w_value, 7, ocorrencia.get('Sala', 'N/D'), 'RBT', 1, 'L', 0) 
-    
-    pdf.ln(2)
-    
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(w_label, 7, 'Ocorrência nº:', 1, 0, 'L', 1)
-    pdf.set_font('Arial', '', 10)
-    pdf.cell(w_value / 2, 7, str(ocorrencia.get('Nº Ocorrência', 'N/D')), 1, 0, 'L') 
-
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(w_label / 2, 7, 'Hora:', 1, 0, 'L', 1)
-    pdf.set_font('Arial', '', 10)
-    pdf.cell(w_value / 2 - w_label / 2, 7, ocorrencia.get('HCO', 'N/D'), 1, 1, 'L')
-    
-    pdf.ln(5)
-
-    def adicionar_bloco_texto(label, campo_db):
-        pdf.set_font('Arial', 'B', 10)
-        pdf.cell(0, 7, label, 1, 1, 'L', 1)
-        pdf.set_font('Arial', '', 10)
-        conteudo = ocorrencia.get(campo_db, '').strip()
-        if not conteudo:
-             conteudo = 'NÃO APLICÁVEL'
-        pdf.multi_cell(0, 6, conteudo, 1, 'L', 0) 
-        pdf.ln(2)
-
-    adicionar_bloco_texto('Descrição:', 'Descrição da Ocorrência') 
-    adicionar_bloco_texto('Atendimento Professor:', 'Atendimento Professor') # Usando nome mapeado
-    adicionar_bloco_texto('Atendimento Tutor (Se solicitado):', 'ATT')
-    adicionar_bloco_texto('Atendimento Coordenação (Se solicitado):', 'ATC')
-    adicionar_bloco_texto('Atendimento Gestão (Se solicitado):', 'ATG')
-    
-    pdf.ln(10)
-    
-    pdf.set_font('Arial', 'B', 10)
-    pdf.cell(100, 7, 'Assinatura Responsável:', 0, 0, 'L')
-    pdf.cell(0, 7, 'Data:       /       /       ', 0, 1, 'L')
-    
-    pdf.ln(5)
-    pdf.set_font('Arial', '', 8)
-    pdf.cell(0, 1, '-' * 125, 0, 1, 'L') 
-    pdf.set_font('Arial', 'I', 8)
-    pdf.cell(0, 5, 'Ocorrência registrada no SGCE.', 0, 1, 'R')
-    
+# A classe PDF e o layout de cada ocorrência ficam em pdf_ocorrencias.py
+# (compartilhados com a exportação em lote).
 
-@app.route("/gerar_pdf_aluno", methods=["POST"])
+@rota("/gerar_pdf_aluno", methods=["POST"])
 def gerar_pdf_aluno():
     aluno = request.form.get("aluno")
     sala = request.form.get("sala")
@@ -536,118 +1723,370 @@ def gerar_pdf_aluno():
         flash("Nenhuma ocorrência selecionada.", "warning")
         return redirect(url_for("relatorio_aluno", sala=sala, aluno=aluno))
 
-    supabase = conectar_supabase()
-    if not supabase:
+    repo = obter_repositorio()
+    if not repo:
         flash("Erro ao conectar ao banco de dados.", "danger")
         return redirect(url_for("relatorio_aluno", sala=sala, aluno=aluno))
 
     selecionadas = [int(x) for x in selecionadas]
 
-    # Busca no Supabase as ocorrências selecionadas
-    response = supabase.table("ocorrencias").select("*").in_("ID", selecionadas).execute()
-    ocorrencias_db = response.data
-    
-    # Busca dados no DF para ter os nomes mapeados (Ex: 'Nº Ocorrência' em vez de 'ID')
-    df = carregar_dados() 
-    df_selecionadas = df[df['Nº Ocorrência'].isin(selecionadas)].to_dict('records')
+    # Uma única consulta pelas ocorrências selecionadas, já com os nomes mapeados
+    # (Ex: 'Nº Ocorrência' em vez de 'ID')
+    df = montar_dataframe_ocorrencias(repo.buscar_ocorrencias(selecionadas))
+    df_selecionadas = formatar_exibicao(df.sort_values('Nº Ocorrência', ascending=False)).to_dict('records')
+    if not df_selecionadas:
+        # Nenhuma das selecionadas existe mais: nada a imprimir nem a assinar
+        flash("As ocorrências selecionadas não foram encontradas.", "warning")
+        return redirect(url_for("relatorio_aluno", sala=sala, aluno=aluno))
 
+    with metricas.medir('sgce_pdf_segundos', etapa='pdf', origem='aluno'):
+        conteudo_pdf = pdf_ocorrencias.gerar_pdf_ocorrencias(df_selecionadas)
 
-    pdf = PDF('P', 'mm', 'A4')
-    pdf.alias_nb_pages() # Habilita o contador de páginas {{nb}}
-    pdf.add_page()
-    
-    # CORREÇÃO: Usar a função auxiliar para adicionar o conteúdo formatado
-    for row in df_selecionadas:
-        pdf.add_page()
-        _adicionar_ocorrencia_ao_pdf(pdf, row)
-
-        # Atualizar status no Supabase (no DB, não no DF)
-        supabase.table("ocorrencias").update({"STATUS": "ASSINADA"}) \
-            .eq("ID", row["Nº Ocorrência"]).execute()
-        
-    limpar_caches() # Limpa o cache para refletir o status atualizado
+    # Atualizar status no banco: um único UPDATE ... WHERE ID IN (...)
+    ids_assinadas = [row["Nº Ocorrência"] for row in df_selecionadas]
+    try:
+        linhas = repo.atualizar_ocorrencias(ids_assinadas, {"STATUS": "ASSINADA"})
+    except Exception as e:
+        flash(f"Erro ao marcar as ocorrências como assinadas: {e}", "danger")
+        return redirect(url_for("relatorio_aluno", sala=sala, aluno=aluno))
+    if not aplicar_escrita_no_cache(linhas):
+        registrar_escrita_ocorrencias(ids_assinadas) # Sincroniza o status atualizado no cache
 
-    pdf_output = BytesIO(pdf.output(dest='S').encode('latin-1'))
-    pdf_output.seek(0)
+    pdf_output = BytesIO(conteudo_pdf)
 
     return send_file(pdf_output, as_attachment=True, download_name=f"Relatorio_{aluno}.pdf", mimetype="application/pdf")
 
+# -------------------- Exportação de Dados --------------------
+
+EXPORTACAO_BLOCO = int(os.environ.get('IDR_EXPORTACAO_BLOCO', '5000')) # Linhas por bloco do streaming
+COLUNAS_EXPORTACAO = list(FINAL_COLUMNS_MAP.values())
+
+def _no_periodo(df: pd.DataFrame, inicio=None, fim=None) -> np.ndarray:
+    """Máscara das ocorrências com data entre inicio e fim (inclusive)."""
+    dias = _datas_ocorrencia(df)
+    mascara = dias.notna()
+    if inicio is not None:
+        mascara &= dias >= inicio
+    if fim is not None:
+        mascara &= dias <= fim
+    return mascara.to_numpy()
+
+def selecionar_posicoes_cache(sala=None, tutor=None, status=None, inicio=None, fim=None):
+    """(frame em cache, posições das linhas que atendem aos filtros), sem copiar o frame.
+
+    As posições seguem a ordem do cache (Nº decrescente).
+    """
+    indices = obter_indices_ocorrencias()
+    df = indices['df']
+    if df.empty:
+        return df, np.arange(0)
+    if tutor:
+        posicoes = np.asarray(indices['tutor'].get(tutor.strip().upper(), []), dtype=np.intp)
+    else:
+        posicoes = np.arange(len(df))
+    if sala:
+        posicoes = posicoes[(df['Sala'] == sala.strip().upper()).to_numpy()[posicoes]]
+    if status:
+        status_df = obter_status_ocorrencias()
+        if len(status_df) == len(df):
+            display = status_df['DisplayStatus'].to_numpy()[posicoes]
+        else:
+            display = calcular_status_exibicao(df.iloc[posicoes])['DisplayStatus'].to_numpy()
+        posicoes = posicoes[display == status]
+    if inicio is not None or fim is not None:
+        posicoes = posicoes[_no_periodo(df.iloc[posicoes], inicio, fim)]
+    return df, posicoes
+
+def _formatar_bloco_exportacao(bloco: pd.DataFrame) -> pd.DataFrame:
+    """Colunas de exportação (nomes do FINAL_COLUMNS_MAP) com as datas como texto."""
+    saida = formatar_exibicao(bloco.reindex(columns=COLUNAS_EXPORTACAO))
+    texto = [c for c in COLUNAS_EXPORTACAO if c != 'Nº Ocorrência']
+    saida[texto] = saida[texto].astype(object)
+    return saida.fillna('')
+
+def blocos_exportacao(sala=None, tutor=None, status=None, inicio=None, fim=None, tamanho=EXPORTACAO_BLOCO):
+    """Gera as ocorrências filtradas em blocos de até 'tamanho' linhas, já formatados."""
+    repo = obter_repositorio()
+    if repo and repo.filtros_no_banco:
+        # Motor local: percorre o resultado por keyset, um bloco por consulta
+        apos = None
+        while True:
+            linhas = repo.consultar_ocorrencias(tutor=tutor, status=status, sala=sala, apos=apos, limite=tamanho)
+            if not linhas:
+                return
+            bloco = montar_dataframe_ocorrencias(linhas)
+            apos = int(bloco['Nº Ocorrência'].min())
+            if inicio is not None or fim is not None:
+                bloco = bloco[_no_periodo(bloco, inicio, fim)]
+            yield _formatar_bloco_exportacao(bloco)
+            if len(linhas) < tamanho:
+                return
+    else:
+        df, posicoes = selecionar_posicoes_cache(sala, tutor, status, inicio, fim)
+        for i in range(0, len(posicoes), tamanho):
+            yield _formatar_bloco_exportacao(df.iloc[posicoes[i:i + tamanho]])
+
+@rota("/exportar/ocorrencias.<formato>")
+def exportar_ocorrencias(formato):
+    """Exporta as ocorrências filtradas (sala, tutor, status, período) em CSV, Parquet ou XLSX."""
+    if formato not in exportacao_dados.FORMATOS:
+        abort(404)
+    mimetype, disponivel = exportacao_dados.FORMATOS[formato]
+    if not disponivel:
+        return f"Exportação em {formato.upper()} indisponível: dependência não instalada no servidor.", 501
+
+    sala = request.args.get("sala") or None
+    tutor = request.args.get("tutor") or None
+    status = request.args.get("status") or None
+    data_inicio = request.args.get("data_inicio") or None
+    data_fim = request.args.get("data_fim") or None
+
+    blocos = blocos_exportacao(sala, tutor, status, _data_filtro(data_inicio), _data_filtro(data_fim))
+    if formato == 'csv':
+        corpo = exportacao_dados.gerar_csv(blocos, COLUNAS_EXPORTACAO)
+    elif formato == 'parquet':
+        corpo = exportacao_dados.gerar_parquet(blocos, COLUNAS_EXPORTACAO, colunas_inteiras=['Nº Ocorrência'])
+    else:
+        corpo = exportacao_dados.gerar_xlsx(blocos, COLUNAS_EXPORTACAO)
+
+    nome = exportacao_pdf.nome_arquivo('ocorrencias', sala, tutor, status, data_inicio, data_fim)
+    return Response(corpo, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{nome}.{formato}"'})
+
+# -------------------- Exportação de PDFs em Lote --------------------
+
+def selecionar_ocorrencias_exportacao(sala=None, tutor=None, inicio=None, fim=None) -> pd.DataFrame:
+    """Ocorrências da sala/tutor/período, ordenadas por sala, aluno e Nº decrescente."""
+    repo = obter_repositorio()
+    if repo and repo.filtros_no_banco:
+        df = montar_dataframe_ocorrencias(repo.consultar_ocorrencias(tutor=tutor, sala=sala))
+        if not df.empty and (inicio is not None or fim is not None):
+            df = df[_no_periodo(df, inicio, fim)]
+    else:
+        df, posicoes = selecionar_posicoes_cache(sala, tutor, None, inicio, fim)
+        df = df.iloc[posicoes]
+    if df.empty:
+        return df
+    return df.sort_values(['Sala', 'Aluno', 'Nº Ocorrência'], ascending=[True, True, False])
+
+@rota("/exportar_pdf", methods=["POST"])
+def exportar_pdf():
+    """Agenda a exportação em lote; o progresso é acompanhado em /exportar_pdf/<id>."""
+    sala = request.form.get("sala") or None
+    tutor = request.form.get("tutor") or None
+    data_inicio = request.form.get("data_inicio") or None
+    data_fim = request.form.get("data_fim") or None
+    formato = request.form.get("formato", "zip")
+
+    if formato not in exportacao_pdf.FORMATOS:
+        return jsonify({"erro": f"Formato inválido: {formato}"}), 400
+    if not (sala or tutor or data_inicio or data_fim):
+        return jsonify({"erro": "Informe a sala, o tutor ou o período."}), 400
+
+    df = selecionar_ocorrencias_exportacao(sala, tutor, _data_filtro(data_inicio), _data_filtro(data_fim))
+    if df.empty:
+        return jsonify({"erro": "Nenhuma ocorrência encontrada para os filtros."}), 404
+
+    # Um PDF por (sala, aluno); Sala/Aluno já vêm normalizados do montar_dataframe_ocorrencias
+    grupos = exportacao_pdf.nomes_unicos(
+        (exportacao_pdf.nome_arquivo(s, a), g.to_dict('records'))
+        for (s, a), g in formatar_exibicao(df).groupby(['Sala', 'Aluno'], sort=False, observed=True)
+    )
+    titulo = exportacao_pdf.nome_arquivo('Ocorrencias', sala, tutor, data_inicio, data_fim)
+    job_id = exportacao_pdf.iniciar(grupos, formato, titulo)
+    return jsonify({
+        "id": job_id,
+        "status": url_for("status_exportacao_pdf", job_id=job_id),
+        "arquivo": url_for("baixar_exportacao_pdf", job_id=job_id),
+    }), 202
+
+@rota("/exportar_pdf/<job_id>")
+def status_exportacao_pdf(job_id):
+    estado = exportacao_pdf.ler_estado(job_id)
+    if not estado:
+        return jsonify({"erro": "Exportação não encontrada."}), 404
+    return jsonify(estado)
+
+@rota("/exportar_pdf/<job_id>/arquivo")
+def baixar_exportacao_pdf(job_id):
+    caminho = exportacao_pdf.caminho_resultado(job_id)
+    if not caminho:
+        abort(404)
+    estado = exportacao_pdf.ler_estado(job_id)
+    mimetype = "application/zip" if estado['formato'] == 'zip' else "application/pdf"
+    return send_file(caminho, as_attachment=True, download_name=f"{estado['titulo']}.{estado['formato']}",
+                     mimetype=mimetype)
+
 # -------------------- Rotas de Relatórios --------------------
 
-@app.route("/relatorio_estatistica_tutor", methods=["GET"])
+@rota("/relatorio_estatistica_tutor", methods=["GET"])
 def relatorio_estatistica_tutor():
     """Rota para gerar a estatística de atendimento por tutor."""
     
     data_inicio_str = request.args.get("start")
     data_fim_str = request.args.get("end")
     
-    df_completo = carregar_dados()
-    
-    relatorio_dados = calcular_relatorio_estatistico_tutor(
-        df_completo, 
-        data_inicio_str, 
-        data_fim_str
-    )
+    relatorio_dados = calcular_relatorio_estatistico_tutor(data_inicio_str, data_fim_str)
     
     return render_template(
-        "relatorio_estatistica_tutor.html",
+        "relatorio_tutor.html",
         relatorio=relatorio_dados,
         start=data_inicio_str,
         end=data_fim_str
     )
 
-@app.route("/relatorio_alunos_tutor")
+@rota("/relatorio_alunos_tutor")
+@pagina_em_cache
 def relatorio_alunos_tutor():
     """Rota para gerar o relatório de alunos e suas ocorrências agrupado por tutor."""
     dados_relatorio = calcular_relatorio_tutor_ocorrencias()
     
     return render_template(
-        "relatorio_tutor_ocorrencias.html",
+        "relatorio_tutoraluno.html",
         dados=dados_relatorio
     )
 
-@app.route("/relatorio_geral")
+@rota("/relatorio_geral")
+@pagina_em_cache
 def relatorio_geral():
-    estatisticas_resumo = calcular_relatorio_estatistico()
-    relatorio_salas = calcular_relatorio_por_sala()
+    data_inicio = request.args.get("data_inicio") or request.args.get("start")
+    data_fim = request.args.get("data_fim") or request.args.get("end")
+    estatisticas_resumo = calcular_relatorio_estatistico(data_inicio, data_fim)
+    relatorio_salas = calcular_relatorio_por_sala(data_inicio, data_fim)
+    if estatisticas_resumo['total']:
+        pre_agendar_graficos(GRAFICOS_RELATORIO_GERAL, data_inicio, data_fim)
     return render_template(
         "relatorio_geral.html",
         resumo=estatisticas_resumo,
         salas=relatorio_salas,
-        data_geracao=datetime.now(TZ_SAO).strftime('%d/%m/%Y %H:%M:%S')
+        relatorio_sala=relatorio_salas,
+        relatorio_setor=estatisticas_resumo['setores'] if estatisticas_resumo['total'] else [],
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        # Sem data_geracao: a página fica no cache de páginas enquanto os dados não
+        # mudam, e um horário guardado junto com ela ficaria congelado
+        graficos=GRAFICOS_RELATORIO_GERAL if graficos.HAS_MATPLOTLIB else (),
     )
 
-@app.route("/relatorio_tutor")
+@rota("/relatorio_tutor")
 def relatorio_tutor():
-    df = carregar_dados()
     start_date_str = request.args.get('start')
     end_date_str = request.args.get('end')
-    relatorio = {'TUTOR A': {'total': 10, 'prazo': 8, 'fora': 1, 'nao': 1}}
-    return render_template("relatorio_tutor.html", relatorio=relatorio, start=start_date_str, end=end_date_str)
-
-@app.route("/relatorios")
+    relatorio = calcular_relatorio_estatistico_tutor(start_date_str, end_date_str)
+    if relatorio:
+        pre_agendar_graficos(GRAFICOS_RELATORIO_TUTOR, start_date_str, end_date_str)
+    return render_template("relatorio_tutor.html", relatorio=relatorio, start=start_date_str, end=end_date_str,
+                           graficos=GRAFICOS_RELATORIO_TUTOR if graficos.HAS_MATPLOTLIB else ())
+
+@rota("/grafico/<nome>.png")
+def grafico(nome):
+    """PNG de um gráfico dos relatórios (?start=&end=), com ETag pela chave da memoização."""
+    if nome not in graficos.GRAFICOS or not graficos.HAS_MATPLOTLIB:
+        abort(404)
+    start, end = request.args.get('start'), request.args.get('end')
+    chave = chave_grafico(nome, start, end)
+    # Sem o cache compartilhado cada worker tem o seu contador de versão
+    etag = cache_paginas.etag((chave, None if cache_compartilhado.HABILITADO else os.getpid()))
+    if request.if_none_match.contains(etag):
+        metricas.incrementar('sgce_cache_total', cache='graficos', resultado='nao_modificado')
+        resposta = Response(status=304)
+    else:
+        png = graficos.obter(chave, lambda: series_grafico(nome, start, end))
+        if png is None:
+            resposta = Response("Gráfico indisponível no momento.", status=503, mimetype="text/plain")
+            resposta.retry_after = 5
+            return resposta
+        resposta = Response(png, mimetype="image/png")
+    resposta.set_etag(etag)
+    resposta.cache_control.private = True
+    resposta.cache_control.no_cache = True
+    return resposta
+
+@rota("/relatorio_geral/pdf")
+def relatorio_geral_pdf():
+    """Relatório geral em PDF: os gráficos e as tabelas por sala e por setor."""
+    data_inicio = request.args.get("data_inicio") or request.args.get("start")
+    data_fim = request.args.get("data_fim") or request.args.get("end")
+    resumo = calcular_relatorio_estatistico(data_inicio, data_fim)
+    salas = calcular_relatorio_por_sala(data_inicio, data_fim)
+    tabelas = [
+        ("Ocorrências por Sala", ['Sala', 'Total Ocorrências', 'Porcentagem', 'Respondidas <7 dias',
+                                  'Respondidas >7 dias', 'Não Respondidas'], salas),
+        ("Resumo por Setor", ['Setor', 'Total', 'Respondidas <7 dias', 'Respondidas >7 dias', 'Não Respondidas'], [
+            dict(r, **{
+                'Respondidas <7 dias': f"{r['Respondidas <7 dias']} {r['Porc <7 dias']}",
+                'Respondidas >7 dias': f"{r['Respondidas >7 dias']} {r['Porc >7 dias']}",
+                'Não Respondidas': f"{r['Não Respondidas']} {r['Porc Não Resp']}",
+            })
+            for r in (resumo['setores'] if resumo['total'] else [])
+        ]),
+    ]
+    return _enviar_pdf_relatorio("ESTATÍSTICA GERAL DE OCORRÊNCIAS", "Relatorio_Geral",
+                                 GRAFICOS_RELATORIO_GERAL, tabelas, data_inicio, data_fim)
+
+@rota("/relatorio_tutor/pdf")
+def relatorio_tutor_pdf():
+    start = request.args.get('start')
+    end = request.args.get('end')
+    relatorio = calcular_relatorio_estatistico_tutor(start, end)
+    linhas = [
+        {'Tutor': tutor, 'Total': r['total'], 'No Prazo': r['prazo'], 'Fora do Prazo': r['fora'],
+         'Não Atendidas': r['nao']}
+        for tutor, r in relatorio.items()
+    ]
+    tabelas = [("Ocorrências por Tutor", ['Tutor', 'Total', 'No Prazo', 'Fora do Prazo', 'Não Atendidas'], linhas)]
+    return _enviar_pdf_relatorio("OCORRÊNCIAS POR TUTOR", "Relatorio_Tutor",
+                                 GRAFICOS_RELATORIO_TUTOR, tabelas, start, end)
+
+def _enviar_pdf_relatorio(titulo: str, arquivo: str, nomes_graficos, tabelas, start, end):
+    # Gráficos já desenhados para a página vêm da memoização; os que faltarem, do pool
+    imagens = [png for png in (obter_grafico(nome, start, end) for nome in nomes_graficos) if png]
+    with metricas.medir('sgce_pdf_segundos', etapa='pdf', origem='relatorio'):
+        conteudo = pdf_ocorrencias.gerar_pdf_relatorio(titulo, _periodo_relatorio(start, end), imagens, tabelas)
+    nome = exportacao_pdf.nome_arquivo(arquivo, start, end)
+    return send_file(BytesIO(conteudo), as_attachment=True, download_name=f"{nome}.pdf",
+                     mimetype="application/pdf")
+
+@rota("/recarregar_dados", methods=["POST"])
+def recarregar_dados():
+    """Recarga completa dos caches sob demanda."""
+    limpar_caches()
+    carregar_tabelas()
+    flash("Dados recarregados do banco.", "success")
+    return redirect(url_for("index"))
+
+@rota("/relatorios")
 def relatorios():
-    return render_template("relatorios.html")
+    return render_template("relatorios.html", salas=carregar_salas(), tutores=obter_tutores())
 
-@app.route("/tutoria")
+@rota("/tutoria")
 def tutoria(): 
     return render_template("tutoria.html")
 
 # -------------------- Rota de Edição --------------------
 
-@app.route("/editar/<int:oid>", methods=["GET", "POST"])
+@rota("/editar/<int:oid>", methods=["GET", "POST"])
 def editar(oid):
-    supabase = conectar_supabase()
-    if not supabase:
+    repo = obter_repositorio()
+    if not repo:
         flash("Erro ao conectar ao banco de dados.", "danger")
         return redirect(url_for("index"))
 
-    response = supabase.table('ocorrencias').select("*").eq("ID", oid).execute()
-    if not response.data or len(response.data) == 0:
-        flash(f"Ocorrência Nº {oid} não encontrada.", "danger")
+    if request.method == "POST" and modo_somente_leitura():
+        flash("Banco de dados indisponível: o sistema está em modo somente leitura.", "warning")
         return redirect(url_for("index"))
 
-    ocorrencia = response.data[0]
+    # Na exibição (GET) a linha sai do índice por ID do cache em memória. No POST
+    # ela sempre vem do banco: FT/FC/FG, datas e STATUS decidem o que é gravado, e
+    # o cache deste worker pode não ter visto uma edição feita em outro
+    ocorrencia = None
+    if request.method == "GET" and not repo.filtros_no_banco:
+        ocorrencia = ocorrencia_do_cache(oid)
+    if ocorrencia is None:
+        ocorrencia = repo.buscar_ocorrencia(oid)
+    if not ocorrencia:
+        flash(f"Ocorrência Nº {oid} não encontrada.", "danger")
+        return redirect(url_for("index"))
 
     if request.method == "POST":
         data = request.form
@@ -686,8 +2125,9 @@ def editar(oid):
             update_data["STATUS"] = "FINALIZADA"
 
         try:
-            supabase.table('ocorrencias').update(update_data).eq("ID", oid).execute()
-            limpar_caches() # Limpa o cache após a atualização
+            linha = repo.atualizar_ocorrencia(oid, update_data)
+            if not aplicar_escrita_no_cache([linha] if linha else []):
+                registrar_escrita_ocorrencias([oid]) # Sincroniza a linha alterada no cache
             flash(f"Ocorrência Nº {oid} atualizada com sucesso!", "success")
         except Exception as e:
             flash(f"Erro ao atualizar ocorrência: {e}", "danger")
@@ -714,37 +2154,34 @@ def editar(oid):
 
 # -------------------- Rota de Relatório de Aluno --------------------
 
-@app.route("/relatorio_aluno", methods=["GET", "POST"])
+@rota("/relatorio_aluno", methods=["GET", "POST"])
+@pagina_em_cache
 def relatorio_aluno():
     sala_sel = request.args.get("sala", "")
     aluno_sel = request.args.get("aluno", "")
-    supabase = conectar_supabase()
-    if not supabase:
+    repo = obter_repositorio()
+    if not repo:
         flash("Erro ao conectar ao banco de dados.", "danger")
         return redirect(url_for("relatorio_inicial"))
 
+    # Sala e aluno comparados como os nomes do cache (sem espaços nas pontas, em maiúsculas)
+    sala, aluno = normalizar_texto(sala_sel), normalizar_texto(aluno_sel)
     try:
-        response = supabase.table("ocorrencias").select("*").execute()
-        df = pd.DataFrame(response.data)
-
-        # Normalizar colunas de data/hora para exibição BR
-        if not df.empty:
-            # Note: Estas colunas vêm do DB, logo são uppercase. [cite: 34]
-            if "DCO" in df.columns:
-                df["DCO"] = pd.to_datetime(df["DCO"], errors="coerce").dt.strftime("%d/%m/%Y")
-            if "HCO" in df.columns:
-                df["HCO"] = pd.to_datetime(df["HCO"], errors="coerce").dt.strftime("%H:%M")
-            # Adicionar a coluna de nome mapeado para a descrição (DESCRICAO -> Descrição da Ocorrência)
-            df = df.rename(columns={'DESCRICAO': 'Descrição da Ocorrência', 'ID': 'Nº Ocorrência'})
-
-        if sala_sel:
-            df = df[df["SALA"] == sala_sel]
-        if aluno_sel:
-            df = df[df["ALUNO"] == aluno_sel]
-
-        salas = sorted(df["SALA"].dropna().unique().tolist()) if "SALA" in df.columns else []
-        alunos = sorted(df["ALUNO"].dropna().unique().tolist()) if "ALUNO" in df.columns else []
-        registros = df.to_dict(orient="records")
+        if repo.filtros_no_banco:
+            # Motor local: as listas de salas/alunos e só as linhas do aluno escolhido, em SQL indexado
+            alunos_por_sala = repo.listar_alunos_por_sala()
+            linhas = repo.consultar_ocorrencias(sala=sala, aluno=aluno) if aluno else []
+            ocorrencias = montar_dataframe_ocorrencias(linhas)
+        else:
+            # Índice Sala -> Aluno sobre o cache: só as linhas do aluno, sem ir ao banco
+            indices = obter_indices_ocorrencias()
+            alunos_por_sala = indices['sala_aluno']
+            posicoes = alunos_por_sala.get(sala, {}).get(aluno, []) if aluno else []
+            ocorrencias = indices['df'].iloc[posicoes]
+        df = formatar_exibicao(ocorrencias)
+        registros = df.assign(ID=df['Nº Ocorrência']).to_dict(orient="records")
+        salas = sorted(alunos_por_sala)
+        alunos = sorted(alunos_por_sala.get(sala, []))
 
     except Exception as e:
         flash(f"Erro ao carregar relatório de alunos: {e}", "danger")
@@ -753,6 +2190,7 @@ def relatorio_aluno():
     return render_template(
         "relatorio_aluno.html",
         registros=registros,
+        ocorrencias=registros,
         salas=salas,
         alunos=alunos,
         sala_sel=sala_sel,
@@ -760,13 +2198,56 @@ def relatorio_aluno():
     )
 
 
+# -------------------- Instrumentação das Rotas --------------------
+
+def _iniciar_medicao():
+    request.environ['sgce.inicio'] = time.perf_counter()
+    metricas.iniciar_requisicao()
+
+def _registrar_medicao(resposta):
+    """Tempo da rota no histograma (rótulo = regra da URL) e, se ligado, o cabeçalho Server-Timing."""
+    inicio = request.environ.get('sgce.inicio')
+    if inicio is None:
+        return resposta
+    duracao = time.perf_counter() - inicio
+    regra = request.url_rule.rule if request.url_rule else 'sem_rota'
+    metricas.observar('sgce_requisicao_segundos', duracao, rota=regra, metodo=request.method,
+                      status=resposta.status_code)
+    if metricas.SERVER_TIMING:
+        resposta.headers['Server-Timing'] = metricas.cabecalho_server_timing(duracao)
+    metricas.gravar()
+    return resposta
+
+# -------------------- Fábrica da Aplicação --------------------
+
+def criar_app(precarregar: bool | None = None) -> Flask:
+    """Cria a aplicação Flask com todas as rotas registradas.
+
+    Com precarregar (padrão: IDR_PRECARREGAR=1, definido pelo gunicorn.conf.py
+    quando o --preload está ativo) os módulos pesados e os templates são
+    carregados já aqui, no processo mestre, e compartilhados pelos workers.
+    """
+    nova_app = Flask(__name__)
+    nova_app.secret_key = os.environ.get('SECRET_KEY', 'default_key_insegura_para_teste_local')
+    for regra, funcao, opcoes in _rotas:
+        nova_app.add_url_rule(regra, view_func=funcao, **opcoes)
+    nova_app.before_request(_iniciar_medicao)
+    nova_app.after_request(_registrar_medicao)
+
+    if precarregar is None:
+        precarregar = os.environ.get('IDR_PRECARREGAR') == '1'
+    if precarregar:
+        importacao_tardia.precarregar()
+        for nome in nova_app.jinja_env.list_templates():
+            try:
+                nova_app.jinja_env.get_template(nome)
+            except Exception as e:
+                print(f"Template '{nome}' não pôde ser pré-compilado: {e}")
+    return nova_app
+
+app = criar_app() # Alvo do gunicorn (Procfile: gunicorn app:app)
+
 if __name__ == "__main__":
     # Comando de execução para Render
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=True, port=port)
-
-
-
-
-
-
@@ -0,0 +1,242 @@
+"""Benchmark das cargas e rotas principais sobre dados sintéticos, comparado a uma base gravada.
+
+Uso: python benchmarks/bench_rotas.py [--linhas 10000,100000] [--repeticoes 20] [--latencia-ms 20]
+                                       [--base benchmarks/base_rotas.json] [--gravar-base] [--tolerancia 0.5]
+
+Para cada tamanho, um processo novo gera as tabelas (dados_sinteticos.py), serve
+as tabelas pelo Supabase em processo (supabase_local.py, com latencia-ms por
+chamada) e mede:
+
+- carregar_dados a frio (recarga completa) e a quente (acerto do cache);
+- /index sem filtros, por tutor, por status e com busca textual;
+- /relatorio_aluno e calcular_relatorio_tutor_ocorrencias do aluno/tutor com mais ocorrências;
+- /gerar_pdf_aluno com as últimas ocorrências desse aluno.
+
+Cada caso roda uma vez para aquecer e depois 'repeticoes' vezes; saem p50, p90,
+p99 e máximo (ms). A memória é a do DataFrame de ocorrências e o quanto o RSS
+do processo cresceu desde antes da primeira carga (as tabelas do Supabase em
+processo ficam fora dessa conta). O cache de páginas fica desligado: mede-se o
+trabalho das rotas, não o acerto do HTML guardado.
+
+Sem --gravar-base, compara com a base: um caso regrediu quando o p50 ou o p90
+passou da base em mais de 'tolerancia' (e em mais de 2 ms); a memória, quando
+passou em mais de 'tolerancia' (e em mais de 5 MB). Havendo regressão, sai com
+código 1. As bases valem para a máquina em que foram gravadas.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DIRETORIO))
+sys.path.insert(0, DIRETORIO)
+
+BASE_PADRAO = os.path.join(DIRETORIO, 'base_rotas.json')
+REPETICOES_CARGA_FRIA = 5  # a recarga completa é a mais longa: menos repetições
+FOLGA_MS = 2.0
+FOLGA_MEMORIA_MB = 5.0
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def _rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+# -------------------- Medição (processo filho, um por tamanho) --------------------
+
+def _preparar_ambiente():
+    """Configuração do app para o benchmark; precisa vir antes do import do app."""
+    os.environ.update(
+        IDR_BACKEND='supabase',
+        SUPABASE_URL='http://supabase-local.invalid',
+        SUPABASE_KEY='local',
+        IDR_COLUNA_ATUALIZACAO='ATUALIZADO_EM',
+        IDR_CACHE_COMPARTILHADO='0',
+        IDR_SNAPSHOT_LOCAL='0',
+        IDR_CACHE_PAGINAS_BYTES='0',
+    )
+
+
+def medir_tamanho(linhas: int, repeticoes: int, latencia_ms: float) -> dict:
+    _preparar_ambiente()
+    import dados_sinteticos
+    from supabase_local import ClienteSupabaseLocal
+
+    tabelas = dados_sinteticos.gerar(linhas)
+    cliente = ClienteSupabaseLocal(tabelas, latencia_seg=latencia_ms / 1000)
+    gc.collect()
+    rss_inicial = _rss_mb()
+
+    import app
+    app.obter_cliente_supabase = lambda url, key: cliente
+    navegador = app.app.test_client()
+
+    # Aluno com mais ocorrências (e o tutor dele) para as rotas filtradas
+    contagem = {}
+    for r in tabelas['ocorrencias']:
+        chave = (r['SALA'], r['ALUNO'])
+        contagem[chave] = contagem.get(chave, 0) + 1
+    sala, aluno = max(contagem, key=contagem.get)
+    tutor = next(a['Tutor'] for a in tabelas['Alunos'] if a['Aluno'] == aluno).strip().upper()
+    ids_aluno = sorted((r['ID'] for r in tabelas['ocorrencias'] if r['ALUNO'] == aluno), reverse=True)[:10]
+
+    def obter(url):
+        def requisicao():
+            resposta = navegador.get(url)
+            assert resposta.status_code == 200, f'{url}: HTTP {resposta.status_code}'
+        return requisicao
+
+    def carga_fria():
+        app.forcar_recarga_ocorrencias()
+        app.carregar_dados()
+
+    def pdf_aluno():
+        resposta = navegador.post('/gerar_pdf_aluno', data={
+            'aluno': aluno, 'sala': sala, 'ocorrencias[]': [str(i) for i in ids_aluno]})
+        assert resposta.status_code == 200 and resposta.data[:4] == b'%PDF', 'gerar_pdf_aluno falhou'
+
+    casos = [
+        ('carregar_dados (frio)', carga_fria, min(repeticoes, REPETICOES_CARGA_FRIA)),
+        ('carregar_dados (quente)', app.carregar_dados, repeticoes),
+        ('/index', obter('/index'), repeticoes),
+        ('/index?tutor', obter('/index?' + urlencode({'tutor': tutor})), repeticoes),
+        ('/index?status', obter('/index?status=ATENDIMENTO'), repeticoes),
+        ('/index?q', obter('/index?q=celular'), repeticoes),
+        ('/relatorio_aluno', obter('/relatorio_aluno?' + urlencode({'sala': sala, 'aluno': aluno})), repeticoes),
+        ('calcular_relatorio_tutor_ocorrencias', app.calcular_relatorio_tutor_ocorrencias, repeticoes),
+        ('gerar_pdf_aluno', pdf_aluno, repeticoes),
+    ]
+
+    resultados = {}
+    for nome, funcao, vezes in casos:
+        funcao()  # aquecimento: derivados, templates e imports tardios
+        tempos = []
+        for _ in range(vezes):
+            gc.collect()
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        resultados[nome] = {
+            'p50': percentil(tempos, 50), 'p90': percentil(tempos, 90), 'p99': percentil(tempos, 99),
+            'max': max(tempos), 'n': vezes,
+        }
+
+    df = app.carregar_dados()
+    memoria = {
+        'df_mb': float(df.memory_usage(deep=True).sum()) / 2 ** 20,
+        'rss_app_mb': _rss_mb() - rss_inicial,
+        'pico_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    return {'casos': resultados, 'memoria': memoria, 'chamadas_supabase': cliente.chamadas}
+
+
+# -------------------- Comparação com a base --------------------
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list[str]:
+    """Mensagens das regressões de 'atual' em relação a 'base' (mesmos tamanhos)."""
+    regressoes = []
+    for tamanho, medicao in atual.items():
+        referencia = base.get(tamanho)
+        if not referencia:
+            continue
+        for nome, tempos in medicao['casos'].items():
+            anterior = referencia['casos'].get(nome)
+            if not anterior:
+                continue
+            for p in ('p50', 'p90'):
+                if tempos[p] > anterior[p] * (1 + tolerancia) and tempos[p] - anterior[p] > FOLGA_MS:
+                    regressoes.append(f'{tamanho} linhas, {nome}: {p} {anterior[p]:.1f} -> {tempos[p]:.1f} ms')
+        for nome in ('df_mb', 'rss_app_mb'):
+            anterior, valor = referencia['memoria'].get(nome), medicao['memoria'][nome]
+            if anterior and valor > anterior * (1 + tolerancia) and valor - anterior > FOLGA_MEMORIA_MB:
+                regressoes.append(f'{tamanho} linhas, {nome}: {anterior:.1f} -> {valor:.1f} MB')
+    return regressoes
+
+
+def imprimir(tamanho: str, medicao: dict, referencia: dict | None):
+    print(f"\n== {int(tamanho):,} ocorrências ({medicao['chamadas_supabase']} chamadas ao Supabase) ==")
+    print(f"{'caso':40s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'max':>9s} {'base p50':>9s} {'var':>7s}")
+    for nome, tempos in medicao['casos'].items():
+        anterior = (referencia or {}).get('casos', {}).get(nome)
+        base_p50 = f"{anterior['p50']:9.1f}" if anterior else f"{'-':>9s}"
+        variacao = f"{(tempos['p50'] / anterior['p50'] - 1) * 100:+6.0f}%" if anterior and anterior['p50'] else ''
+        print(f"{nome:40s} {tempos['p50']:9.1f} {tempos['p90']:9.1f} {tempos['p99']:9.1f} {tempos['max']:9.1f} "
+              f"{base_p50} {variacao:>7s}")
+    memoria = medicao['memoria']
+    print(f"memória: DataFrame {memoria['df_mb']:.1f} MB, RSS do app +{memoria['rss_app_mb']:.1f} MB, "
+          f"pico do processo {memoria['pico_rss_mb']:.1f} MB")
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    argumentos.add_argument('--linhas', default='10000,100000', help='tamanhos separados por vírgula')
+    argumentos.add_argument('--repeticoes', type=int, default=20)
+    argumentos.add_argument('--latencia-ms', type=float, default=20.0, help='ida e volta simulada por chamada')
+    argumentos.add_argument('--base', default=BASE_PADRAO)
+    argumentos.add_argument('--gravar-base', action='store_true', help='grava os resultados como nova base')
+    argumentos.add_argument('--tolerancia', type=float, default=0.5)
+    argumentos.add_argument('--filho', type=int, help=argparse.SUPPRESS)
+    opcoes = argumentos.parse_args()
+
+    if opcoes.filho:
+        print(json.dumps(medir_tamanho(opcoes.filho, opcoes.repeticoes, opcoes.latencia_ms)))
+        return
+
+    base = {}
+    if os.path.exists(opcoes.base):
+        with open(opcoes.base, encoding='utf-8') as f:
+            base = json.load(f)
+        if base.get('parametros', {}).get('latencia_ms') != opcoes.latencia_ms:
+            print(f"Aviso: a base foi gravada com latência de {base.get('parametros', {}).get('latencia_ms')} ms.")
+
+    atual = {}
+    for linhas in (int(n) for n in opcoes.linhas.split(',')):
+        # Um processo por tamanho: memória e caches começam do zero
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--filho', str(linhas),
+             '--repeticoes', str(opcoes.repeticoes), '--latencia-ms', str(opcoes.latencia_ms)],
+            capture_output=True, text=True,
+        )
+        if saida.returncode != 0:
+            print(saida.stdout, saida.stderr, sep='\n')
+            sys.exit(f'Falha ao medir {linhas} linhas.')
+        atual[str(linhas)] = json.loads(saida.stdout.strip().splitlines()[-1])
+        imprimir(str(linhas), atual[str(linhas)], base.get('tamanhos', {}).get(str(linhas)))
+
+    if opcoes.gravar_base:
+        tamanhos = dict(base.get('tamanhos', {}), **atual)
+        with open(opcoes.base, 'w', encoding='utf-8') as f:
+            json.dump({
+                'parametros': {'latencia_ms': opcoes.latencia_ms, 'repeticoes': opcoes.repeticoes},
+                'maquina': {'python': platform.python_version(), 'plataforma': platform.platform(),
+                            'cpus': os.cpu_count()},
+                'tamanhos': tamanhos,
+            }, f, ensure_ascii=False, indent=2)
+        print(f'\nBase gravada em {opcoes.base}')
+        return
+
+    regressoes = comparar(atual, base.get('tamanhos', {}), opcoes.tolerancia)
+    if regressoes:
+        print('\nRegressões em relação à base:')
+        for mensagem in regressoes:
+            print(f'  {mensagem}')
+        sys.exit(1)
+    if base:
+        print('\nSem regressões em relação à base.')
+
+
+if __name__ == '__main__':
+    main()
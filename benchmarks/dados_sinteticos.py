@@ -0,0 +1,199 @@
+"""Gerador reprodutível das tabelas do SGCE (ocorrencias, Alunos, Professores e Salas).
+
+Uso: python benchmarks/dados_sinteticos.py [ocorrencias] [destino.db]
+(sem destino só imprime o resumo; com destino grava um SQLite para IDR_BACKEND=sqlite)
+
+As distribuições imitam as de uma escola:
+- Salas do 6º ano do fundamental à 3ª série do médio, ~35 alunos por sala; o
+  número de alunos acompanha o de ocorrências (entre 300 e 100 mil).
+- Ocorrências concentradas em poucos alunos (Zipf): metade dos alunos tem até
+  umas cinco, os primeiros da lista somam 1 a 2% do total cada.
+- Só dias letivos (segunda a sexta, sem janeiro e com julho fraco), entre 7h e
+  17h, nos ANOS anos que terminam em FIM.
+- Tutor, coordenação e gestão acionados em parte das ocorrências; quem foi
+  acionado costuma responder em poucos dias, às vezes depois do prazo de 7 dias,
+  às vezes nunca. Parte das finalizadas já foi impressa (ASSINADA).
+- Alguns nomes de tutor chegam com caixa e espaços diferentes, como no banco real.
+
+O mesmo (ocorrencias, semente) gera sempre as mesmas linhas.
+"""
+import itertools
+import os
+import random
+import string
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repositorio import COLUNAS_OCORRENCIAS
+
+FIM = datetime(2025, 12, 12, tzinfo=timezone(timedelta(hours=-3)))
+ANOS = 3
+ALUNOS_POR_SALA = 35
+SERIES = ['6', '7', '8', '9', '1EM', '2EM', '3EM']
+PESO_MES = {1: 0.0, 2: 0.6, 3: 1.0, 4: 1.1, 5: 1.2, 6: 1.0, 7: 0.3, 8: 1.0, 9: 1.1, 10: 1.2, 11: 1.0, 12: 0.5}
+# Probabilidade de o setor ser acionado e de responder, e a média de dias até a resposta
+SETORES = {'T': (0.6, 0.9, 3.0), 'C': (0.35, 0.8, 4.0), 'G': (0.15, 0.7, 6.0)}
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João',
+         'Karina', 'Lucas', 'Mariana', 'Nicolas', 'Olívia', 'Pedro', 'Rafaela', 'Samuel', 'Taís', 'Vinícius']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+              'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Araújo', 'Melo', 'Barbosa', 'Conceição']
+FATOS = ['conversa excessiva durante a explicação', 'uso de celular em sala', 'agressão verbal a colega',
+         'saída da sala sem autorização', 'atraso recorrente após o intervalo', 'não realizou a atividade proposta',
+         'desrespeito ao professor', 'dano ao patrimônio escolar', 'briga no pátio', 'recusa em participar da aula']
+DESDOBRAMENTOS = ['O aluno foi advertido verbalmente.', 'Foi solicitado contato com o responsável.',
+                  'O aluno foi encaminhado à coordenação.', 'A situação se repetiu mais de uma vez na aula.',
+                  'Os colegas relataram o ocorrido ao professor.', '']
+ATENDIMENTOS = ['Conversa com o aluno e registro no caderno de tutoria.', 'Responsável contatado por telefone.',
+                'Reunião agendada com a família.', 'Aluno orientado sobre as regras de convivência.',
+                'Encaminhado para mediação de conflitos.']
+
+
+def _nome(aleatorio: random.Random, usados: set) -> str:
+    while True:
+        nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}".upper()
+        if nome not in usados:
+            usados.add(nome)
+            return nome
+        # Nomes repetidos ganham um sufixo, como nas listas de chamada
+        nome = f"{nome} {aleatorio.choice(string.ascii_uppercase)}"
+        if nome not in usados:
+            usados.add(nome)
+            return nome
+
+
+def _turmas(total: int) -> list[str]:
+    """Nomes das salas: 6A, 7A, ..., 3EMA, 6B, ... (depois da letra Z, 6A2, 6B2, ...)."""
+    salas = []
+    for i in itertools.count():
+        letra = string.ascii_uppercase[i % 26] + (str(i // 26 + 1) if i >= 26 else '')
+        for serie in SERIES:
+            salas.append(f'{serie}{letra}')
+            if len(salas) == total:
+                return salas
+
+
+def _dias_letivos() -> tuple[list[datetime], list[float]]:
+    dias, pesos = [], []
+    dia = FIM - timedelta(days=365 * ANOS)
+    while dia <= FIM:
+        if dia.weekday() < 5 and PESO_MES[dia.month]:
+            dias.append(dia.replace(hour=0, minute=0, second=0, microsecond=0))
+            pesos.append(PESO_MES[dia.month])
+        dia += timedelta(days=1)
+    return dias, pesos
+
+
+def _sujar(nome: str, aleatorio: random.Random) -> str:
+    """Variação de caixa/espaços que a normalização do app precisa absorver."""
+    sorteio = aleatorio.random()
+    if sorteio < 0.02:
+        return nome.title()
+    if sorteio < 0.03:
+        return f' {nome} '
+    return nome
+
+
+def gerar(ocorrencias: int, semente: int = 42) -> dict[str, list[dict]]:
+    """{'ocorrencias': [...], 'Alunos': [...], 'Professores': [...], 'Salas': [...]} como o PostgREST devolve."""
+    aleatorio = random.Random(semente)
+    nomes_usados = set()
+
+    total_alunos = min(max(ocorrencias // 10, 300), 100_000)
+    salas = _turmas(-(-total_alunos // ALUNOS_POR_SALA))
+    professores = [_nome(aleatorio, nomes_usados) for _ in range(min(max(total_alunos // 18, 25), 5000))]
+    tutores = professores[:max(len(professores) * 3 // 5, 1)]
+    alunos = [
+        {'Sala': salas[i % len(salas)], 'Aluno': _nome(aleatorio, nomes_usados), 'Tutor': aleatorio.choice(tutores)}
+        for i in range(total_alunos)
+    ]
+
+    # Zipf: o aluno de posição k (embaralhada) tem peso 1/(k + 10)
+    ordem = list(range(total_alunos))
+    aleatorio.shuffle(ordem)
+    pesos_alunos = list(itertools.accumulate(1 / (k + 10) for k in range(total_alunos)))
+    pesos_professores = list(itertools.accumulate(aleatorio.uniform(0.2, 1.0) for _ in professores))
+    dias, pesos_dias = _dias_letivos()
+    pesos_dias = list(itertools.accumulate(pesos_dias))
+
+    escolhidos_alunos = aleatorio.choices(ordem, cum_weights=pesos_alunos, k=ocorrencias)
+    escolhidos_dias = sorted(aleatorio.choices(dias, cum_weights=pesos_dias, k=ocorrencias))
+    escolhidos_professores = aleatorio.choices(professores, cum_weights=pesos_professores, k=ocorrencias)
+
+    linhas = []
+    for oid, (indice_aluno, dia, professor) in enumerate(
+            zip(escolhidos_alunos, escolhidos_dias, escolhidos_professores), start=1):
+        aluno = alunos[indice_aluno]
+        # Manhã e começo da tarde concentram as ocorrências
+        minutos = int(min(max(aleatorio.gauss(11 * 60, 150), 7 * 60), 17 * 60 - 1))
+        registrada = dia + timedelta(minutes=minutos, seconds=aleatorio.randrange(60))
+        linha = {
+            'ID': oid,
+            'PROFESSOR': professor,
+            'SALA': aluno['Sala'],
+            'ALUNO': aluno['Aluno'],
+            'TUTOR': _sujar(aluno['Tutor'], aleatorio),
+            'DESCRICAO': f"{aleatorio.choice(FATOS).capitalize()}. {aleatorio.choice(DESDOBRAMENTOS)}".strip(),
+            'ATP': aleatorio.choice(ATENDIMENTOS) if aleatorio.random() < 0.8 else '',
+            'DCO': registrada.isoformat(),
+            'HCO': registrada.strftime('%H:%M:%S'),
+        }
+        atualizada = registrada
+        pendente = False
+        for setor, (acionado, responde, media_dias) in SETORES.items():
+            linha[f'AT{setor}'], linha[f'F{setor}'], linha[f'D{setor}'] = '', 'NÃO', None
+            if aleatorio.random() >= acionado:
+                continue
+            resposta = registrada + timedelta(days=aleatorio.expovariate(1 / media_dias))
+            if aleatorio.random() < responde and resposta <= FIM:
+                linha[f'AT{setor}'] = aleatorio.choice(ATENDIMENTOS)
+                linha[f'D{setor}'] = resposta.isoformat()
+                atualizada = max(atualizada, resposta)
+            else:
+                linha[f'F{setor}'] = 'SIM'
+                pendente = True
+        if pendente:
+            linha['STATUS'] = 'ATENDIMENTO'
+        else:
+            linha['STATUS'] = 'ASSINADA' if aleatorio.random() < 0.4 else 'FINALIZADA'
+        linha['ATUALIZADO_EM'] = atualizada.astimezone(timezone.utc).isoformat()
+        linhas.append({c: linha.get(c) for c in COLUNAS_OCORRENCIAS + ['ATUALIZADO_EM']})
+
+    return {
+        'ocorrencias': linhas,
+        'Alunos': alunos,
+        'Professores': [{'Professor': p} for p in professores],
+        'Salas': [{'Sala': s} for s in salas],
+    }
+
+
+def gravar_sqlite(tabelas: dict[str, list[dict]], caminho: str):
+    """Grava as tabelas geradas num arquivo SQLite (esquema do RepositorioSQLite)."""
+    from repositorio import RepositorioSQLite, RepositorioOcorrencias
+
+    class Origem(RepositorioOcorrencias):
+        listar_ocorrencias = staticmethod(lambda: tabelas['ocorrencias'])
+        listar_alunos = staticmethod(lambda: tabelas['Alunos'])
+        listar_professores = staticmethod(lambda: tabelas['Professores'])
+        listar_salas = staticmethod(lambda: tabelas['Salas'])
+
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    return RepositorioSQLite(caminho).importar_de(Origem())
+
+
+def main():
+    ocorrencias = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    tabelas = gerar(ocorrencias)
+    resumo = ', '.join(f'{len(linhas)} {nome}' for nome, linhas in tabelas.items())
+    if len(sys.argv) > 2:
+        gravar_sqlite(tabelas, sys.argv[2])
+        print(f'{resumo} gravadas em {sys.argv[2]}')
+    else:
+        print(resumo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Substituto em processo do cliente Supabase (PostgREST), para testes de carga sem rede.
+
+Implementa a parte da API de consultas que o repositorio.py usa: table(),
+select(colunas, count='exact'), eq, neq, gt, gte, lt, lte, in_, ilike, or_ (pares
+'coluna.operador.valor' separados por vírgula), order, limit, range, insert,
+update e execute(). Como o PostgREST do Supabase:
+
+- cada resposta traz no máximo max_linhas linhas (db-max-rows);
+- toda linha tem todas as colunas da tabela, na mesma ordem (as omitidas no
+  insert ficam nulas);
+- o count é o total que casa com os filtros, antes de range/limit;
+- as linhas chegam como JSON decodificado (serializar=True), então o custo de
+  interpretar a resposta entra na medição como no cliente real;
+- latencia_seg simula a ida e volta da rede em cada chamada (fora da trava:
+  consultas em paralelo se sobrepõem, como no servidor).
+
+Tabelas com coluna ID ficam ordenadas por ID, e filtros de faixa por ID usam
+busca binária (o índice da chave primária).
+"""
+import bisect
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+OPERADORES = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a is not None and a > b,
+    'gte': lambda a, b: a is not None and a >= b,
+    'lt': lambda a, b: a is not None and a < b,
+    'lte': lambda a, b: a is not None and a <= b,
+    'in': lambda a, b: a in b,
+    'ilike': lambda a, b: a is not None and b.fullmatch(str(a)) is not None,
+}
+
+
+def _regex_like(padrao: str) -> re.Pattern:
+    """Padrão do ILIKE (% e _ curingas, barra escapando o próximo caractere) como regex sem maiúsculas."""
+    partes = []
+    for escapado, curinga, literal in re.findall(r'\\(.)|([%_])|(.)', padrao, re.DOTALL):
+        partes.append(re.escape(escapado or literal) if not curinga else ('.*' if curinga == '%' else '.'))
+    return re.compile(''.join(partes), re.IGNORECASE | re.DOTALL)
+
+
+class Resposta:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Tabela:
+    def __init__(self, linhas: list[dict]):
+        self.tem_id = bool(linhas) and 'ID' in linhas[0]
+        self.linhas = sorted(linhas, key=lambda r: r['ID']) if self.tem_id else list(linhas)
+        self.ids = [r['ID'] for r in self.linhas] if self.tem_id else None
+        self.colunas = list(linhas[0]) if linhas else []  # o "esquema": colunas da primeira linha, em ordem
+
+
+def _converter(coluna: str, valor: str):
+    """Valor de um filtro em texto (or_) para o tipo da coluna."""
+    valor = valor.strip('"')
+    if coluna == 'ID':
+        return int(valor)
+    return valor
+
+
+class Consulta:
+    """Construtor imutável: cada método devolve uma nova consulta."""
+
+    def __init__(self, cliente, tabela: str, **estado):
+        self._cliente = cliente
+        self._tabela = tabela
+        self._estado = dict(
+            operacao='select', colunas='*', contar=False, filtros=(), ordem=(),
+            limite=None, faixa=None, dados=None,
+        )
+        self._estado.update(estado)
+
+    def _com(self, **mudancas):
+        return Consulta(self._cliente, self._tabela, **dict(self._estado, **mudancas))
+
+    def _filtro(self, coluna, operador, valor):
+        return self._com(filtros=self._estado['filtros'] + ((coluna, operador, valor),))
+
+    def select(self, colunas: str = '*', count=None):
+        return self._com(colunas=colunas, contar=count == 'exact')
+
+    def insert(self, dados: dict):
+        return self._com(operacao='insert', dados=dados)
+
+    def update(self, dados: dict):
+        return self._com(operacao='update', dados=dados)
+
+    def eq(self, coluna, valor):
+        return self._filtro(coluna, 'eq', valor)
+
+    def neq(self, coluna, valor):
+        return self._filtro(coluna, 'neq', valor)
+
+    def gt(self, coluna, valor):
+        return self._filtro(coluna, 'gt', valor)
+
+    def gte(self, coluna, valor):
+        return self._filtro(coluna, 'gte', valor)
+
+    def lt(self, coluna, valor):
+        return self._filtro(coluna, 'lt', valor)
+
+    def lte(self, coluna, valor):
+        return self._filtro(coluna, 'lte', valor)
+
+    def in_(self, coluna, valores):
+        return self._filtro(coluna, 'in', frozenset(valores))
+
+    def ilike(self, coluna, padrao: str):
+        return self._filtro(coluna, 'ilike', _regex_like(padrao))
+
+    def or_(self, expressao: str):
+        alternativas = []
+        for parte in expressao.split(','):
+            coluna, operador, valor = parte.split('.', 2)
+            alternativas.append((coluna, operador, _converter(coluna, valor)))
+        return self._filtro(None, 'or', tuple(alternativas))
+
+    def order(self, coluna, desc=False):
+        return self._com(ordem=self._estado['ordem'] + ((coluna, desc),))
+
+    def limit(self, quantidade: int):
+        return self._com(limite=quantidade)
+
+    def range(self, inicio: int, fim: int):
+        return self._com(faixa=(inicio, fim))
+
+    def execute(self) -> Resposta:
+        return self._cliente._executar(self._tabela, self._estado)
+
+
+class ClienteSupabaseLocal:
+    """Cliente com as tabelas em memória: ClienteSupabaseLocal({'ocorrencias': [...], 'Alunos': [...], ...})."""
+
+    def __init__(self, tabelas: dict[str, list[dict]], max_linhas: int = 1000, latencia_seg: float = 0.0,
+                 serializar: bool = True, coluna_atualizacao: str | None = 'ATUALIZADO_EM'):
+        self._tabelas = {nome: _Tabela(linhas) for nome, linhas in tabelas.items()}
+        self.max_linhas = max_linhas
+        self.latencia_seg = latencia_seg
+        self.serializar = serializar
+        self.coluna_atualizacao = coluna_atualizacao
+        self.chamadas = 0
+        self._trava = threading.Lock()
+
+    def table(self, nome: str) -> Consulta:
+        return Consulta(self, nome)
+
+    # -------------------- Execução --------------------
+
+    def _executar(self, nome: str, estado: dict) -> Resposta:
+        if self.latencia_seg:
+            time.sleep(self.latencia_seg)
+        with self._trava:
+            self.chamadas += 1
+            tabela = self._tabelas.setdefault(nome, _Tabela([]))
+            if estado['operacao'] == 'insert':
+                linhas = [self._inserir(tabela, estado['dados'])]
+                contagem = None
+            elif estado['operacao'] == 'update':
+                linhas = self._atualizar(tabela, estado)
+                contagem = None
+            else:
+                linhas, contagem = self._selecionar(tabela, estado)
+        if self.serializar:
+            linhas = json.loads(json.dumps(linhas, ensure_ascii=False))
+        else:
+            linhas = [dict(r) for r in linhas]
+        return Resposta(linhas, contagem)
+
+    def _carimbar(self, linha: dict):
+        if self.coluna_atualizacao:
+            linha[self.coluna_atualizacao] = datetime.now(timezone.utc).isoformat()
+
+    def _inserir(self, tabela: _Tabela, dados: dict) -> dict:
+        # Como no Postgres, a linha tem todas as colunas da tabela (as omitidas ficam nulas)
+        linha = dict.fromkeys(tabela.colunas)
+        linha.update(dados)
+        if tabela.tem_id or not tabela.linhas:
+            linha['ID'] = (tabela.ids[-1] if tabela.ids else 0) + 1
+            tabela.tem_id = True
+            tabela.ids = tabela.ids or []
+            tabela.ids.append(linha['ID'])
+        self._carimbar(linha)
+        tabela.colunas += [c for c in linha if c not in tabela.colunas]
+        tabela.linhas.append(linha)
+        return linha
+
+    def _atualizar(self, tabela: _Tabela, estado: dict) -> list[dict]:
+        atualizadas = []
+        for posicao in self._posicoes(tabela, estado['filtros']):
+            linha = dict(tabela.linhas[posicao], **estado['dados'])
+            self._carimbar(linha)
+            tabela.linhas[posicao] = linha  # troca o dict: leituras em andamento não o veem mudar
+            atualizadas.append(linha)
+        return atualizadas
+
+    def _posicoes(self, tabela: _Tabela, filtros) -> list[int]:
+        """Posições das linhas que casam com os filtros (faixa de ID por busca binária)."""
+        inicio, fim = 0, len(tabela.linhas)
+        restantes = []
+        for coluna, operador, valor in filtros:
+            if tabela.tem_id and coluna == 'ID' and operador in ('gt', 'gte', 'lt', 'lte', 'eq'):
+                if operador in ('gt', 'gte', 'eq'):
+                    corte = (bisect.bisect_right if operador == 'gt' else bisect.bisect_left)(tabela.ids, valor)
+                    inicio = max(inicio, corte)
+                if operador in ('lt', 'lte', 'eq'):
+                    corte = (bisect.bisect_left if operador == 'lt' else bisect.bisect_right)(tabela.ids, valor)
+                    fim = min(fim, corte)
+            else:
+                restantes.append((coluna, operador, valor))
+        if not restantes:
+            return list(range(inicio, fim))
+        return [p for p in range(inicio, fim) if self._casa(tabela.linhas[p], restantes)]
+
+    @staticmethod
+    def _casa(linha: dict, filtros) -> bool:
+        for coluna, operador, valor in filtros:
+            if operador == 'or':
+                if not any(OPERADORES[op](linha.get(c), v) for c, op, v in valor):
+                    return False
+            elif not OPERADORES[operador](linha.get(coluna), valor):
+                return False
+        return True
+
+    def _selecionar(self, tabela: _Tabela, estado: dict):
+        posicoes = self._posicoes(tabela, estado['filtros'])
+        contagem = len(posicoes) if estado['contar'] else None
+        ordem = estado['ordem']
+        if ordem == (('ID', True),) and tabela.tem_id:
+            posicoes.reverse()
+        elif ordem and ordem != (('ID', False),):
+            for coluna, desc in reversed(ordem):
+                posicoes.sort(key=lambda p: (tabela.linhas[p].get(coluna) is None, tabela.linhas[p].get(coluna)),
+                              reverse=desc)
+        if estado['faixa']:
+            posicoes = posicoes[estado['faixa'][0]:estado['faixa'][1] + 1]
+        if estado['limite'] is not None:
+            posicoes = posicoes[:estado['limite']]
+        linhas = [tabela.linhas[p] for p in posicoes[:self.max_linhas]]
+        if estado['colunas'].strip() != '*':
+            colunas = [c.strip() for c in estado['colunas'].split(',')]
+            linhas = [{c: r.get(c) for c in colunas} for r in linhas]
+        return linhas, contagem
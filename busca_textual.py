@@ -0,0 +1,153 @@
+"""Índice invertido para a busca textual nas ocorrências.
+
+Campos indexados: descrição e os atendimentos (professor, tutor, coordenação e
+gestão). Os termos são normalizados (minúsculas, sem acentos: "agressão" e
+"AGRESSAO" são o mesmo termo) e cada termo aponta para {Nº Ocorrência: frequência}.
+
+A consulta exige todos os termos; a partir de TAMANHO_MINIMO_PREFIXO letras um
+termo também casa por prefixo ("agress" acha "agressão", "agressivo"). O
+resultado é pontuado pelo BM25.
+
+O índice é uma estrutura derivada do cache de ocorrências (app.obter_derivado)
+e é atualizado por delta: as linhas antigas saem, as novas entram.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from importacao_tardia import modulo_tardio
+
+pd = modulo_tardio('pandas')
+
+CAMPOS = ['Descrição da Ocorrência', 'Atendimento Professor', 'ATT', 'ATC', 'ATG']
+PALAVRAS_VAZIAS = frozenset(
+    'a o e de da do das dos em no na nos nas um uma uns umas para pra por com sem que se ao aos as os ou'.split()
+)
+TAMANHO_MINIMO_PREFIXO = 3
+K1, B = 1.2, 0.75
+
+_PALAVRA = re.compile(r'\w+')
+
+
+def normalizar(texto) -> str:
+    """Minúsculas, sem acentos e só ASCII."""
+    return unicodedata.normalize('NFKD', str(texto).casefold()).encode('ascii', 'ignore').decode('ascii')
+
+
+def extrair_termos(texto) -> list[str]:
+    return [t for t in _PALAVRA.findall(normalizar(texto)) if t not in PALAVRAS_VAZIAS]
+
+
+def _termos_por_ocorrencia(df: pd.DataFrame):
+    """(Nº, Counter de termos) de cada linha, juntando os campos de texto livre."""
+    if df.empty:
+        return []
+    colunas = [df[c].astype(object).fillna('').astype(str).tolist() for c in CAMPOS if c in df.columns]
+    return [
+        (int(oid), Counter(extrair_termos(' '.join(valores))))
+        for oid, *valores in zip(df['Nº Ocorrência'].tolist(), *colunas)
+    ]
+
+
+class IndiceTextual:
+    """termo -> {Nº: frequência}, mais o tamanho (em termos) de cada ocorrência."""
+
+    def __init__(self):
+        self.postagens = {}
+        self.tamanhos = {}
+        self.total_termos = 0
+        self._vocabulario = None  # termos em ordem alfabética (busca por prefixo)
+
+    def adicionar(self, oid: int, termos: Counter):
+        self.remover(oid, termos=None)
+        for termo, frequencia in termos.items():
+            postagem = self.postagens.get(termo)
+            if postagem is None:
+                self._vocabulario = None
+                postagem = {}
+            else:
+                postagem = dict(postagem)  # cópia: uma busca em andamento não vê o dict mudar
+            postagem[oid] = frequencia
+            self.postagens[termo] = postagem
+        tamanho = sum(termos.values())
+        self.tamanhos[oid] = tamanho
+        self.total_termos += tamanho
+
+    def remover(self, oid: int, termos: Counter | None):
+        """Tira a ocorrência do índice (termos: os que ela tinha quando foi indexada)."""
+        tamanho = self.tamanhos.pop(oid, None)
+        if tamanho is None:
+            return
+        self.total_termos -= tamanho
+        for termo in termos or ():
+            postagem = self.postagens.get(termo)
+            if postagem is None or oid not in postagem:
+                continue
+            postagem = {k: v for k, v in postagem.items() if k != oid}
+            if postagem:
+                self.postagens[termo] = postagem
+            else:
+                del self.postagens[termo]
+                self._vocabulario = None
+
+    def expandir(self, termo: str) -> list[str]:
+        """O próprio termo e, a partir de TAMANHO_MINIMO_PREFIXO letras, os que começam com ele."""
+        if len(termo) < TAMANHO_MINIMO_PREFIXO:
+            return [termo] if termo in self.postagens else []
+        vocabulario = self._vocabulario
+        if vocabulario is None:
+            vocabulario = self._vocabulario = sorted(self.postagens)
+        inicio = bisect.bisect_left(vocabulario, termo)
+        fim = bisect.bisect_left(vocabulario, termo + '\uffff', inicio)
+        return vocabulario[inicio:fim]
+
+
+def construir_indice(df: pd.DataFrame) -> IndiceTextual:
+    indice = IndiceTextual()
+    postagens = indice.postagens
+    for oid, termos in _termos_por_ocorrencia(df):
+        # Índice ainda não publicado: preenche as postagens no lugar, sem as cópias de adicionar()
+        for termo, frequencia in termos.items():
+            postagens.setdefault(termo, {})[oid] = frequencia
+        tamanho = sum(termos.values())
+        indice.tamanhos[oid] = tamanho
+        indice.total_termos += tamanho
+    return indice
+
+
+def atualizar_indice(indice: IndiceTextual, antigas: pd.DataFrame, novas: pd.DataFrame) -> IndiceTextual:
+    """Aplica um delta: reindexa as ocorrências alteradas e acrescenta as novas."""
+    for oid, termos in _termos_por_ocorrencia(antigas):
+        indice.remover(oid, termos)
+    for oid, termos in _termos_por_ocorrencia(novas):
+        indice.adicionar(oid, termos)
+    return indice
+
+
+def buscar(indice: IndiceTextual, consulta: str) -> dict[int, float]:
+    """Nº -> pontuação BM25 das ocorrências que contêm todos os termos da consulta."""
+    termos_consulta = list(dict.fromkeys(extrair_termos(consulta)))
+    total_docs = len(indice.tamanhos)
+    if not termos_consulta or not total_docs:
+        return {}
+    tamanho_medio = indice.total_termos / total_docs or 1
+    pontuacao = None
+    for termo in termos_consulta:
+        parcial = {}
+        for expandido in indice.expandir(termo):
+            postagem = indice.postagens.get(expandido, {})
+            idf = math.log(1 + (total_docs - len(postagem) + 0.5) / (len(postagem) + 0.5))
+            for oid, frequencia in postagem.items():
+                normalizacao = K1 * (1 - B + B * indice.tamanhos.get(oid, 0) / tamanho_medio)
+                parcial[oid] = parcial.get(oid, 0.0) + idf * frequencia * (K1 + 1) / (frequencia + normalizacao)
+        if pontuacao is None:
+            pontuacao = parcial
+        else:
+            pontuacao = {oid: p + parcial[oid] for oid, p in pontuacao.items() if oid in parcial}
+        if not pontuacao:
+            return {}
+    return pontuacao
@@ -0,0 +1,171 @@
+"""Cache de ocorrências compartilhado entre os workers do gunicorn na mesma máquina.
+
+- Um contador de versão de dados (monotônico) num arquivo pequeno mapeado em
+  memória: ler a versão custa uma leitura de 24 bytes, sem chamada de rede.
+- Um snapshot do DataFrame normalizado de ocorrências, gravado por um único
+  worker e lido pelos demais, em Arrow IPC (mapeado em memória). Os metadados
+  trazem a origem dos dados: o snapshot de outro banco não é adotado.
+- Uma trava de arquivo (fcntl) garante que só um worker busca dados no banco
+  por vez; os outros esperam e adotam o snapshot publicado.
+
+O diretório é um por usuário (criado com permissão 0700) e não é usado se
+pertencer a outro usuário. Desligado com IDR_CACHE_COMPARTILHADO=0, em sistemas
+sem fcntl ou sem o pyarrow (não há formato alternativo: um pickle lido de um
+diretório compartilhado executaria código de quem o gravou).
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+from importacao_tardia import disponivel, modulo_tardio
+
+HAS_PYARROW = disponivel('pyarrow')
+pa = modulo_tardio('pyarrow') # importado só ao gravar/ler o snapshot
+
+HABILITADO = HAS_FCNTL and HAS_PYARROW and os.environ.get('IDR_CACHE_COMPARTILHADO', '1') != '0'
+
+# /dev/shm mantém os arquivos em memória (tmpfs) no Linux; um diretório por usuário
+DIRETORIO = os.environ.get('IDR_CACHE_DIR') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    f"sgce-{os.getuid() if hasattr(os, 'getuid') else 0}",
+)
+
+# versão (int64), sincronizado_em (float64, epoch), recarregado_em (float64, epoch)
+_FORMATO_ESTADO = struct.Struct('<qdd')
+_CHAVE_META = b'sgce'
+
+
+class EstadoCache(NamedTuple):
+    versao: int
+    sincronizado_em: float
+    recarregado_em: float
+
+
+def _caminho(nome: str) -> str:
+    return os.path.join(DIRETORIO, nome)
+
+
+def _caminho_snapshot() -> str:
+    return _caminho('ocorrencias.arrow')
+
+
+def _preparar_diretorio():
+    """Cria o diretório (0700) se faltar; recusa um que pertença a outro usuário."""
+    global HABILITADO
+    os.makedirs(DIRETORIO, mode=0o700, exist_ok=True)
+    dono = os.stat(DIRETORIO).st_uid
+    if dono != os.getuid():
+        HABILITADO = False # as próximas requisições seguem sem o cache compartilhado
+        raise PermissionError(f"{DIRETORIO} pertence a outro usuário (uid {dono}): cache compartilhado desligado")
+
+
+_mapa_estado = None
+_mapa_pid = None
+
+
+def _estado_mmap() -> mmap.mmap:
+    """Mapeia o arquivo de estado (criado zerado na primeira vez)."""
+    global _mapa_estado, _mapa_pid
+    if _mapa_estado is not None and _mapa_pid == os.getpid():
+        return _mapa_estado
+    _preparar_diretorio()
+    caminho = _caminho('estado.bin')
+    fd = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(fd).st_size < _FORMATO_ESTADO.size:
+            os.ftruncate(fd, _FORMATO_ESTADO.size)
+        _mapa_estado = mmap.mmap(fd, _FORMATO_ESTADO.size)
+    finally:
+        os.close(fd)
+    _mapa_pid = os.getpid()
+    return _mapa_estado
+
+
+def ler_estado() -> EstadoCache:
+    """Versão de dados atual e instantes da última sincronização/recarga completa."""
+    return EstadoCache(*_FORMATO_ESTADO.unpack_from(_estado_mmap(), 0))
+
+
+def _gravar_estado(estado: EstadoCache):
+    _FORMATO_ESTADO.pack_into(_estado_mmap(), 0, *estado)
+
+
+@contextmanager
+def trava():
+    """Trava exclusiva entre processos para buscar dados e publicar o snapshot."""
+    _preparar_diretorio()
+    with open(_caminho('trava'), 'a+') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def publicar(df, meta: dict, completo: bool) -> int:
+    """Grava o snapshot e incrementa a versão de dados. Chamar com a trava obtida.
+
+    meta deve trazer a 'origem' dos dados, conferida por carregar_snapshot().
+    """
+    estado = ler_estado()
+    nova_versao = estado.versao + 1
+    meta = dict(meta, versao=nova_versao)
+
+    destino = _caminho_snapshot()
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[_CHAVE_META] = json.dumps(meta).encode()
+    tabela = tabela.replace_schema_metadata(metadados)
+    with pa.OSFile(temporario, 'wb') as sink:
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+    os.replace(temporario, destino) # Troca atômica: leitores veem o arquivo antigo ou o novo
+
+    agora = time.time()
+    _gravar_estado(EstadoCache(
+        nova_versao, agora, agora if completo else estado.recarregado_em
+    ))
+    return nova_versao
+
+
+def marcar_sincronizado():
+    """Registra uma sincronização sem alterações (a versão não muda)."""
+    estado = ler_estado()
+    _gravar_estado(estado._replace(sincronizado_em=time.time()))
+
+
+def definir_instantes(sincronizado_em: float, recarregado_em: float):
+    """Instantes de sincronização/recarga dos dados publicados (ex.: adotados de um snapshot em disco)."""
+    estado = ler_estado()
+    _gravar_estado(estado._replace(sincronizado_em=sincronizado_em, recarregado_em=recarregado_em))
+
+
+def forcar_recarga():
+    """Faz a próxima leitura de qualquer worker disparar uma recarga completa."""
+    estado = ler_estado()
+    _gravar_estado(estado._replace(sincronizado_em=0.0, recarregado_em=0.0))
+
+
+def carregar_snapshot(origem: str):
+    """Lê o snapshot publicado. Retorna (meta, DataFrame) ou None se não existir ou for de outra origem."""
+    caminho = _caminho_snapshot()
+    if not os.path.exists(caminho):
+        return None
+    with pa.memory_map(caminho, 'r') as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+        meta = json.loads(tabela.schema.metadata[_CHAVE_META])
+        if meta.get('origem') != origem:
+            return None
+        return meta, tabela.to_pandas()
@@ -0,0 +1,92 @@
+"""Cache das páginas HTML já renderizadas, por worker.
+
+A chave é (rota, argumentos da URL normalizados, versão dos dados): enquanto a
+versão não muda, a mesma consulta devolve o HTML guardado sem passar pelo Jinja.
+Quando uma escrita avança a versão, as entradas das versões anteriores são
+descartadas de uma vez (nenhuma delas pode mais ser servida).
+
+O ETag é derivado da chave, não do HTML: o navegador que já tem a página recebe
+304 sem que ela seja renderizada, mesmo que a entrada tenha saído do LRU.
+
+Limite em bytes com IDR_CACHE_PAGINAS_BYTES (padrão 32 MB; 0 desliga).
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+LIMITE_BYTES = int(os.environ.get('IDR_CACHE_PAGINAS_BYTES', str(32 * 1024 * 1024)))
+HABILITADO = LIMITE_BYTES > 0
+
+
+def normalizar_argumentos(argumentos) -> tuple:
+    """Argumentos da URL (MultiDict) em ordem canônica, sem os vazios (equivalem a ausentes)."""
+    return tuple(sorted(
+        (nome, tuple(sorted(v for v in valores if v)))
+        for nome, valores in argumentos.lists()
+        if any(valores)
+    ))
+
+
+def etag(chave: tuple) -> str:
+    return hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()
+
+
+class CachePaginas:
+    """LRU de páginas (bytes) limitado pelo tamanho total dos corpos."""
+
+    def __init__(self, limite_bytes: int):
+        self.limite_bytes = limite_bytes
+        self._entradas = OrderedDict()  # chave -> (corpo, mimetype)
+        self._bytes = 0
+        self._versao = None
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def _descartar_versoes_anteriores(self, versao):
+        if versao != self._versao:
+            self._entradas.clear()
+            self._bytes = 0
+            self._versao = versao
+
+    def obter(self, chave: tuple):
+        """(corpo, mimetype) guardado para a chave, ou None. O último item da chave é a versão."""
+        with self._trava:
+            self._descartar_versoes_anteriores(chave[-1])
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def guardar(self, chave: tuple, corpo: bytes, mimetype: str):
+        if len(corpo) > self.limite_bytes:
+            return
+        with self._trava:
+            self._descartar_versoes_anteriores(chave[-1])
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[0])
+            self._entradas[chave] = (corpo, mimetype)
+            self._bytes += len(corpo)
+            while self._bytes > self.limite_bytes:
+                _, (removido, _) = self._entradas.popitem(last=False)
+                self._bytes -= len(removido)
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'limite_bytes': self.limite_bytes,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+            }
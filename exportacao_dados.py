@@ -0,0 +1,109 @@
+"""Exportação das ocorrências em CSV, Parquet e XLSX por streaming.
+
+Os escritores recebem um iterador de blocos (DataFrames já formatados, com as
+colunas na ordem de exportação) e devolvem um gerador de bytes para a resposta
+HTTP: nenhum deles monta a tabela inteira em memória.
+
+- CSV: texto gerado bloco a bloco.
+- Parquet: um row group por bloco, escoado para a resposta a cada escrita (pyarrow).
+- XLSX: modo constant_memory do xlsxwriter num arquivo temporário, enviado em partes.
+"""
+import csv
+import io
+import os
+import tempfile
+
+from importacao_tardia import disponivel, modulo_tardio
+
+HAS_PYARROW = disponivel('pyarrow')
+HAS_XLSXWRITER = disponivel('xlsxwriter')
+pa = modulo_tardio('pyarrow')
+pq = modulo_tardio('pyarrow.parquet')
+xlsxwriter = modulo_tardio('xlsxwriter')
+
+TAMANHO_PARTE = 64 * 1024
+
+# formato -> (mimetype, dependência disponível)
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', True),
+    'parquet': ('application/vnd.apache.parquet', HAS_PYARROW),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', HAS_XLSXWRITER),
+}
+
+
+def gerar_csv(blocos, colunas: list[str]):
+    """CSV em UTF-8 com BOM (abre acentuado no Excel), um yield por bloco."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(colunas)
+    for bloco in blocos:
+        escritor.writerows(bloco.itertuples(index=False, name=None))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _Escoadouro(io.RawIOBase):
+    """Arquivo só de escrita que acumula os bytes até serem retirados pelo gerador."""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self._partes.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def retirar(self) -> bytes:
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def gerar_parquet(blocos, colunas: list[str], colunas_inteiras=()):
+    """Parquet com um row group por bloco; os bytes saem assim que cada grupo é escrito."""
+    esquema = pa.schema([(c, pa.int64() if c in colunas_inteiras else pa.string()) for c in colunas])
+    destino = _Escoadouro()
+    with pq.ParquetWriter(destino, esquema, compression='snappy') as escritor:
+        for bloco in blocos:
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+            dados = destino.retirar()
+            if dados:
+                yield dados
+    dados = destino.retirar()
+    if dados:
+        yield dados
+
+
+def gerar_xlsx(blocos, colunas: list[str], nome_planilha: str = 'Ocorrências'):
+    """XLSX em modo constant_memory (cada linha vai para disco ao ser escrita)."""
+    descritor, caminho = tempfile.mkstemp(suffix='.xlsx')
+    os.close(descritor)
+    try:
+        workbook = xlsxwriter.Workbook(caminho, {'constant_memory': True})
+        planilha = workbook.add_worksheet(nome_planilha[:31])
+        negrito = workbook.add_format({'bold': True})
+        planilha.write_row(0, 0, colunas, negrito)
+        linha = 1
+        for bloco in blocos:
+            for valores in bloco.itertuples(index=False, name=None):
+                planilha.write_row(linha, 0, valores)
+                linha += 1
+        workbook.close()
+        with open(caminho, 'rb') as f:
+            while parte := f.read(TAMANHO_PARTE):
+                yield parte
+    finally:
+        os.remove(caminho)
@@ -0,0 +1,184 @@
+"""Exportação de PDFs em lote (sala, tutor ou período) fora do tempo da requisição.
+
+Cada aluno vira um PDF renderizado num pool de processos; o resultado é um ZIP
+(um PDF por aluno) ou um PDF único. Uma thread do worker web só coordena o job:
+a renderização roda nos processos do pool.
+
+O estado de cada job fica num arquivo JSON no diretório de exportações (gravado
+de forma atômica), então qualquer worker do gunicorn responde ao acompanhamento
+e entrega o arquivo final.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import metricas
+from importacao_tardia import disponivel, modulo_tardio
+from pool_processos import PoolProcessos
+
+HAS_PYPDF = disponivel('pypdf')
+pypdf = modulo_tardio('pypdf')
+pdf_ocorrencias = modulo_tardio('pdf_ocorrencias')
+
+DIRETORIO = os.environ.get('IDR_EXPORTACAO_DIR') or os.path.join(tempfile.gettempdir(), 'sgce_exportacoes')
+PROCESSOS = int(os.environ.get('IDR_EXPORTACAO_PROCESSOS', '0')) or min(4, os.cpu_count() or 1)
+VALIDADE_SEG = float(os.environ.get('IDR_EXPORTACAO_VALIDADE_SEG', '3600'))
+FORMATOS = ('zip', 'pdf')
+
+_pool = PoolProcessos(PROCESSOS)
+
+
+def _caminho(job_id: str, extensao: str) -> str:
+    return os.path.join(DIRETORIO, f'{job_id}.{extensao}')
+
+
+def _job_valido(job_id: str) -> bool:
+    return bool(re.fullmatch(r'[0-9a-f]{32}', job_id or ''))
+
+
+def nome_arquivo(*partes) -> str:
+    """Nome de arquivo seguro a partir de sala/aluno."""
+    nome = '_'.join(str(p).strip() for p in partes if p)
+    return re.sub(r'[^\w\-]+', '_', nome).strip('_') or 'ocorrencias'
+
+
+def nomes_unicos(grupos) -> dict[str, list[dict]]:
+    """(nome, ocorrências) -> dict; nomes repetidos ganham um contador (_2, _3...).
+
+    Alunos diferentes podem virar o mesmo nome de arquivo (ex.: 'ANA M.' e 'ANA M'):
+    sem o contador, o segundo sobrescreveria o primeiro.
+    """
+    unicos = {}
+    for nome, ocorrencias in grupos:
+        candidato, contador = nome, 1
+        while candidato in unicos:
+            contador += 1
+            candidato = f'{nome}_{contador}'
+        unicos[candidato] = ocorrencias
+    return unicos
+
+
+def _gravar_estado(estado: dict):
+    destino = _caminho(estado['id'], 'json')
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(temporario, destino)
+
+
+def ler_estado(job_id: str) -> dict | None:
+    """Estado do job: 'processando', 'concluido' ou 'erro', com total e concluídos."""
+    if not _job_valido(job_id):
+        return None
+    try:
+        with open(_caminho(job_id, 'json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def caminho_resultado(job_id: str) -> str | None:
+    """Arquivo final de um job concluído (None se ainda não existir)."""
+    estado = ler_estado(job_id)
+    if not estado or estado['estado'] != 'concluido':
+        return None
+    caminho = _caminho(job_id, estado['formato'])
+    return caminho if os.path.exists(caminho) else None
+
+
+def _limpar_antigos():
+    limite = time.time() - VALIDADE_SEG
+    for nome in os.listdir(DIRETORIO):
+        caminho = os.path.join(DIRETORIO, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+
+def iniciar(grupos: dict[str, list[dict]], formato: str, titulo: str = 'Ocorrencias') -> str:
+    """Agenda a exportação e retorna o ID do job.
+
+    grupos: nome do arquivo (sem extensão) -> ocorrências do aluno, na ordem de impressão.
+    """
+    os.makedirs(DIRETORIO, exist_ok=True)
+    _limpar_antigos()
+    if formato == 'pdf' and not HAS_PYPDF:
+        # Sem pypdf não há como juntar PDFs prontos: um único processo renderiza tudo
+        grupos = {titulo: [o for ocorrencias in grupos.values() for o in ocorrencias]}
+
+    estado = {
+        'id': uuid.uuid4().hex,
+        'estado': 'processando',
+        'formato': formato,
+        'titulo': titulo,
+        'total': len(grupos),
+        'concluidos': 0,
+        'erro': None,
+        'criado_em': time.time(),
+    }
+    _gravar_estado(estado)
+    threading.Thread(
+        target=_executar, args=(estado, grupos), name=f"exportacao-{estado['id'][:8]}", daemon=True
+    ).start()
+    return estado['id']
+
+
+def _executar(estado: dict, grupos: dict[str, list[dict]]):
+    destino = _caminho(estado['id'], estado['formato'])
+    temporario = f'{destino}.tmp'
+    inicio = time.perf_counter()
+    try:
+        pool = _pool.obter()
+        gerar = pdf_ocorrencias.gerar_pdf_ocorrencias
+        futuros = {pool.submit(gerar, ocorrencias): nome for nome, ocorrencias in grupos.items()}
+        if estado['formato'] == 'zip':
+            # Cada PDF entra no ZIP assim que fica pronto: só um aluno por vez em memória
+            with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+                for futuro in as_completed(futuros):
+                    arquivo_zip.writestr(f'{futuros[futuro]}.pdf', futuro.result())
+                    _avancar(estado)
+        else:
+            prontos = {}
+            for futuro in as_completed(futuros):
+                prontos[futuros[futuro]] = futuro.result()
+                _avancar(estado)
+            with open(temporario, 'wb') as f:
+                f.write(_juntar_pdfs([prontos[nome] for nome in grupos]))
+        os.replace(temporario, destino)
+        estado['estado'] = 'concluido'
+        metricas.observar('sgce_pdf_segundos', time.perf_counter() - inicio, origem='lote')
+    except Exception as e:
+        print(f"Erro na exportação em lote {estado['id']}: {e}")
+        if isinstance(e, BrokenProcessPool):
+            _pool.descartar()
+        estado.update(estado='erro', erro=str(e))
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    _gravar_estado(estado)
+
+
+def _avancar(estado: dict):
+    estado['concluidos'] += 1
+    _gravar_estado(estado)
+
+
+def _juntar_pdfs(pdfs: list[bytes]) -> bytes:
+    if len(pdfs) == 1:
+        return pdfs[0]
+    writer = pypdf.PdfWriter()
+    for conteudo in pdfs:
+        for pagina in pypdf.PdfReader(BytesIO(conteudo)).pages:
+            writer.add_page(pagina)
+    saida = BytesIO()
+    writer.write(saida)
+    return saida.getvalue()
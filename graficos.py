@@ -0,0 +1,198 @@
+"""Gráficos dos relatórios (PNG), desenhados fora do tempo da requisição.
+
+- Desenho: matplotlib (Agg, API orientada a objetos, sem pyplot) num pool de
+  processos do worker, como a exportação de PDFs em lote. O PNG sai em RGB
+  (sem canal alfa) para servir tanto ao <img> do HTML quanto ao FPDF.
+- Memoização: LRU por (gráfico, filtros, versão dos dados), limitado a
+  IDR_GRAFICOS_MAX entradas. Quando a versão dos dados muda, as entradas das
+  versões anteriores são descartadas de uma vez (nenhuma pode mais ser servida).
+- Desenho único: pedidos simultâneos do mesmo gráfico esperam o mesmo futuro.
+
+Num acerto o PNG guardado é devolvido direto; numa falta a thread da requisição
+só monta as séries (consulta ao cubo) e espera o pool.
+
+Sem matplotlib (HAS_MATPLOTLIB falso) os relatórios ficam só com as tabelas.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import metricas
+from importacao_tardia import disponivel, modulo_tardio
+from pool_processos import PoolProcessos
+
+HAS_MATPLOTLIB = disponivel('matplotlib')
+mpl_figure = modulo_tardio('matplotlib.figure')
+mpl_agg = modulo_tardio('matplotlib.backends.backend_agg')
+PIL_Image = modulo_tardio('PIL.Image')  # dependência do próprio matplotlib
+
+PROCESSOS = int(os.environ.get('IDR_GRAFICOS_PROCESSOS', '1'))
+MAX_ENTRADAS = int(os.environ.get('IDR_GRAFICOS_MAX', '64'))
+ESPERA_SEG = float(os.environ.get('IDR_GRAFICOS_ESPERA_SEG', '20'))
+
+# nome -> título; a ordem é a de exibição nos relatórios
+GRAFICOS = {
+    'mes': 'Ocorrências por Mês',
+    'sala': 'Ocorrências por Sala',
+    'tutor': 'Ocorrências por Tutor',
+    'prazo_setor': 'Atendimento no Prazo por Setor',
+}
+
+CORES = {'Total': '#0d6efd', 'No Prazo': '#198754', 'Fora do Prazo': '#ffc107', 'Não Atendido': '#dc3545'}
+
+_pool = PoolProcessos(PROCESSOS)
+
+
+# -------------------- Desenho (processos do pool) --------------------
+
+def desenhar(titulo: str, rotulos: list[str], series: dict[str, list[int]], horizontal: bool = False) -> bytes:
+    """PNG (RGB) de barras; com mais de uma série, as barras são empilhadas."""
+    altura = max(3.5, 0.32 * len(rotulos) + 1.5) if horizontal else 4.0
+    figura = mpl_figure.Figure(figsize=(8, altura), dpi=100, facecolor='white')
+    canvas = mpl_agg.FigureCanvasAgg(figura)
+    eixo = figura.add_subplot()
+    posicoes = range(len(rotulos))
+    base = [0] * len(rotulos)
+    for nome, valores in series.items():
+        if horizontal:
+            eixo.barh(posicoes, valores, left=base, label=nome, color=CORES.get(nome))
+        else:
+            eixo.bar(posicoes, valores, bottom=base, label=nome, color=CORES.get(nome))
+        base = [b + v for b, v in zip(base, valores)]
+    if horizontal:
+        eixo.set_yticks(list(posicoes), rotulos, fontsize=8)
+        eixo.invert_yaxis()  # primeiro rótulo no alto, como nas tabelas
+    else:
+        eixo.set_xticks(list(posicoes), rotulos, fontsize=8, rotation=45 if len(rotulos) > 8 else 0)
+    eixo.set_title(titulo)
+    if len(series) > 1:
+        eixo.legend(fontsize=8)
+    eixo.grid(axis='x' if horizontal else 'y', alpha=0.3)
+    figura.tight_layout()
+    canvas.draw()
+    saida = BytesIO()
+    PIL_Image.frombuffer('RGBA', canvas.get_width_height(), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1) \
+        .convert('RGB').save(saida, 'PNG', optimize=True)
+    return saida.getvalue()
+
+
+# -------------------- Memoização --------------------
+
+class CacheGraficos:
+    """LRU de PNGs limitado pelo número de entradas; o último item da chave é a versão dos dados."""
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # chave -> PNG
+        self._em_andamento = {}         # chave -> Future do pool
+        self._versao = None
+        self._trava = threading.Lock()
+
+    def _descartar_versoes_anteriores(self, versao):
+        if versao != self._versao:
+            self._entradas.clear()
+            self._versao = versao
+
+    def obter(self, chave: tuple) -> bytes | None:
+        with self._trava:
+            self._descartar_versoes_anteriores(chave[-1])
+            png = self._entradas.get(chave)
+            if png is not None:
+                self._entradas.move_to_end(chave)
+            return png
+
+    def guardar(self, chave: tuple, png: bytes):
+        with self._trava:
+            if self._versao is not None and chave[-1] < self._versao:
+                return  # desenhado para uma versão que já ficou para trás
+            self._descartar_versoes_anteriores(chave[-1])
+            self._entradas[chave] = png
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def agendar(self, chave: tuple, montar_series):
+        """Futuro do desenho da chave: o já em andamento ou um novo no pool.
+
+        montar_series() -> kwargs de desenhar(); é chamado nesta thread, só quando
+        não há PNG guardado nem desenho em andamento.
+        """
+        with self._trava:
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                return futuro
+        argumentos = montar_series()
+        with self._trava:
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                return futuro
+            futuro = _pool.submeter(desenhar, **argumentos)
+            self._em_andamento[chave] = futuro
+        inicio = time.perf_counter()
+        futuro.add_done_callback(lambda f: self._concluir(chave, f, inicio))
+        return futuro
+
+    def _concluir(self, chave: tuple, futuro, inicio: float):
+        if not futuro.cancelled():
+            erro = futuro.exception()
+            if erro is None:
+                metricas.observar('sgce_grafico_segundos', time.perf_counter() - inicio, grafico=chave[0])
+                self.guardar(chave, futuro.result())
+            else:
+                print(f"Erro ao desenhar o gráfico {chave[0]}: {erro}")
+                if isinstance(erro, BrokenProcessPool):
+                    _pool.descartar()
+        # Só sai de 'em andamento' depois de guardado: quem chegar agora acha o PNG
+        with self._trava:
+            self._em_andamento.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            return {
+                'entradas': len(self._entradas),
+                'bytes': sum(len(png) for png in self._entradas.values()),
+                'em_andamento': len(self._em_andamento),
+                'max_entradas': self.max_entradas,
+            }
+
+
+_cache = CacheGraficos(MAX_ENTRADAS)
+
+
+def pre_agendar(chave: tuple, montar_series):
+    """Começa a desenhar o gráfico se ele ainda não estiver guardado (não espera)."""
+    if HAS_MATPLOTLIB and _cache.obter(chave) is None:
+        _cache.agendar(chave, montar_series)
+
+
+def obter(chave: tuple, montar_series, espera: float = ESPERA_SEG) -> bytes | None:
+    """PNG do gráfico: o guardado ou, numa falta, o desenhado no pool (espera até 'espera' s).
+
+    None sem matplotlib, em caso de erro no desenho ou se o tempo de espera acabar.
+    """
+    if not HAS_MATPLOTLIB:
+        return None
+    png = _cache.obter(chave)
+    metricas.cache('graficos', png is not None)
+    if png is not None:
+        return png
+    try:
+        return _cache.agendar(chave, montar_series).result(timeout=espera)
+    except Exception as e:
+        print(f"Gráfico {chave[0]} indisponível: {e}")
+        return None
+
+
+def limpar():
+    _cache.limpar()
+
+
+def estatisticas() -> dict:
+    return _cache.estatisticas()
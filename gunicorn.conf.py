@@ -0,0 +1,30 @@
+"""Configuração do gunicorn (lida automaticamente do diretório de trabalho).
+
+--preload: o processo mestre importa o app, os módulos pesados e os templates
+uma única vez, antes do fork; os workers compartilham essas páginas de memória
+(copy-on-write) e sobem sem repetir as importações. IDR_PRELOAD=0 desliga.
+
+Aquecimento: cada worker busca as tabelas (em paralelo) logo depois de subir,
+antes de aceitar conexões; a primeira requisição já encontra os caches cheios.
+IDR_AQUECER=0 desliga.
+
+Saída: o worker fecha os pools de processos (PDFs em lote e gráficos) antes de
+terminar, em vez de deixar os processos do pool órfãos.
+"""
+import os
+
+preload_app = os.environ.get('IDR_PRELOAD', '1') != '0'
+if preload_app:
+    # Lido por criar_app(): só faz sentido precarregar quando há fork depois
+    os.environ.setdefault('IDR_PRECARREGAR', '1')
+
+
+def post_worker_init(worker):
+    if os.environ.get('IDR_AQUECER', '1') != '0':
+        import app
+        app.aquecer_caches()
+
+
+def worker_exit(server, worker):
+    import pool_processos
+    pool_processos.encerrar_todos()
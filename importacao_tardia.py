@@ -0,0 +1,70 @@
+"""Importação tardia dos módulos pesados (pandas, numpy, fpdf, matplotlib, pyarrow).
+
+`pd = modulo_tardio('pandas')` devolve um substituto do módulo: a importação de
+verdade só acontece no primeiro acesso a um atributo (pd.DataFrame, ...). Assim
+o worker sobe sem pagar o custo de rotas que ele talvez nunca atenda.
+
+Com o gunicorn em --preload, precarregar() importa os módulos registrados no
+processo mestre, antes do fork: os workers herdam as páginas já carregadas e as
+compartilham (copy-on-write) em vez de cada um importar a sua cópia.
+"""
+import importlib
+import importlib.util
+import threading
+import types
+
+_trava = threading.Lock()
+_registrados: dict[str, 'ModuloTardio'] = {}
+
+
+class ModuloTardio(types.ModuleType):
+    """Substituto de um módulo que o importa no primeiro acesso a atributo."""
+
+    def __init__(self, nome: str, ao_carregar=None):
+        super().__init__(nome)
+        self.__dict__['_ao_carregar'] = ao_carregar
+        self.__dict__['_modulo'] = None
+
+    def carregar(self) -> types.ModuleType:
+        modulo = self.__dict__['_modulo']
+        if modulo is not None:
+            return modulo
+        with _trava:
+            if self.__dict__['_modulo'] is None:
+                modulo = importlib.import_module(self.__name__)
+                if self.__dict__['_ao_carregar']:
+                    self.__dict__['_ao_carregar'](modulo)
+                # Copia os atributos: os próximos acessos não passam mais pelo __getattr__
+                self.__dict__.update({k: v for k, v in vars(modulo).items() if k not in ('__name__', '__spec__')})
+                self.__dict__['_modulo'] = modulo
+        return self.__dict__['_modulo']
+
+    def __getattr__(self, atributo):
+        return getattr(self.carregar(), atributo)
+
+    def __dir__(self):
+        return dir(self.carregar())
+
+
+def modulo_tardio(nome: str, ao_carregar=None) -> ModuloTardio:
+    """Substituto do módulo 'nome' (um por nome no processo)."""
+    with _trava:
+        if nome not in _registrados:
+            _registrados[nome] = ModuloTardio(nome, ao_carregar)
+        return _registrados[nome]
+
+
+def disponivel(nome: str) -> bool:
+    """Indica se o módulo está instalado, sem importá-lo."""
+    try:
+        return importlib.util.find_spec(nome) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def precarregar(nomes=None):
+    """Importa agora os módulos registrados (ou só os informados) que estiverem instalados."""
+    for nome in list(nomes or _registrados):
+        raiz = nome.split('.')[0]
+        if disponivel(raiz):
+            modulo_tardio(nome).carregar()
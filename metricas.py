@@ -0,0 +1,203 @@
+"""Métricas de desempenho no formato de exposição do Prometheus (/metrics).
+
+- Histogramas de tempo: requisições por rota, chamadas ao banco (tabela e
+  operação), fases das cargas (busca, montagem do DataFrame, datas, texto) e
+  renderização de PDFs e dos gráficos.
+- Contadores: linhas devolvidas pelo banco e acertos/faltas de cada cache.
+
+Os números são de cada processo. Com o cache compartilhado ligado, cada worker
+grava de tempos em tempos os seus num arquivo do diretório do cache e o
+/metrics soma os de todos os workers, qualquer que seja o que atendeu.
+
+Com IDR_SERVER_TIMING=1, as etapas medidas durante uma requisição também
+saem no cabeçalho Server-Timing da resposta.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import cache_compartilhado
+
+SERVER_TIMING = os.environ.get('IDR_SERVER_TIMING') == '1'
+INTERVALO_GRAVACAO_SEG = 5.0
+VALIDADE_ARQUIVO_SEG = 24 * 3600  # arquivo de worker encerrado deixa de contar depois disso
+
+# Limites superiores (segundos) das faixas dos histogramas
+FAIXAS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# nome -> (tipo, descrição)
+METRICAS = {
+    'sgce_requisicao_segundos': ('histogram', 'Tempo de resposta das rotas do Flask'),
+    'sgce_banco_segundos': ('histogram', 'Latência das chamadas ao banco (Supabase/SQLite)'),
+    'sgce_banco_linhas_total': ('counter', 'Linhas devolvidas pelas chamadas ao banco'),
+    'sgce_carga_segundos': ('histogram', 'Fases das cargas de dados (busca, montagem, datas, texto)'),
+    'sgce_cache_total': ('counter', 'Consultas aos caches em memória, por resultado'),
+    'sgce_pdf_segundos': ('histogram', 'Tempo de geração de PDFs'),
+    'sgce_grafico_segundos': ('histogram', 'Tempo de desenho dos gráficos dos relatórios (no pool)'),
+}
+
+DIRETORIO = os.path.join(cache_compartilhado.DIRETORIO, 'metricas') if cache_compartilhado.HABILITADO else None
+
+_trava = threading.Lock()
+_contadores = {}   # (nome, rótulos) -> valor
+_histogramas = {}  # (nome, rótulos) -> [contagem por faixa..., +Inf, soma]
+_gravado_em = 0.0
+_local = threading.local()
+
+
+def _rotulos(rotulos: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def incrementar(nome: str, valor: float = 1, **rotulos):
+    chave = (nome, _rotulos(rotulos))
+    with _trava:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+
+def observar(nome: str, segundos: float, **rotulos):
+    chave = (nome, _rotulos(rotulos))
+    with _trava:
+        valores = _histogramas.get(chave)
+        if valores is None:
+            valores = _histogramas[chave] = [0] * (len(FAIXAS) + 2)
+        for i, limite in enumerate(FAIXAS):
+            if segundos <= limite:
+                valores[i] += 1
+                break
+        else:
+            valores[len(FAIXAS)] += 1
+        valores[-1] += segundos
+
+
+@contextmanager
+def medir(nome: str, etapa: str | None = None, **rotulos):
+    """Mede o bloco no histograma 'nome'; 'etapa' também entra no Server-Timing da requisição."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        observar(nome, duracao, **rotulos)
+        if etapa:
+            registrar_etapa(etapa, duracao)
+
+
+def cache(nome: str, acertou: bool):
+    incrementar('sgce_cache_total', cache=nome, resultado='acerto' if acertou else 'falta')
+
+
+# -------------------- Server-Timing --------------------
+
+def iniciar_requisicao():
+    _local.etapas = {}
+
+
+def registrar_etapa(etapa: str, segundos: float):
+    etapas = getattr(_local, 'etapas', None)
+    if etapas is not None:
+        etapas[etapa] = etapas.get(etapa, 0.0) + segundos
+
+
+def cabecalho_server_timing(total: float) -> str:
+    """Valor do Server-Timing com as etapas da requisição atual (em ms) e o total."""
+    etapas = getattr(_local, 'etapas', None) or {}
+    _local.etapas = None
+    partes = [f'{etapa};dur={segundos * 1000:.1f}' for etapa, segundos in etapas.items()]
+    partes.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(partes)
+
+
+# -------------------- Exposição --------------------
+
+def _estado_local() -> dict:
+    with _trava:
+        return {
+            'contadores': [[n, list(r), v] for (n, r), v in _contadores.items()],
+            'histogramas': [[n, list(r), list(v)] for (n, r), v in _histogramas.items()],
+        }
+
+
+def gravar(forcar: bool = False):
+    """Grava os números deste worker para o /metrics dos outros (no máximo a cada INTERVALO_GRAVACAO_SEG)."""
+    global _gravado_em
+    if DIRETORIO is None or (not forcar and time.time() - _gravado_em < INTERVALO_GRAVACAO_SEG):
+        return
+    _gravado_em = time.time()
+    try:
+        os.makedirs(DIRETORIO, exist_ok=True)
+        destino = os.path.join(DIRETORIO, f'{os.getpid()}.json')
+        with open(f'{destino}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(_estado_local(), f)
+        os.replace(f'{destino}.tmp', destino)
+    except OSError as e:
+        print(f"Erro ao gravar as métricas do worker: {e}")
+
+
+def _estados() -> list[dict]:
+    """Números deste processo e, com o diretório compartilhado, os gravados pelos outros workers."""
+    estados = [_estado_local()]
+    if DIRETORIO is None or not os.path.isdir(DIRETORIO):
+        return estados
+    limite = time.time() - VALIDADE_ARQUIVO_SEG
+    for nome in os.listdir(DIRETORIO):
+        caminho = os.path.join(DIRETORIO, nome)
+        if not nome.endswith('.json') or nome == f'{os.getpid()}.json':
+            continue
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+                continue
+            with open(caminho, encoding='utf-8') as f:
+                estados.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return estados
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(rotulos, extra=()) -> str:
+    pares = list(rotulos) + list(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def exposicao() -> str:
+    """Texto no formato de exposição do Prometheus (version=0.0.4), somando os workers."""
+    contadores, histogramas = {}, {}
+    for estado in _estados():
+        for nome, rotulos, valor in estado['contadores']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            contadores[chave] = contadores.get(chave, 0) + valor
+        for nome, rotulos, valores in estado['histogramas']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            atual = histogramas.setdefault(chave, [0] * len(valores))
+            histogramas[chave] = [a + b for a, b in zip(atual, valores)]
+
+    linhas = []
+    for nome, (tipo, descricao) in METRICAS.items():
+        linhas.append(f'# HELP {nome} {descricao}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        if tipo == 'counter':
+            for (n, rotulos), valor in sorted(contadores.items()):
+                if n == nome:
+                    linhas.append(f'{nome}{_formatar_rotulos(rotulos)} {valor}')
+            continue
+        for (n, rotulos), valores in sorted(histogramas.items()):
+            if n != nome:
+                continue
+            acumulado = 0
+            for limite, quantidade in zip(FAIXAS, valores):
+                acumulado += quantidade
+                linhas.append(f'{nome}_bucket{_formatar_rotulos(rotulos, [("le", limite)])} {acumulado}')
+            acumulado += valores[len(FAIXAS)]
+            linhas.append(f'{nome}_bucket{_formatar_rotulos(rotulos, [("le", "+Inf")])} {acumulado}')
+            linhas.append(f'{nome}_sum{_formatar_rotulos(rotulos)} {valores[-1]:.6f}')
+            linhas.append(f'{nome}_count{_formatar_rotulos(rotulos)} {acumulado}')
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,154 @@
+"""Renderização das ocorrências e dos relatórios estatísticos em PDF (FPDF).
+
+Módulo sem dependência do Flask nem do banco: é importado pelos processos do
+pool da exportação em lote (exportacao_pdf.py).
+"""
+import os
+import tempfile
+
+from fpdf import FPDF
+
+# PDF GENERATION CLASS
+class PDF(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 12)
+        self.set_draw_color(0, 51, 102) 
+        self.cell(0, 10, 'RELATÓRIO DE REGISTRO DE OCORRÊNCIAS', 'B', 1, 'C')
+        self.set_font('Arial', '', 10)
+        self.cell(0, 5, 'E.E. PEI PROFESSOR IRENE DIAS RIBEIRO', 0, 1, 'C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Página {self.page_no()}/{{nb}}', 0, 0, 'C')
+
+def _adicionar_ocorrencia_ao_pdf(pdf, ocorrencia):
+    """Adiciona os detalhes de uma única ocorrência ao objeto PDF."""
+    w_label = 45
+    w_value = 145
+    
+    pdf.set_font('Arial', 'B', 10)
+    pdf.set_fill_color(240, 240, 240)
+    
+    def add_meta_row(label, value):
+        value_display = str(value).split(' ')[0] if label == 'Data:' and value else str(value)
+
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(w_label, 7, label, 'LR', 0, 'L', 1) 
+        pdf.set_font('Arial', '', 10)
+        pdf.cell(w_value, 7, value_display, 'LR', 1, 'L', 0) 
+
+    pdf.set_draw_color(0, 0, 0)
+    pdf.cell(w_label + w_value, 0, '', 'T', 1, 'L') 
+    
+    add_meta_row('Aluno:', ocorrencia.get('Aluno', 'N/D'))
+    add_meta_row('Tutor:', ocorrencia.get('Tutor', 'N/D'))
+    add_meta_row('Data:', ocorrencia.get('DCO', 'N/D'))
+    add_meta_row('Professor:', ocorrencia.get('PROFESSOR', 'N/D'))
+    
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(w_label, 7, 'Sala:', 'LBR', 0, 'L', 1) 
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(w_value, 7, ocorrencia.get('Sala', 'N/D'), 'RBT', 1, 'L', 0) 
+    
+    pdf.ln(2)
+    
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(w_label, 7, 'Ocorrência nº:', 1, 0, 'L', 1)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(w_value / 2, 7, str(ocorrencia.get('Nº Ocorrência', 'N/D')), 1, 0, 'L') 
+
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(w_label / 2, 7, 'Hora:', 1, 0, 'L', 1)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(w_value / 2 - w_label / 2, 7, ocorrencia.get('HCO', 'N/D'), 1, 1, 'L')
+    
+    pdf.ln(5)
+
+    def adicionar_bloco_texto(label, campo_db):
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(0, 7, label, 1, 1, 'L', 1)
+        pdf.set_font('Arial', '', 10)
+        conteudo = ocorrencia.get(campo_db, '').strip()
+        if not conteudo:
+             conteudo = 'NÃO APLICÁVEL'
+        pdf.multi_cell(0, 6, conteudo, 1, 'L', 0) 
+        pdf.ln(2)
+
+    adicionar_bloco_texto('Descrição:', 'Descrição da Ocorrência') 
+    adicionar_bloco_texto('Atendimento Professor:', 'Atendimento Professor') # Usando nome mapeado
+    adicionar_bloco_texto('Atendimento Tutor (Se solicitado):', 'ATT')
+    adicionar_bloco_texto('Atendimento Coordenação (Se solicitado):', 'ATC')
+    adicionar_bloco_texto('Atendimento Gestão (Se solicitado):', 'ATG')
+    
+    pdf.ln(10)
+    
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(100, 7, 'Assinatura Responsável:', 0, 0, 'L')
+    pdf.cell(0, 7, 'Data:       /       /       ', 0, 1, 'L')
+    
+    pdf.ln(5)
+    pdf.set_font('Arial', '', 8)
+    pdf.cell(0, 1, '-' * 125, 0, 1, 'L') 
+    pdf.set_font('Arial', 'I', 8)
+    pdf.cell(0, 5, 'Ocorrência registrada no SGCE.', 0, 1, 'R')
+
+
+def gerar_pdf_ocorrencias(ocorrencias: list[dict]) -> bytes:
+    """PDF com uma página por ocorrência (linhas com os nomes de coluna do App)."""
+    pdf = PDF('P', 'mm', 'A4')
+    pdf.alias_nb_pages() # Habilita o contador de páginas {{nb}}
+    for row in ocorrencias:
+        pdf.add_page()
+        _adicionar_ocorrencia_ao_pdf(pdf, row)
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def _adicionar_tabela(pdf, titulo: str, colunas: list[str], linhas: list[dict]):
+    """Tabela simples: a primeira coluna (nome) fica com a largura que sobrar."""
+    largura_numeros = 25
+    larguras = [190 - largura_numeros * (len(colunas) - 1)] + [largura_numeros] * (len(colunas) - 1)
+    pdf.set_font('Arial', 'B', 11)
+    pdf.cell(0, 8, titulo, 0, 1, 'L')
+    pdf.set_font('Arial', 'B', 7)
+    pdf.set_fill_color(240, 240, 240)
+    for coluna, largura in zip(colunas, larguras):
+        pdf.cell(largura, 7, coluna, 1, 0, 'C', 1)
+    pdf.ln()
+    pdf.set_font('Arial', '', 8)
+    for linha in linhas:
+        for i, (coluna, largura) in enumerate(zip(colunas, larguras)):
+            pdf.cell(largura, 6, str(linha.get(coluna, '')), 1, 0, 'L' if i == 0 else 'C')
+        pdf.ln()
+    pdf.ln(5)
+
+
+def gerar_pdf_relatorio(titulo: str, periodo: str, imagens: list[bytes],
+                        tabelas: list[tuple[str, list[str], list[dict]]]) -> bytes:
+    """PDF de um relatório estatístico: os gráficos (PNG em RGB) seguidos das tabelas.
+
+    tabelas: (título, colunas, linhas com as colunas como chaves).
+    """
+    pdf = PDF('P', 'mm', 'A4')
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 8, titulo, 0, 1, 'C')
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6, periodo, 0, 1, 'C')
+    pdf.ln(4)
+
+    # O FPDF só lê imagens de arquivos
+    with tempfile.TemporaryDirectory(prefix='sgce_relatorio_') as diretorio:
+        for i, png in enumerate(imagens):
+            caminho = os.path.join(diretorio, f'grafico_{i}.png')
+            with open(caminho, 'wb') as f:
+                f.write(png)
+            pdf.image(caminho, x=15, w=180)
+            pdf.ln(4)
+
+    for titulo_tabela, colunas, linhas in tabelas:
+        if linhas:
+            _adicionar_tabela(pdf, titulo_tabela, colunas, linhas)
+    return pdf.output(dest='S').encode('latin-1')
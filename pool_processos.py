@@ -0,0 +1,62 @@
+"""Pool de processos do worker web, criado sob demanda (exportação de PDFs e gráficos).
+
+- Um pool por PID: um pool criado antes do fork (gunicorn --preload) não é
+  reaproveitado no filho, que cria o seu no primeiro uso.
+- 'spawn': os processos do pool não herdam as threads nem as conexões do worker.
+- Se um processo do pool morre (BrokenProcessPool), o pool é descartado e o
+  próximo uso cria outro.
+- encerrar_todos() fecha os pools do processo atual (gunicorn: worker_exit).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_pools: list['PoolProcessos'] = []
+
+
+class PoolProcessos:
+    def __init__(self, processos: int):
+        self.processos = processos
+        self._executor = None
+        self._pid = None
+        self._trava = threading.Lock()
+        _pools.append(self)
+
+    def obter(self) -> ProcessPoolExecutor:
+        with self._trava:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processos, mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submeter(self, funcao, *args, **kwargs) -> Future:
+        """submit() no pool; se ele já estiver quebrado, tenta uma vez num pool novo."""
+        try:
+            return self.obter().submit(funcao, *args, **kwargs)
+        except BrokenProcessPool:
+            self.descartar()
+            return self.obter().submit(funcao, *args, **kwargs)
+
+    def descartar(self):
+        """Abandona o pool atual (sem esperar): o próximo obter() cria outro."""
+        with self._trava:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def encerrar(self, esperar: bool = True):
+        """Fecha o pool, esperando (por padrão) os trabalhos já em execução."""
+        with self._trava:
+            executor, self._executor = self._executor, None
+            if executor is None or self._pid != os.getpid():
+                return
+        executor.shutdown(wait=esperar, cancel_futures=True)
+
+
+def encerrar_todos(esperar: bool = True):
+    for pool in _pools:
+        pool.encerrar(esperar)
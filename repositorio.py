@@ -0,0 +1,783 @@
+"""Camada de acesso aos dados das tabelas do SGCE.
+
+Define uma interface única (RepositorioOcorrencias) para as tabelas 'ocorrencias',
+'Alunos', 'Professores' e 'Salas', com dois motores:
+
+- RepositorioSupabase: o banco remoto de produção (PostgREST). As tabelas são lidas
+  em blocos (faixas de ID ou páginas) buscados em paralelo, abaixo do limite de
+  linhas por resposta do PostgREST, e o total lido é conferido com um count.
+- RepositorioSQLite: arquivo local, para rodar offline. Os filtros de tutor/status,
+  sala/aluno e as contagens por aluno rodam como consultas SQL indexadas.
+
+O motor é escolhido pela variável de ambiente IDR_BACKEND ('supabase' ou 'sqlite').
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metricas
+
+# Colunas da tabela 'ocorrencias' no banco (MAIÚSCULO)
+COLUNAS_OCORRENCIAS = [
+    'ID', 'PROFESSOR', 'SALA', 'ALUNO', 'TUTOR', 'DESCRICAO', 'ATP',
+    'ATT', 'ATC', 'ATG', 'FT', 'FC', 'FG', 'DCO', 'HCO', 'DT', 'DC', 'DG', 'STATUS'
+]
+
+
+def normalizar_texto(valor) -> str:
+    """Mesma normalização do carregar_dados: texto sem espaços nas pontas e em maiúsculas."""
+    return str(valor).strip().upper()
+
+
+def status_exibicao(row: dict) -> str:
+    """Status de exibição (ASSINADA / ATENDIMENTO / FINALIZADA) a partir das colunas do banco."""
+    if normalizar_texto(row.get('STATUS')) == 'ASSINADA':
+        return 'ASSINADA'
+    # Flag SIM = setor acionado e ainda sem atendimento
+    if any(normalizar_texto(row.get(col)) == 'SIM' for col in ('FT', 'FC', 'FG')):
+        return 'ATENDIMENTO'
+    return 'FINALIZADA'
+
+
+# -------------------- Interface --------------------
+
+def _filtrar_sala_aluno(linhas: list[dict], sala=None, aluno=None) -> list[dict]:
+    """Linhas da sala/aluno dados, comparados na forma normalizada."""
+    if sala:
+        sala = normalizar_texto(sala)
+        linhas = [r for r in linhas if normalizar_texto(r.get('SALA')) == sala]
+    if aluno:
+        aluno = normalizar_texto(aluno)
+        linhas = [r for r in linhas if normalizar_texto(r.get('ALUNO')) == aluno]
+    return linhas
+
+
+def _padrao_literal(valor: str) -> str:
+    """Valor como padrão do LIKE/ILIKE sem curingas (%, _ e a barra escapados)."""
+    return re.sub(r'([\\%_])', r'\\\1', valor.strip())
+
+
+def _paginar_linhas(linhas: list[dict], apos=None, antes=None, limite=None) -> list[dict]:
+    """Aplica cursores de keyset (por ID) e limite a uma lista de linhas já filtrada."""
+    if apos is not None:
+        linhas = [r for r in linhas if (r.get('ID') or 0) < apos]
+    if antes is not None:
+        linhas = [r for r in linhas if (r.get('ID') or 0) > antes]
+    linhas = sorted(linhas, key=lambda r: r.get('ID') or 0, reverse=True)
+    if limite:
+        linhas = linhas[-limite:] if antes is not None else linhas[:limite]
+    return linhas
+
+
+class RepositorioOcorrencias:
+    """Interface comum dos motores de armazenamento.
+
+    filtros_no_banco indica se as consultas filtradas (consultar_ocorrencias,
+    contar_ocorrencias_por_aluno) devem ser usadas no lugar do DataFrame em cache.
+    """
+    nome = 'base'
+    filtros_no_banco = False
+    # Coluna de "última modificação" da tabela 'ocorrencias' (None = não existe;
+    # a sincronização incremental usa então só o ID e os IDs alterados localmente)
+    coluna_atualizacao = None
+
+    # Ocorrências
+    def listar_ocorrencias(self) -> list[dict]:
+        raise NotImplementedError
+
+    def listar_ocorrencias_em_blocos(self):
+        """Gera a tabela inteira em blocos de linhas, por ID decrescente (a carga monta um bloco por vez)."""
+        yield self.listar_ocorrencias()
+
+    def buscar_ocorrencias(self, ids) -> list[dict]:
+        raise NotImplementedError
+
+    def buscar_ocorrencia(self, oid) -> dict | None:
+        linhas = self.buscar_ocorrencias([oid])
+        return linhas[0] if linhas else None
+
+    def listar_ocorrencias_desde(self, id_maior_que: int, atualizado_desde=None) -> list[dict]:
+        """Ocorrências novas (ID acima da marca) ou modificadas a partir de atualizado_desde."""
+        col = self.coluna_atualizacao
+        return [
+            r for r in self.listar_ocorrencias()
+            if (r.get('ID') or 0) > id_maior_que
+            or (col and atualizado_desde and (r.get(col) or '') >= atualizado_desde)
+        ]
+
+    def inserir_ocorrencia(self, dados: dict) -> dict | None:
+        raise NotImplementedError
+
+    def atualizar_ocorrencia(self, oid, dados: dict) -> dict | None:
+        raise NotImplementedError
+
+    def atualizar_ocorrencias(self, ids, dados: dict) -> list[dict]:
+        """Aplica os mesmos valores a várias ocorrências e retorna as linhas atualizadas."""
+        linhas = [self.atualizar_ocorrencia(int(i), dados) for i in ids]
+        return [r for r in linhas if r]
+
+    # Tabelas de referência
+    def listar_alunos(self) -> list[dict]:
+        raise NotImplementedError
+
+    def listar_professores(self) -> list[dict]:
+        raise NotImplementedError
+
+    def listar_salas(self) -> list[dict]:
+        raise NotImplementedError
+
+    # Consultas filtradas / agregadas (implementação genérica em Python)
+    def consultar_ocorrencias(self, tutor=None, status=None, sala=None, aluno=None,
+                              apos=None, antes=None, limite=None) -> list[dict]:
+        """Ocorrências filtradas, ordenadas por ID decrescente.
+
+        Todos os filtros são comparados na forma normalizada (normalizar_texto),
+        como os nomes no cache de ocorrências do /index e do /relatorio_aluno.
+        apos/antes são cursores de paginação por ID (keyset): 'apos' traz os IDs
+        menores que o cursor, 'antes' os maiores (a página anterior); limite
+        corta a página mantendo os IDs mais próximos do cursor.
+        """
+        linhas = self.listar_ocorrencias()
+        if tutor:
+            linhas = [r for r in linhas if normalizar_texto(r.get('TUTOR')) == normalizar_texto(tutor)]
+        if status:
+            linhas = [r for r in linhas if status_exibicao(r) == status]
+        linhas = _filtrar_sala_aluno(linhas, sala, aluno)
+        return _paginar_linhas(linhas, apos, antes, limite)
+
+    def contar_ocorrencias(self, tutor=None, status=None) -> int:
+        """Total de ocorrências com os filtros do /index."""
+        return len(self.consultar_ocorrencias(tutor=tutor, status=status))
+
+    def listar_tutores(self) -> list[str]:
+        """Tutores distintos (normalizados) presentes nas ocorrências."""
+        return sorted({normalizar_texto(r.get('TUTOR')) for r in self.listar_ocorrencias()})
+
+    def contar_ocorrencias_por_aluno(self) -> dict[str, int]:
+        """Quantidade de ocorrências por aluno (nome normalizado)."""
+        contagem = {}
+        for r in self.listar_ocorrencias():
+            nome = normalizar_texto(r.get('ALUNO'))
+            contagem[nome] = contagem.get(nome, 0) + 1
+        return contagem
+
+    def listar_alunos_por_sala(self) -> dict[str, list[str]]:
+        """Sala -> alunos com ocorrências (nomes normalizados, em ordem), para os filtros do /relatorio_aluno."""
+        pares = {(normalizar_texto(r.get('SALA')), normalizar_texto(r.get('ALUNO'))) for r in self.listar_ocorrencias()}
+        por_sala = {}
+        for sala, aluno in sorted(pares):
+            por_sala.setdefault(sala, []).append(aluno)
+        return por_sala
+
+
+class CargaIncompleta(RuntimeError):
+    """O total de linhas lidas em blocos não bate com a contagem da tabela."""
+
+
+# -------------------- Cliente Supabase compartilhado --------------------
+# Nome da coluna de última modificação em 'ocorrencias' no Supabase, se existir
+# (ex.: 'updated_at' mantida por trigger). Vazio = sincronização só por ID.
+COLUNA_ATUALIZACAO_SUPABASE = os.environ.get('IDR_COLUNA_ATUALIZACAO') or None
+
+# Um cliente por processo (worker do gunicorn), criado na primeira chamada e
+# reaproveitado: as conexões HTTP ficam abertas (keep-alive) e o handshake TLS
+# é pago uma vez só. O PID é conferido para que um cliente criado antes do fork
+# (gunicorn --preload) não seja compartilhado entre workers.
+
+SUPABASE_POOL_MAX = int(os.environ.get('IDR_SUPABASE_POOL_MAX', '10'))
+SUPABASE_POOL_KEEPALIVE = int(os.environ.get('IDR_SUPABASE_POOL_KEEPALIVE', '5'))
+SUPABASE_KEEPALIVE_EXPIRA_SEG = float(os.environ.get('IDR_SUPABASE_KEEPALIVE_EXPIRA_SEG', '60'))
+SUPABASE_TIMEOUT_SEG = float(os.environ.get('IDR_SUPABASE_TIMEOUT_SEG', '15'))
+SUPABASE_CONNECT_TIMEOUT_SEG = float(os.environ.get('IDR_SUPABASE_CONNECT_TIMEOUT_SEG', '5'))
+SUPABASE_VERIFICACAO_SEG = float(os.environ.get('IDR_SUPABASE_VERIFICACAO_SEG', '120'))
+# Máximo de linhas por resposta (db-max-rows do PostgREST; 1000 no Supabase) e
+# quantos blocos da mesma tabela são buscados ao mesmo tempo
+SUPABASE_MAX_LINHAS = int(os.environ.get('IDR_SUPABASE_MAX_LINHAS', '1000'))
+SUPABASE_BLOCOS_PARALELOS = int(os.environ.get('IDR_SUPABASE_BLOCOS_PARALELOS', '4'))
+
+_cliente_lock = threading.Lock()
+_cliente_supabase = None
+_cliente_pid = None
+_cliente_verificado_em = 0.0
+
+
+def _criar_cliente_supabase(url: str, key: str):
+    """Cria o cliente Supabase com pool de conexões e timeouts configurados."""
+    import httpx
+    from supabase import create_client, ClientOptions
+
+    timeout = httpx.Timeout(SUPABASE_TIMEOUT_SEG, connect=SUPABASE_CONNECT_TIMEOUT_SEG)
+    limites = httpx.Limits(
+        max_connections=SUPABASE_POOL_MAX,
+        max_keepalive_connections=SUPABASE_POOL_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRA_SEG,
+    )
+    http = httpx.Client(timeout=timeout, limits=limites,
+                        transport=httpx.HTTPTransport(limits=limites, retries=1))
+    try:
+        # SDKs recentes aceitam um httpx.Client próprio (pool e timeouts completos)
+        opcoes = ClientOptions(httpx_client=http, postgrest_client_timeout=SUPABASE_TIMEOUT_SEG)
+    except TypeError:
+        # SDKs antigos: o cliente PostgREST interno já mantém o pool; configura só o timeout
+        http.close()
+        opcoes = ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT_SEG)
+    return create_client(url, key, options=opcoes)
+
+
+def _cliente_saudavel(cliente) -> bool:
+    """Consulta mínima para verificar se a conexão com o Supabase continua válida."""
+    try:
+        cliente.table('Salas').select('Sala').limit(1).execute()
+        return True
+    except Exception as e:
+        print(f"Verificação do cliente Supabase falhou: {e}")
+        return False
+
+
+def obter_cliente_supabase(url: str, key: str):
+    """Retorna o cliente Supabase do processo, criando ou recriando quando necessário."""
+    global _cliente_supabase, _cliente_pid, _cliente_verificado_em
+    with _cliente_lock:
+        agora = time.monotonic()
+        cliente = _cliente_supabase if _cliente_pid == os.getpid() else None
+        if cliente is not None:
+            if agora - _cliente_verificado_em < SUPABASE_VERIFICACAO_SEG:
+                return cliente
+            # Cliente ocioso há muito tempo: esta thread o verifica e as outras seguem usando-o
+            _cliente_verificado_em = agora
+
+    # Fora da trava: uma verificação lenta (até o timeout) não segura as outras threads
+    if cliente is not None:
+        if _cliente_saudavel(cliente):
+            return cliente
+        print("Recriando cliente Supabase após falha na verificação.")
+
+    with _cliente_lock:
+        # Outra thread pode ter criado o cliente enquanto esta verificava ou esperava
+        if _cliente_supabase is not None and _cliente_supabase is not cliente and _cliente_pid == os.getpid():
+            return _cliente_supabase
+        _cliente_supabase = _criar_cliente_supabase(url, key)
+        _cliente_pid = os.getpid()
+        _cliente_verificado_em = time.monotonic()
+        return _cliente_supabase
+
+
+def marcar_cliente_usado():
+    """Registra uso bem-sucedido (adia a próxima verificação de saúde)."""
+    global _cliente_verificado_em
+    _cliente_verificado_em = time.monotonic()
+
+
+def descartar_cliente_supabase():
+    """Descarta o cliente atual; o próximo obter_cliente_supabase() cria outro."""
+    global _cliente_supabase
+    with _cliente_lock:
+        _cliente_supabase = None
+
+
+def _erro_de_conexao(erro: Exception) -> bool:
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(erro, (httpx.TransportError, httpx.TimeoutException))
+
+
+# -------------------- Motor Supabase --------------------
+
+class RepositorioSupabase(RepositorioOcorrencias):
+    """Acesso ao Supabase (PostgREST) com o cliente oficial."""
+    nome = 'supabase'
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.coluna_atualizacao = COLUNA_ATUALIZACAO_SUPABASE
+
+    def _executar(self, query, tabela: str, operacao: str):
+        """Executa a consulta; falhas de rede descartam o cliente para reconexão."""
+        try:
+            with metricas.medir('sgce_banco_segundos', etapa='banco', motor=self.nome, tabela=tabela, operacao=operacao):
+                response = query.execute()
+        except Exception as e:
+            if _erro_de_conexao(e):
+                descartar_cliente_supabase()
+            raise
+        marcar_cliente_usado()
+        metricas.incrementar('sgce_banco_linhas_total', len(response.data or []),
+                             motor=self.nome, tabela=tabela, operacao=operacao)
+        return response
+
+    def _em_paralelo(self, consultas, tabela: str):
+        """Executa as consultas em até SUPABASE_BLOCOS_PARALELOS threads e gera os resultados na ordem dada.
+
+        Só há SUPABASE_BLOCOS_PARALELOS blocos em voo ou à espera do consumidor por vez.
+        """
+        consultas = iter(consultas)
+        with ThreadPoolExecutor(max_workers=SUPABASE_BLOCOS_PARALELOS, thread_name_prefix='bloco') as pool:
+            pendentes = deque()
+            for consulta in consultas:
+                pendentes.append(pool.submit(self._executar, consulta, tabela, 'select'))
+                if len(pendentes) >= SUPABASE_BLOCOS_PARALELOS:
+                    break
+            while pendentes:
+                linhas = pendentes.popleft().result().data or []
+                proxima = next(consultas, None)
+                if proxima is not None:
+                    pendentes.append(pool.submit(self._executar, proxima, tabela, 'select'))
+                yield linhas
+
+    def _contar(self, query, tabela: str) -> int:
+        return self._executar(query.limit(1), tabela, 'count').count or 0
+
+    def _listar_paginado(self, tabela: str, colunas: str, *ordem: str) -> list[dict]:
+        """Tabela inteira em páginas de SUPABASE_MAX_LINHAS (a primeira traz o count; as demais vão em paralelo)."""
+        def consulta(inicio, **opcoes):
+            query = self.cliente.table(tabela).select(colunas, **opcoes)
+            for coluna in ordem:
+                query = query.order(coluna)
+            return query.range(inicio, inicio + SUPABASE_MAX_LINHAS - 1)
+
+        primeira = self._executar(consulta(0, count='exact'), tabela, 'select')
+        linhas = primeira.data or []
+        total = primeira.count if primeira.count is not None else len(linhas)
+        paginas = (consulta(inicio) for inicio in range(SUPABASE_MAX_LINHAS, total, SUPABASE_MAX_LINHAS))
+        for bloco in self._em_paralelo(paginas, tabela):
+            linhas.extend(bloco)
+        if len(linhas) != total:
+            raise CargaIncompleta(f"'{tabela}': {len(linhas)} linhas lidas de {total}")
+        return linhas
+
+    def listar_ocorrencias(self) -> list[dict]:
+        return [linha for bloco in self.listar_ocorrencias_em_blocos() for linha in bloco]
+
+    def listar_ocorrencias_em_blocos(self):
+        """Primeiro as SUPABASE_MAX_LINHAS linhas de ID mais alto (com o count da tabela); depois
+        faixas de ID abaixo delas, cada uma com no máximo SUPABASE_MAX_LINHAS IDs, em paralelo.
+        """
+        tabela = self.cliente.table
+        primeira = self._executar(
+            tabela('ocorrencias').select('*', count='exact').order('ID', desc=True).limit(SUPABASE_MAX_LINHAS),
+            'ocorrencias', 'select'
+        )
+        linhas = primeira.data or []
+        if not linhas:
+            return
+        maior_id = int(linhas[0]['ID'])
+        esperado = primeira.count if primeira.count is not None else len(linhas)
+        lidas = len(linhas)
+        yield linhas
+
+        if lidas < esperado:
+            # IDs inteiros e únicos: uma faixa de SUPABASE_MAX_LINHAS IDs nunca passa do limite
+            # da resposta. A última faixa fica aberta embaixo (IDs zero ou negativos).
+            menor_id = int(linhas[-1]['ID'])
+            limites = list(range(menor_id - 1, 0, -SUPABASE_MAX_LINHAS)) or [menor_id - 1]
+            faixas = []
+            for i, fim in enumerate(limites):
+                query = tabela('ocorrencias').select('*').lte('ID', fim)
+                if i < len(limites) - 1:
+                    query = query.gt('ID', fim - SUPABASE_MAX_LINHAS)
+                faixas.append(query.order('ID', desc=True))
+            for bloco in self._em_paralelo(faixas, 'ocorrencias'):
+                lidas += len(bloco)
+                yield bloco
+
+        if lidas != esperado:
+            # Linhas apagadas durante a carga também mudam o total: reconta só até o maior ID lido
+            atual = self._contar(tabela('ocorrencias').select('ID', count='exact').lte('ID', maior_id), 'ocorrencias')
+            if lidas != atual:
+                raise CargaIncompleta(f"'ocorrencias': {lidas} linhas lidas de {atual}")
+
+    def buscar_ocorrencias(self, ids) -> list[dict]:
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        response = self._executar(self.cliente.table('ocorrencias').select('*').in_('ID', ids), 'ocorrencias', 'select')
+        return response.data or []
+
+    def listar_ocorrencias_desde(self, id_maior_que: int, atualizado_desde=None) -> list[dict]:
+        query = self.cliente.table('ocorrencias').select('*')
+        if self.coluna_atualizacao and atualizado_desde:
+            # Valores com ':' e '+' precisam de aspas na sintaxe do or() do PostgREST
+            query = query.or_(f'ID.gt.{int(id_maior_que)},{self.coluna_atualizacao}.gte."{atualizado_desde}"')
+        else:
+            query = query.gt('ID', int(id_maior_que))
+        # Keyset por ID enquanto as páginas vierem cheias (delta grande após muito tempo sem sincronizar)
+        linhas, cursor = [], None
+        while True:
+            pagina = query if cursor is None else query.lt('ID', cursor)
+            bloco = self._executar(pagina.order('ID', desc=True).limit(SUPABASE_MAX_LINHAS),
+                                   'ocorrencias', 'select').data or []
+            linhas.extend(bloco)
+            if len(bloco) < SUPABASE_MAX_LINHAS:
+                return linhas
+            cursor = int(bloco[-1]['ID'])
+
+    def inserir_ocorrencia(self, dados: dict) -> dict | None:
+        response = self._executar(self.cliente.table('ocorrencias').insert(dados), 'ocorrencias', 'insert')
+        return response.data[0] if response.data else None
+
+    def atualizar_ocorrencia(self, oid, dados: dict) -> dict | None:
+        response = self._executar(self.cliente.table('ocorrencias').update(dados).eq('ID', oid), 'ocorrencias', 'update')
+        return response.data[0] if response.data else None
+
+    def atualizar_ocorrencias(self, ids, dados: dict) -> list[dict]:
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        # Um único PATCH ... ?ID=in.(...) em vez de uma requisição por linha
+        response = self._executar(self.cliente.table('ocorrencias').update(dados).in_('ID', ids), 'ocorrencias', 'update')
+        return response.data or []
+
+    def listar_alunos(self) -> list[dict]:
+        # Ordem total (todas as colunas): as páginas por offset não repetem nem pulam linhas
+        return self._listar_paginado('Alunos', 'Sala, Aluno, Tutor', 'Sala', 'Aluno', 'Tutor')
+
+    def listar_professores(self) -> list[dict]:
+        return self._listar_paginado('Professores', 'Professor', 'Professor')
+
+    def listar_salas(self) -> list[dict]:
+        return self._listar_paginado('Salas', 'Sala', 'Sala')
+
+    def consultar_ocorrencias(self, tutor=None, status=None, sala=None, aluno=None,
+                              apos=None, antes=None, limite=None) -> list[dict]:
+        # Sala/aluno vão para o PostgREST como ILIKE (sem diferença de maiúsculas) e são
+        # conferidos depois na forma normalizada, como tutor/status, que dependem dela.
+        query = self.cliente.table('ocorrencias').select('*')
+        if sala:
+            query = query.ilike('SALA', _padrao_literal(sala))
+        if aluno:
+            query = query.ilike('ALUNO', _padrao_literal(aluno))
+        if apos is not None:
+            query = query.lt('ID', int(apos))
+        if antes is not None:
+            query = query.gt('ID', int(antes))
+        filtro_local = bool(tutor or status)
+        query = query.order('ID', desc=antes is None)
+        if limite and not filtro_local:
+            query = query.limit(limite)
+        linhas = _filtrar_sala_aluno(self._executar(query, 'ocorrencias', 'select').data or [], sala, aluno)
+        if tutor:
+            linhas = [r for r in linhas if normalizar_texto(r.get('TUTOR')) == normalizar_texto(tutor)]
+        if status:
+            linhas = [r for r in linhas if status_exibicao(r) == status]
+        return _paginar_linhas(linhas, antes=antes, limite=limite)
+
+
+# -------------------- Motor SQLite --------------------
+
+_SQL_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ocorrencias (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    PROFESSOR TEXT, SALA TEXT, ALUNO TEXT, TUTOR TEXT,
+    DESCRICAO TEXT, ATP TEXT, ATT TEXT, ATC TEXT, ATG TEXT,
+    FT TEXT, FC TEXT, FG TEXT,
+    DCO TEXT, HCO TEXT, DT TEXT, DC TEXT, DG TEXT,
+    STATUS TEXT,
+    ATUALIZADO_EM TEXT,
+    TUTOR_NORM TEXT, SALA_NORM TEXT, ALUNO_NORM TEXT, STATUS_EXIBICAO TEXT
+);
+CREATE TABLE IF NOT EXISTS Alunos (Sala TEXT, Aluno TEXT, Tutor TEXT);
+CREATE TABLE IF NOT EXISTS Professores (Professor TEXT);
+CREATE TABLE IF NOT EXISTS Salas (Sala TEXT);
+
+-- Índices usados pelos filtros do /index, /relatorio_aluno e pelas contagens por aluno
+CREATE INDEX IF NOT EXISTS ix_ocorrencias_tutor_norm ON ocorrencias (TUTOR_NORM, ID);
+CREATE INDEX IF NOT EXISTS ix_ocorrencias_exibicao ON ocorrencias (STATUS_EXIBICAO, ID);
+CREATE INDEX IF NOT EXISTS ix_ocorrencias_sala_aluno_norm ON ocorrencias (SALA_NORM, ALUNO_NORM);
+CREATE INDEX IF NOT EXISTS ix_ocorrencias_aluno_norm ON ocorrencias (ALUNO_NORM);
+CREATE INDEX IF NOT EXISTS ix_alunos_sala ON Alunos (Sala);
+CREATE INDEX IF NOT EXISTS ix_ocorrencias_atualizado ON ocorrencias (ATUALIZADO_EM);
+
+-- Marca de última modificação usada pela sincronização incremental do cache
+CREATE TRIGGER IF NOT EXISTS tg_ocorrencias_inserida AFTER INSERT ON ocorrencias
+BEGIN
+    UPDATE ocorrencias SET ATUALIZADO_EM = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE ID = NEW.ID;
+END;
+CREATE TRIGGER IF NOT EXISTS tg_ocorrencias_alterada AFTER UPDATE ON ocorrencias
+WHEN NEW.ATUALIZADO_EM IS OLD.ATUALIZADO_EM
+BEGIN
+    UPDATE ocorrencias SET ATUALIZADO_EM = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE ID = NEW.ID;
+END;
+
+-- Colunas derivadas: alterada a origem (por este app ou por outro cliente), ficam
+-- vazias até o repositório recalculá-las. Recriado a cada abertura, com a lista de
+-- colunas de origem atual
+DROP TRIGGER IF EXISTS tg_ocorrencias_derivadas_vencidas;
+CREATE TRIGGER tg_ocorrencias_derivadas_vencidas AFTER UPDATE OF TUTOR, SALA, ALUNO, STATUS, FT, FC, FG ON ocorrencias
+BEGIN
+    UPDATE ocorrencias SET STATUS_EXIBICAO = NULL WHERE ID = NEW.ID;
+END;
+"""
+
+# Colunas acrescentadas depois da primeira versão do arquivo (ALTER TABLE ao abrir)
+_COLUNAS_NOVAS = ['ATUALIZADO_EM', 'TUTOR_NORM', 'SALA_NORM', 'ALUNO_NORM', 'STATUS_EXIBICAO']
+# Colunas derivadas; STATUS_EXIBICAO vazio marca a linha a recalcular
+_COLUNAS_DERIVADAS = ['TUTOR_NORM', 'SALA_NORM', 'ALUNO_NORM', 'STATUS_EXIBICAO']
+# Índices substituídos pelos das colunas derivadas. Os de expressão usavam NORM() e
+# STATUS_EXIBICAO(), funções registradas só nas conexões deste app: com eles, outro
+# cliente não conseguia gravar na tabela
+_INDICES_ANTIGOS = [
+    'ix_ocorrencias_tutor', 'ix_ocorrencias_status_exibicao', 'ix_ocorrencias_aluno', 'ix_ocorrencias_sala_aluno'
+]
+# Colunas lidas pelo app (as derivadas ficam de fora)
+_SELECT_OCORRENCIAS = f"SELECT {', '.join(COLUNAS_OCORRENCIAS)}, ATUALIZADO_EM FROM ocorrencias"
+
+
+BLOCO_SQLITE = 5000 # linhas por bloco na leitura da tabela inteira
+
+_TABELA_SQL = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+(\w+)', re.IGNORECASE)
+
+
+def _rotulos_sql(sql: str) -> tuple[str, str]:
+    """(tabela, operação) de um comando SQL, para as métricas."""
+    tabela = _TABELA_SQL.search(sql)
+    return (tabela.group(1) if tabela else '?'), sql.split(None, 1)[0].lower()
+
+
+class RepositorioSQLite(RepositorioOcorrencias):
+    """Banco local em arquivo SQLite, com as mesmas tabelas do Supabase.
+
+    Os filtros usam colunas derivadas, com índices comuns: TUTOR_NORM, SALA_NORM e
+    ALUNO_NORM (normalizar_texto, que trata acentos, ao contrário do UPPER do SQLite) e
+    STATUS_EXIBICAO (status_exibicao). Quem as calcula é o repositório, em Python:
+    o arquivo continua legível e gravável por qualquer cliente SQLite, e as linhas
+    que outro cliente inserir ou alterar (derivadas vazias) são completadas antes
+    da próxima consulta filtrada ou escrita deste app.
+    """
+    nome = 'sqlite'
+    filtros_no_banco = True
+    coluna_atualizacao = 'ATUALIZADO_EM'
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        with self._conexao() as conn:
+            colunas = [r[1] for r in conn.execute('PRAGMA table_info(ocorrencias)').fetchall()]
+            if colunas:
+                novas = [c for c in _COLUNAS_NOVAS if c not in colunas]
+                for coluna in novas:
+                    conn.execute(f'ALTER TABLE ocorrencias ADD COLUMN {coluna} TEXT')
+                if set(novas) & set(_COLUNAS_DERIVADAS):
+                    conn.execute('UPDATE ocorrencias SET STATUS_EXIBICAO = NULL') # recalcula todas
+                for indice in _INDICES_ANTIGOS:
+                    conn.execute(f'DROP INDEX IF EXISTS {indice}')
+            conn.executescript(_SQL_ESQUEMA)
+            self._completar_derivadas(conn)
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Uma conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, 'conn', None)
+        # Conexão aberta antes de um fork (gunicorn --preload) não é reaproveitada no filho
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.caminho)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _consultar(self, sql: str, params=()) -> list[dict]:
+        tabela, operacao = _rotulos_sql(sql)
+        with metricas.medir('sgce_banco_segundos', etapa='banco', motor=self.nome, tabela=tabela, operacao=operacao):
+            linhas = [dict(r) for r in self._conexao().execute(sql, params).fetchall()]
+        metricas.incrementar('sgce_banco_linhas_total', len(linhas), motor=self.nome, tabela=tabela, operacao=operacao)
+        return linhas
+
+    def _escrever(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Executa um INSERT/UPDATE numa transação, junto com o cálculo das colunas derivadas."""
+        tabela, operacao = _rotulos_sql(sql)
+        with metricas.medir('sgce_banco_segundos', etapa='banco', motor=self.nome, tabela=tabela, operacao=operacao):
+            with self._conexao() as conn:
+                cursor = conn.execute(sql, params)
+                self._completar_derivadas(conn)
+                return cursor
+
+    @staticmethod
+    def _completar_derivadas(conn: sqlite3.Connection) -> int:
+        """Calcula as colunas derivadas das linhas em que STATUS_EXIBICAO está vazio."""
+        linhas = conn.execute(
+            'SELECT ID, TUTOR, SALA, ALUNO, STATUS, FT, FC, FG FROM ocorrencias WHERE STATUS_EXIBICAO IS NULL'
+        ).fetchall()
+        if linhas:
+            conn.executemany(
+                'UPDATE ocorrencias SET TUTOR_NORM = ?, SALA_NORM = ?, ALUNO_NORM = ?, STATUS_EXIBICAO = ? WHERE ID = ?',
+                [(normalizar_texto(r['TUTOR']), normalizar_texto(r['SALA']), normalizar_texto(r['ALUNO']),
+                  status_exibicao(dict(r)), r['ID']) for r in linhas]
+            )
+        return len(linhas)
+
+    def _consultar_derivadas(self, sql: str, params=()) -> list[dict]:
+        """Consulta sobre as colunas derivadas, completando antes as gravadas por outro cliente."""
+        conn = self._conexao()
+        if conn.execute('SELECT 1 FROM ocorrencias WHERE STATUS_EXIBICAO IS NULL LIMIT 1').fetchone():
+            with conn:
+                self._completar_derivadas(conn)
+        return self._consultar(sql, params)
+
+    def listar_ocorrencias(self) -> list[dict]:
+        return self._consultar(f'{_SELECT_OCORRENCIAS} ORDER BY ID DESC')
+
+    def listar_ocorrencias_em_blocos(self):
+        cursor = self._conexao().execute(f'{_SELECT_OCORRENCIAS} ORDER BY ID DESC')
+        while True:
+            with metricas.medir('sgce_banco_segundos', etapa='banco', motor=self.nome, tabela='ocorrencias', operacao='select'):
+                linhas = [dict(r) for r in cursor.fetchmany(BLOCO_SQLITE)]
+            metricas.incrementar('sgce_banco_linhas_total', len(linhas), motor=self.nome, tabela='ocorrencias', operacao='select')
+            if not linhas:
+                return
+            yield linhas
+
+    def buscar_ocorrencias(self, ids) -> list[dict]:
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        marcadores = ','.join('?' * len(ids))
+        return self._consultar(f'{_SELECT_OCORRENCIAS} WHERE ID IN ({marcadores})', ids)
+
+    def listar_ocorrencias_desde(self, id_maior_que: int, atualizado_desde=None) -> list[dict]:
+        if atualizado_desde:
+            return self._consultar(
+                f'{_SELECT_OCORRENCIAS} WHERE ID > ? OR ATUALIZADO_EM >= ? ORDER BY ID DESC',
+                (int(id_maior_que), atualizado_desde)
+            )
+        return self._consultar(f'{_SELECT_OCORRENCIAS} WHERE ID > ? ORDER BY ID DESC', (int(id_maior_que),))
+
+    def inserir_ocorrencia(self, dados: dict) -> dict | None:
+        colunas = [c for c in dados if c in COLUNAS_OCORRENCIAS]
+        sql = (f"INSERT INTO ocorrencias ({', '.join(colunas)}) "
+               f"VALUES ({', '.join('?' * len(colunas))})")
+        cursor = self._escrever(sql, [dados[c] for c in colunas])
+        return self.buscar_ocorrencia(cursor.lastrowid)
+
+    def atualizar_ocorrencia(self, oid, dados: dict) -> dict | None:
+        colunas = [c for c in dados if c in COLUNAS_OCORRENCIAS and c != 'ID']
+        if colunas:
+            sql = f"UPDATE ocorrencias SET {', '.join(f'{c} = ?' for c in colunas)} WHERE ID = ?"
+            self._escrever(sql, [dados[c] for c in colunas] + [int(oid)])
+        return self.buscar_ocorrencia(oid)
+
+    def atualizar_ocorrencias(self, ids, dados: dict) -> list[dict]:
+        ids = [int(i) for i in ids]
+        colunas = [c for c in dados if c in COLUNAS_OCORRENCIAS and c != 'ID']
+        if not ids:
+            return []
+        if colunas:
+            marcadores = ','.join('?' * len(ids))
+            sql = (f"UPDATE ocorrencias SET {', '.join(f'{c} = ?' for c in colunas)} "
+                   f"WHERE ID IN ({marcadores})")
+            self._escrever(sql, [dados[c] for c in colunas] + ids)
+        return self.buscar_ocorrencias(ids)
+
+    def listar_alunos(self) -> list[dict]:
+        return self._consultar('SELECT Sala, Aluno, Tutor FROM Alunos')
+
+    def listar_professores(self) -> list[dict]:
+        return self._consultar('SELECT Professor FROM Professores ORDER BY Professor')
+
+    def listar_salas(self) -> list[dict]:
+        return self._consultar('SELECT Sala FROM Salas ORDER BY Sala')
+
+    def _condicoes(self, tutor=None, status=None, sala=None, aluno=None):
+        condicoes, params = [], []
+        if tutor:
+            condicoes.append('TUTOR_NORM = ?')
+            params.append(normalizar_texto(tutor))
+        if status:
+            condicoes.append('STATUS_EXIBICAO = ?')
+            params.append(status)
+        if sala:
+            condicoes.append('SALA_NORM = ?')
+            params.append(normalizar_texto(sala))
+        if aluno:
+            condicoes.append('ALUNO_NORM = ?')
+            params.append(normalizar_texto(aluno))
+        return condicoes, params
+
+    def consultar_ocorrencias(self, tutor=None, status=None, sala=None, aluno=None,
+                              apos=None, antes=None, limite=None) -> list[dict]:
+        condicoes, params = self._condicoes(tutor, status, sala, aluno)
+        if apos is not None:
+            condicoes.append('ID < ?')
+            params.append(int(apos))
+        if antes is not None:
+            # Página anterior: os IDs logo acima do cursor, em ordem crescente, depois invertidos
+            condicoes.append('ID > ?')
+            params.append(int(antes))
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+        ordem = 'ASC' if antes is not None else 'DESC'
+        sql = f'{_SELECT_OCORRENCIAS} {where} ORDER BY ID {ordem}'
+        if limite:
+            sql += f' LIMIT {int(limite)}'
+        linhas = self._consultar_derivadas(sql, params)
+        return linhas[::-1] if antes is not None else linhas
+
+    def contar_ocorrencias(self, tutor=None, status=None) -> int:
+        condicoes, params = self._condicoes(tutor, status)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+        return self._consultar_derivadas(f'SELECT COUNT(*) AS N FROM ocorrencias {where}', params)[0]['N']
+
+    def listar_tutores(self) -> list[str]:
+        linhas = self._consultar_derivadas('SELECT DISTINCT TUTOR_NORM AS TUTOR FROM ocorrencias ORDER BY 1')
+        return [r['TUTOR'] for r in linhas]
+
+    def contar_ocorrencias_por_aluno(self) -> dict[str, int]:
+        linhas = self._consultar_derivadas('SELECT ALUNO_NORM AS ALUNO, COUNT(*) AS N FROM ocorrencias GROUP BY ALUNO_NORM')
+        return {r['ALUNO']: r['N'] for r in linhas}
+
+    def listar_alunos_por_sala(self) -> dict[str, list[str]]:
+        # Pares distintos lidos só do índice (SALA_NORM, ALUNO_NORM), sem tocar nas linhas
+        linhas = self._consultar_derivadas(
+            'SELECT DISTINCT SALA_NORM AS SALA, ALUNO_NORM AS ALUNO FROM ocorrencias ORDER BY 1, 2')
+        por_sala = {}
+        for r in linhas:
+            por_sala.setdefault(r['SALA'], []).append(r['ALUNO'])
+        return por_sala
+
+    def importar_de(self, origem: RepositorioOcorrencias):
+        """Copia as quatro tabelas de outro repositório (ex.: Supabase) para o arquivo local."""
+        ocorrencias = origem.listar_ocorrencias()
+        alunos = origem.listar_alunos()
+        professores = origem.listar_professores()
+        salas = origem.listar_salas()
+
+        marcadores = ', '.join('?' * len(COLUNAS_OCORRENCIAS))
+        with self._conexao() as conn:
+            for tabela in ('ocorrencias', 'Alunos', 'Professores', 'Salas'):
+                conn.execute(f'DELETE FROM {tabela}')
+            conn.executemany(
+                f"INSERT INTO ocorrencias ({', '.join(COLUNAS_OCORRENCIAS)}) VALUES ({marcadores})",
+                [[r.get(c) for c in COLUNAS_OCORRENCIAS] for r in ocorrencias]
+            )
+            conn.executemany('INSERT INTO Alunos (Sala, Aluno, Tutor) VALUES (?, ?, ?)',
+                             [(r.get('Sala'), r.get('Aluno'), r.get('Tutor')) for r in alunos])
+            conn.executemany('INSERT INTO Professores (Professor) VALUES (?)',
+                             [(r.get('Professor'),) for r in professores])
+            conn.executemany('INSERT INTO Salas (Sala) VALUES (?)',
+                             [(r.get('Sala'),) for r in salas])
+            self._completar_derivadas(conn)
+        return len(ocorrencias)
+
+
+# -------------------- Seleção do motor --------------------
+
+BACKEND = os.environ.get('IDR_BACKEND', 'supabase').lower()
+SQLITE_PATH = os.environ.get('IDR_SQLITE_PATH', 'sgce_local.db')
+
+
+if __name__ == '__main__':
+    # Uso: python repositorio.py importar [caminho.db]
+    # Copia o Supabase (SUPABASE_URL/SUPABASE_KEY) para um arquivo SQLite local.
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'importar':
+        print('Uso: python repositorio.py importar [caminho.db]')
+        sys.exit(1)
+    destino = RepositorioSQLite(sys.argv[2] if len(sys.argv) > 2 else SQLITE_PATH)
+    origem = RepositorioSupabase(obter_cliente_supabase(os.environ['SUPABASE_URL'], os.environ['SUPABASE_KEY']))
+    total = destino.importar_de(origem)
+    print(f'{total} ocorrências importadas para {destino.caminho}')
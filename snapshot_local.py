@@ -0,0 +1,124 @@
+"""Snapshot local, em disco, das tabelas já normalizadas (partida a quente e modo somente leitura).
+
+- ocorrencias.parquet: o DataFrame de ocorrências como fica em cache (categorias,
+  strings Arrow e datas com fuso preservadas), com os metadados no esquema.
+- referencias.json: cadastro de alunos, professores e salas.
+
+Os metadados trazem a origem dos dados (motor e banco), a marca d'água da
+sincronização incremental e os instantes da última sincronização e da última
+carga completa. Um snapshot de outra origem ou de outro formato é ignorado.
+
+Diferente do cache compartilhado (em /dev/shm, some no reboot), este diretório
+sobrevive ao reinício dos workers e da máquina. É um por usuário, criado com
+permissão 0700, e não é usado se pertencer a outro usuário. Desligado com
+IDR_SNAPSHOT_LOCAL=0 ou sem o pyarrow (sem formato alternativo: um pickle lido
+de um diretório temporário executaria código de quem o gravou).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from importacao_tardia import disponivel, modulo_tardio
+
+HAS_PYARROW = disponivel('pyarrow')
+pa = modulo_tardio('pyarrow')
+pq = modulo_tardio('pyarrow.parquet')
+
+HABILITADO = HAS_PYARROW and os.environ.get('IDR_SNAPSHOT_LOCAL', '1') != '0'
+DIRETORIO = os.environ.get('IDR_SNAPSHOT_DIR') or os.path.join(
+    tempfile.gettempdir(), f"sgce_snapshot-{os.getuid() if hasattr(os, 'getuid') else 0}"
+)
+INTERVALO_GRAVACAO_SEG = float(os.environ.get('IDR_SNAPSHOT_INTERVALO_SEG', '60'))
+FORMATO = 1
+
+_CHAVE_META = b'sgce'
+_trava = threading.Lock()
+_gravado_em = 0.0
+
+
+def _caminho(nome: str) -> str:
+    return os.path.join(DIRETORIO, nome)
+
+
+def _caminho_ocorrencias() -> str:
+    return _caminho('ocorrencias.parquet')
+
+
+def _diretorio_proprio() -> bool:
+    """Se o diretório existe e é deste usuário."""
+    try:
+        dono = os.stat(DIRETORIO).st_uid
+    except FileNotFoundError:
+        return False
+    return not hasattr(os, 'getuid') or dono == os.getuid()
+
+
+def _substituir(destino: str, escrever):
+    """Grava num temporário e troca de uma vez (leitores veem o arquivo antigo ou o novo)."""
+    temporario = f'{destino}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        escrever(temporario)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def vencido() -> bool:
+    """Se já passou INTERVALO_GRAVACAO_SEG desde a última gravação deste processo."""
+    return time.time() - _gravado_em >= INTERVALO_GRAVACAO_SEG
+
+
+def gravar(ocorrencias, referencias: dict, meta: dict):
+    """Grava as ocorrências (DataFrame) e as referências ({'alunos': [...], 'professores': [...], 'salas': [...]})."""
+    global _gravado_em
+    meta = dict(meta, formato=FORMATO, gravado_em=time.time())
+    with _trava:
+        os.makedirs(DIRETORIO, mode=0o700, exist_ok=True)
+        if not _diretorio_proprio():
+            raise PermissionError(f"{DIRETORIO} pertence a outro usuário")
+
+        def escrever_ocorrencias(caminho):
+            tabela = pa.Table.from_pandas(ocorrencias, preserve_index=False)
+            metadados = dict(tabela.schema.metadata or {})
+            metadados[_CHAVE_META] = json.dumps(meta).encode()
+            pq.write_table(tabela.replace_schema_metadata(metadados), caminho, compression='snappy')
+
+        def escrever_referencias(caminho):
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(dict(referencias, origem=meta['origem'], formato=FORMATO), f, ensure_ascii=False)
+
+        _substituir(_caminho_ocorrencias(), escrever_ocorrencias)
+        _substituir(_caminho('referencias.json'), escrever_referencias)
+        _gravado_em = time.time()
+
+
+def carregar(origem: str):
+    """(meta, ocorrencias, referencias) do snapshot da origem dada, ou None se não houver um válido.
+
+    referencias pode vir vazio ({}) se o arquivo das referências faltar ou for de outra origem.
+    """
+    caminho = _caminho_ocorrencias()
+    if not _diretorio_proprio() or not os.path.exists(caminho):
+        return None
+    try:
+        tabela = pq.read_table(caminho)
+        meta = json.loads(tabela.schema.metadata[_CHAVE_META])
+        if meta.get('formato') != FORMATO or meta.get('origem') != origem:
+            return None
+        ocorrencias = tabela.to_pandas()
+    except Exception as e:
+        print(f"Snapshot local ilegível, ignorado: {e}")
+        return None
+
+    referencias = {}
+    try:
+        with open(_caminho('referencias.json'), encoding='utf-8') as f:
+            lidas = json.load(f)
+        if lidas.get('formato') == FORMATO and lidas.get('origem') == origem:
+            referencias = {k: lidas[k] for k in ('alunos', 'professores', 'salas') if lidas.get(k) is not None}
+    except (OSError, ValueError):
+        pass
+    return meta, ocorrencias, referencias
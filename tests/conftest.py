@@ -0,0 +1,271 @@
+"""Configuração comum dos testes: o app sobre um banco SQLite temporário com dados sintéticos.
+
+Cada teste recebe um banco novo (fixture banco), preenchido pelo
+RepositorioSQLite.importar_de a partir de tabelas geradas em memória, e começa
+com os caches do app vazios, como um worker recém-iniciado. O cache
+compartilhado entre workers, o cache de páginas e o snapshot em disco ficam
+desligados, salvo nos testes que os ligam.
+
+A fixture escritas grava no banco um dos CENARIOS de escrita e faz o app
+tomar conhecimento dele por um dos MODOS incrementais; os testes comparam o
+que o app montou por diferença com uma carga do zero (Banco.recarga_completa).
+
+RepositorioMemoria serve as mesmas tabelas pelas implementações genéricas em
+Python de RepositorioOcorrencias; é a referência das consultas feitas em SQL.
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Antes do import do app: os módulos leem a configuração na importação
+os.environ.update(IDR_BACKEND='sqlite', IDR_CACHE_COMPARTILHADO='0', IDR_CACHE_PAGINAS_BYTES='0', IDR_PRECARREGAR='0',
+                  IDR_SNAPSHOT_LOCAL='0')
+
+import pandas as pd
+import pytest
+
+import app as aplicacao
+from repositorio import RepositorioOcorrencias, RepositorioSQLite
+
+OCORRENCIAS = 400
+
+SALAS = ['6A', '6B', '7A', '7B', '8A', '9A']
+TUTORES = ['ANA PAULA', 'JOÃO SILVA', 'MÁRCIA LIMA', 'JOSÉ ROCHA']
+PROFESSORES = ['CARLOS MENDES', 'FÁTIMA SOUZA', 'HELENA DIAS', 'PEDRO ALVES', 'SÉRGIO NUNES']
+NOMES = ['ANA', 'BRUNO', 'CAIO', 'DÉBORA', 'ÉRICA', 'FÁBIO', 'GISELE', 'HEITOR', 'ÍRIS', 'JÚLIA']
+SOBRENOMES = ['ARAÚJO', 'BARROS', 'CONCEIÇÃO', 'DUARTE', 'ESTÊVÃO']
+DESCRICOES = [
+    'Uso de celular durante a aula.', 'Agressão verbal a colega.', 'Saiu da sala sem autorização.',
+    'Não realizou a atividade proposta.', 'Conversa excessiva durante a explicação.',
+]
+# Grafias do cadastro para o mesmo tutor (o app normaliza com strip/upper)
+GRAFIAS_TUTOR = [str.upper, str.title, lambda t: f'  {t.lower()} ']
+
+
+def gerar_tabelas(quantidade: int = OCORRENCIAS, semente: int = 7) -> dict[str, list[dict]]:
+    """Tabelas 'ocorrencias', 'Alunos', 'Professores' e 'Salas' reprodutíveis a partir da semente."""
+    rnd = random.Random(semente)
+    alunos = [
+        {'Sala': SALAS[i % len(SALAS)], 'Aluno': f'{nome} {sobrenome}', 'Tutor': TUTORES[i % len(TUTORES)]}
+        for i, (nome, sobrenome) in enumerate((n, s) for s in SOBRENOMES for n in NOMES)
+    ]
+    inicio = datetime(2024, 2, 5, 11, tzinfo=timezone.utc)
+    ocorrencias = []
+    for oid in range(1, quantidade + 1):
+        aluno = rnd.choice(alunos)
+        # Com microssegundos, como os timestamps gravados pelo app
+        dco = inicio + timedelta(days=rnd.randrange(300), minutes=rnd.randrange(480), microseconds=rnd.randrange(1, 10**6))
+        linha = {
+            'ID': oid, 'PROFESSOR': rnd.choice(PROFESSORES), 'SALA': aluno['Sala'], 'ALUNO': aluno['Aluno'],
+            'TUTOR': rnd.choice(GRAFIAS_TUTOR)(aluno['Tutor']), 'DESCRICAO': rnd.choice(DESCRICOES),
+            'ATP': rnd.choice(['', 'Conversa com o aluno.']), 'ATT': '', 'ATC': '', 'ATG': '',
+            'DCO': dco.isoformat(), 'HCO': dco.strftime('%H:%M:%S'),
+        }
+        for flag, data, texto in (('FT', 'DT', 'ATT'), ('FC', 'DC', 'ATC'), ('FG', 'DG', 'ATG')):
+            acionado = rnd.random() < 0.5
+            atendido = acionado and rnd.random() < 0.6
+            linha[flag] = 'SIM' if acionado else 'NÃO'
+            linha[data] = (dco + timedelta(days=rnd.randrange(1, 12))).isoformat() if atendido else None
+            if atendido:
+                linha[texto] = 'Atendimento registrado.'
+        linha['STATUS'] = 'ASSINADA' if rnd.random() < 0.2 else rnd.choice(['ATENDIMENTO', 'FINALIZADA'])
+        ocorrencias.append(linha)
+    return {
+        'ocorrencias': ocorrencias,
+        'Alunos': alunos,
+        'Professores': [{'Professor': p} for p in PROFESSORES],
+        'Salas': [{'Sala': s} for s in SALAS],
+    }
+
+
+class RepositorioMemoria(RepositorioOcorrencias):
+    """As tabelas geradas servidas pelas consultas genéricas (em Python) da interface."""
+    nome = 'memoria'
+
+    def __init__(self, tabelas: dict[str, list[dict]]):
+        self.tabelas = tabelas
+
+    def listar_ocorrencias(self) -> list[dict]:
+        return sorted(self.tabelas['ocorrencias'], key=lambda r: r['ID'], reverse=True)
+
+    def buscar_ocorrencias(self, ids) -> list[dict]:
+        ids = {int(i) for i in ids}
+        return [r for r in self.listar_ocorrencias() if r['ID'] in ids]
+
+    def listar_alunos(self) -> list[dict]:
+        return list(self.tabelas['Alunos'])
+
+    def listar_professores(self) -> list[dict]:
+        return list(self.tabelas['Professores'])
+
+    def listar_salas(self) -> list[dict]:
+        return list(self.tabelas['Salas'])
+
+
+# Estado por processo do app; cada teste começa como um worker recém-iniciado
+_ESTADO_INICIAL = {
+    '_df_cache': None,
+    '_df_marca': lambda: {'id': 0, 'atualizado_em': None},
+    '_df_recarregado_em': 0.0,
+    '_df_sincronizado_em': 0.0,
+    '_df_pendente': False,
+    '_ids_pendentes': set,
+    '_recarga_forcada': False,
+    '_df_restaurado': False,
+    '_falha_remota_em': None,
+    '_df_versao': -1,
+    '_derivados': dict,
+    '_ultimo_delta': None,
+    '_versao_escritas': 0,
+    '_alunos_cache': None,
+    '_alunos_por_sala': None,
+    '_roster_alunos': None,
+    '_busca_alunos': None,
+    '_professores_cache': None,
+    '_salas_cache': None,
+    '_tabelas_vencidas': set,
+}
+
+
+def estado_inicial() -> dict:
+    return {nome: valor() if callable(valor) else valor for nome, valor in _ESTADO_INICIAL.items()}
+
+
+class RepositorioDoApp:
+    """O repositório como o app o recebe: repassa tudo ao do banco do teste e conta as chamadas."""
+
+    def __init__(self, banco):
+        self._banco = banco
+
+    def __getattr__(self, nome):
+        valor = getattr(self._banco.repo, nome)
+        if nome.startswith('_') or not callable(valor):
+            return valor
+
+        def contado(*args, **kwargs):
+            self._banco.chamadas += 1
+            return valor(*args, **kwargs)
+        return contado
+
+
+class Banco:
+    """Banco SQLite do teste, a referência em memória e as escritas usadas pelos testes.
+
+    chamadas conta as chamadas do app ao repositório (as escritas dos testes não entram).
+    """
+
+    def __init__(self, caminho: str):
+        self.tabelas = gerar_tabelas()
+        self.memoria = RepositorioMemoria(self.tabelas)
+        self.repo = RepositorioSQLite(caminho)
+        self.repo.importar_de(self.memoria)
+        self.chamadas = 0
+
+    def recarga_completa(self) -> pd.DataFrame:
+        """O DataFrame que uma carga do zero montaria agora (referência dos testes)."""
+        return aplicacao.montar_dataframe_ocorrencias(self.repo.listar_ocorrencias())
+
+    # Escritas dos CENARIOS; cada uma retorna as linhas gravadas, como o banco as devolve
+
+    def inserir(self) -> list[dict]:
+        """Nova ocorrência com sala, tutor e professor que ainda não aparecem nas ocorrências (como o POST de /nova)."""
+        agora = datetime.now(timezone.utc)
+        return [self.repo.inserir_ocorrencia({
+            'PROFESSOR': 'PROFESSOR NOVO', 'SALA': '9Z', 'ALUNO': 'ALUNO NOVO', 'TUTOR': 'TUTOR NOVO',
+            'DESCRICAO': 'Trombone tocado durante a prova.', 'ATP': 'Conversa com o aluno.',
+            'ATT': '', 'ATC': '', 'ATG': '', 'FT': 'SIM', 'FC': 'NÃO', 'FG': 'NÃO',
+            'DCO': agora.isoformat(), 'HCO': agora.strftime('%H:%M:%S'),
+            'DT': None, 'DC': None, 'DG': None, 'STATUS': 'ATENDIMENTO',
+        })]
+
+    def editar(self) -> list[dict]:
+        """Atendimento do tutor e descrição reescrita numa ocorrência pendente da carga inicial (como o POST de /editar)."""
+        oid = max(r['ID'] for r in self.repo.listar_ocorrencias() if r['FT'] == 'SIM' and r['ID'] <= OCORRENCIAS)
+        return [self.repo.atualizar_ocorrencia(oid, {
+            'DESCRICAO': 'Descrição revisada pela coordenação.',
+            'ATT': 'Xilofone devolvido ao responsável.', 'FT': 'NÃO',
+            'DT': datetime.now(timezone.utc).isoformat(), 'STATUS': 'ATENDIMENTO',
+        })]
+
+    def assinar(self) -> list[dict]:
+        """Impressão das ocorrências de um aluno (como /gerar_pdf_aluno): todas viram ASSINADA num único UPDATE."""
+        linhas = self.repo.listar_ocorrencias()
+        aluno = next(r['ALUNO'] for r in linhas if r['STATUS'] != 'ASSINADA')
+        return self.repo.atualizar_ocorrencias([r['ID'] for r in linhas if r['ALUNO'] == aluno], {'STATUS': 'ASSINADA'})
+
+
+# Escritas gravadas no banco, isoladas e todas juntas
+CENARIOS = [('inserir',), ('editar',), ('assinar',), ('inserir', 'editar', 'assinar')]
+# Como o app fica sabendo delas:
+# - outro_worker: não fica; a sincronização agendada (intervalo vencido) traz o delta pela marca d'água
+# - este_worker: a rota registra os IDs escritos, sem coluna de modificação no banco
+# - escrita_no_cache: a rota aplica ao cache as linhas devolvidas pela escrita
+MODOS = ['outro_worker', 'este_worker', 'escrita_no_cache']
+
+
+class Escritas:
+    """Um cenário de CENARIOS aplicado pelo caminho incremental de um dos MODOS."""
+
+    def __init__(self, banco: Banco, cenario: tuple, modo: str, monkeypatch):
+        self.banco, self.cenario, self.modo, self.monkeypatch = banco, cenario, modo, monkeypatch
+        if modo == 'este_worker':
+            # Desde a carga inicial: a marca d'água fica só no ID
+            monkeypatch.setattr(banco.repo, 'coluna_atualizacao', None)
+
+    def aplicar(self) -> dict[str, list[dict]]:
+        """Grava o cenário no banco e avisa o app conforme o modo; retorna as linhas gravadas por escrita."""
+        gravadas = {}
+        for nome in self.cenario:
+            linhas = gravadas[nome] = getattr(self.banco, nome)()
+            if self.modo == 'este_worker':
+                aplicacao.registrar_escrita_ocorrencias(ids(linhas))
+            elif self.modo == 'escrita_no_cache':
+                assert aplicacao.aplicar_escrita_no_cache(linhas)
+        if self.modo == 'outro_worker':
+            self.monkeypatch.setattr(aplicacao, 'DELTA_INTERVALO_SEG', 0)
+        return gravadas
+
+    def conferir_derivado(self, nome: str, reconstruir, normalizar=lambda valor: valor):
+        """Depois da leitura que trouxe o cenário: o derivado 'nome' acompanhou a versão dos
+        dados pelo delta (sem passar pelo construtor) e é igual ao reconstruído de uma carga do zero."""
+        versao, valor = aplicacao._derivados[nome]
+        assert versao == aplicacao._df_versao
+        completo = self.banco.recarga_completa()
+        assert_mesmas_ocorrencias(aplicacao._df_cache, completo)
+        assert normalizar(valor) == normalizar(reconstruir(completo))
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    for nome, valor in estado_inicial().items():
+        monkeypatch.setattr(aplicacao, nome, valor)
+    novo = Banco(str(tmp_path / 'sgce.db'))
+    monkeypatch.setattr(aplicacao, '_repositorio', RepositorioDoApp(novo))
+    return novo
+
+
+@pytest.fixture(params=[(c, m) for c in CENARIOS for m in MODOS], ids=lambda p: f"{'+'.join(p[0])}-{p[1]}")
+def escritas(request, banco, monkeypatch) -> Escritas:
+    return Escritas(banco, *request.param, monkeypatch)
+
+
+@pytest.fixture
+def navegador(banco):
+    return aplicacao.app.test_client()
+
+
+def ids(linhas) -> list[int]:
+    return [r['ID'] for r in linhas]
+
+
+def ordenar_por_id(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values('Nº Ocorrência', ascending=False, ignore_index=True)
+
+
+def assert_mesmas_ocorrencias(incremental: pd.DataFrame, completo: pd.DataFrame):
+    """Mesmas linhas, valores e tipos, sem depender da ordem; as categorias podem guardar valores que já saíram."""
+    pd.testing.assert_frame_equal(ordenar_por_id(incremental), ordenar_por_id(completo), check_categorical=False)
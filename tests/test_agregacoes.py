@@ -0,0 +1,66 @@
+"""Cubo dos relatórios: atualizado por diferença e consultado por intervalo, deve dar o mesmo que as linhas do zero."""
+import pytest
+
+import agregacoes
+import app as aplicacao
+
+
+def cubo_do_zero(df):
+    return agregacoes.construir_cubo(aplicacao._contribuicoes_cubo(df), aplicacao.SETORES_ATENDIMENTO)
+
+
+def test_cubo_atualizado_igual_ao_reconstruido(banco, escritas):
+    aplicacao.consultar_cubo(None, None, ['Status'])  # monta o cubo da versão atual
+    escritas.aplicar()
+    aplicacao.carregar_dados()
+    escritas.conferir_derivado('cubo', cubo_do_zero, lambda cubo: cubo.sort_index().to_dict('index'))
+
+
+def test_contribuicoes_atualizadas_iguais_as_reconstruidas(banco, escritas):
+    aplicacao.consultar_cubo('2024-03-10', '2024-10-20', ['Status'])  # meses parciais: monta as contribuições
+    escritas.aplicar()
+    aplicacao.carregar_dados()
+    escritas.conferir_derivado('contribuicoes', aplicacao._contribuicoes_cubo, lambda contrib: contrib.to_dict('list'))
+
+
+def contar_linha_a_linha(df, start, end, chave) -> dict:
+    """Ocorrências por 'chave' com DCO (data local) em [start, end], contadas direto no DataFrame."""
+    dias = aplicacao._datas_ocorrencia(df)
+    no_intervalo = df[(dias >= start) & (dias <= end)]
+    valores = aplicacao.calcular_status_exibicao(no_intervalo)['DisplayStatus'] if chave == 'Status' else no_intervalo[chave]
+    return valores.value_counts().sort_index().to_dict()
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2024-03-10', '2024-10-20'),  # meses parciais nas duas pontas
+    ('2024-04-01', '2024-06-30'),  # só meses inteiros
+    ('2024-05-07', '2024-05-21'),  # dentro de um mês
+])
+def test_relatorios_por_intervalo_iguais_a_contagem_direta(banco, navegador, start, end):
+    df = aplicacao.carregar_dados()
+    geral = aplicacao.calcular_relatorio_estatistico(start, end)
+    assert geral['por_status'] == contar_linha_a_linha(df, start, end, 'Status')
+    assert geral['total'] == sum(geral['por_status'].values()) > 0
+    salas = {r['Sala']: r['Total Ocorrências'] for r in aplicacao.calcular_relatorio_por_sala(start, end)}
+    assert salas == contar_linha_a_linha(df, start, end, 'Sala')
+    tutores = {t: r['total'] for t, r in aplicacao.calcular_relatorio_estatistico_tutor(start, end).items()}
+    assert tutores == contar_linha_a_linha(df, start, end, 'Tutor')
+
+    resposta = navegador.get('/relatorio_tutor', query_string={'start': start, 'end': end})
+    assert resposta.status_code == 200
+    assert all(tutor in resposta.get_data(as_text=True) for tutor in tutores)
+
+
+@pytest.mark.parametrize('url', ['/relatorio_alunos_tutor', '/relatorio_tutoraluno'])
+def test_alunos_por_tutor(banco, navegador, url):
+    df = aplicacao.carregar_dados()
+    dados = aplicacao.calcular_relatorio_tutor_ocorrencias()
+    contagem = df['Aluno'].astype(str).value_counts()
+    for alunos in dados.values():
+        for a in alunos:
+            assert a['Quantidade Ocorrências'] == contagem.get(a['Aluno'], 0)
+
+    resposta = navegador.get(url)
+    assert resposta.status_code == 200
+    html = resposta.get_data(as_text=True)
+    assert all(tutor in html for tutor in dados)
@@ -0,0 +1,51 @@
+"""Impressão em lote (/gerar_pdf_aluno): as ocorrências selecionadas são lidas e assinadas com uma consulta cada."""
+import pytest
+
+import app as aplicacao
+from conftest import assert_mesmas_ocorrencias, ids
+
+
+def test_atualizacao_em_lote(banco):
+    alvo = [3, 50, 51, 399]
+    linhas = banco.repo.atualizar_ocorrencias(alvo, {'STATUS': 'ASSINADA', 'NAO_EXISTE': 'x'})
+    assert sorted(ids(linhas)) == alvo
+    assert all(r['STATUS'] == 'ASSINADA' for r in linhas)
+    originais = [r for r in banco.memoria.listar_ocorrencias() if r['ID'] not in alvo]
+    intactas = [r for r in banco.repo.listar_ocorrencias() if r['ID'] not in alvo]
+    assert [{c: r[c] for c in originais[0]} for r in intactas] == originais
+    assert banco.repo.atualizar_ocorrencias([], {'STATUS': 'ASSINADA'}) == []
+
+
+def test_pdf_assina_num_unico_update(banco, navegador, monkeypatch):
+    def uma_a_uma(*args):
+        raise AssertionError('atualização linha a linha')
+
+    monkeypatch.setattr(banco.repo, 'atualizar_ocorrencia', uma_a_uma)
+    aplicacao.carregar_dados()
+    linha = next(r for r in banco.memoria.listar_ocorrencias() if r['STATUS'] != 'ASSINADA')
+    selecionadas = ids(banco.memoria.consultar_ocorrencias(sala=linha['SALA'], aluno=linha['ALUNO']))
+    banco.chamadas = 0
+
+    resposta = navegador.post('/gerar_pdf_aluno', data={
+        'aluno': linha['ALUNO'], 'sala': linha['SALA'], 'ocorrencias[]': [str(i) for i in selecionadas],
+    })
+
+    assert resposta.status_code == 200 and resposta.mimetype == 'application/pdf'
+    assert banco.chamadas == 2  # a leitura das selecionadas e o UPDATE
+    df = aplicacao.carregar_dados()  # já com as linhas assinadas, sem reler o banco
+    assert banco.chamadas == 2
+    assert set(df.loc[df['Nº Ocorrência'].isin(selecionadas), 'Status']) == {'ASSINADA'}
+    monkeypatch.undo()
+    assert_mesmas_ocorrencias(df, banco.recarga_completa())
+
+
+def test_selecionadas_inexistentes(banco, navegador):
+    aplicacao.carregar_dados()
+    versao = aplicacao._versao_escritas
+    banco.chamadas = 0
+
+    resposta = navegador.post('/gerar_pdf_aluno', data={'aluno': 'X', 'sala': '6B', 'ocorrencias[]': ['999999']})
+
+    assert resposta.status_code == 302
+    assert banco.chamadas == 1  # só a leitura das selecionadas: nenhum UPDATE
+    assert aplicacao._versao_escritas == versao  # nenhuma escrita registrada
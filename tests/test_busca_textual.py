@@ -0,0 +1,77 @@
+"""Busca textual: termos normalizados, pontuação BM25 e o índice atualizado por delta igual ao montado do zero."""
+import re
+
+import pytest
+
+import app as aplicacao
+import busca_textual
+
+CONSULTAS = ['trombone', 'xilofone devolvido', 'celular', 'agress', 'conversa aluno', 'Agressão verbal']
+
+
+def test_termos_normalizados():
+    assert busca_textual.extrair_termos('AGRESSÃO verbal a colega') == ['agressao', 'verbal', 'colega']
+
+
+def indice_de(descricoes: dict[int, str]) -> busca_textual.IndiceTextual:
+    return busca_textual.construir_indice(aplicacao.montar_dataframe_ocorrencias(
+        [{'ID': oid, 'DESCRICAO': texto} for oid, texto in descricoes.items()]
+    ))
+
+
+def test_pontuacao_bm25():
+    indice = indice_de({
+        1: 'Celular tocou na aula.',
+        2: 'Celular, celular e celular: tocou três vezes na aula.',
+        3: 'Celular tocou na aula de matemática durante a prova bimestral do segundo período.',
+        4: 'Agressão verbal a colega.',
+        5: 'Comportamento agressivo no intervalo.',
+    })
+    pontuacao = busca_textual.buscar(indice, 'celular')
+    # Mais ocorrências do termo pontuam mais; num texto mais longo, o mesmo termo pesa menos
+    assert sorted(pontuacao, key=pontuacao.get, reverse=True) == [2, 1, 3]
+    # Todos os termos são exigidos
+    assert set(busca_textual.buscar(indice, 'celular prova')) == {3}
+    assert busca_textual.buscar(indice, 'celular intervalo') == {}
+    # Prefixo a partir de TAMANHO_MINIMO_PREFIXO letras; abaixo disso só o termo inteiro
+    assert set(busca_textual.buscar(indice, 'agress')) == {4, 5}
+    assert busca_textual.buscar(indice, 'ag') == {}
+    # O termo raro pesa mais que o comum
+    assert busca_textual.buscar(indice, 'matematica')[3] > busca_textual.buscar(indice, 'tocou')[3]
+
+
+def test_indice_atualizado_igual_ao_reconstruido(banco, escritas):
+    aplicacao.obter_indice_busca()  # monta o índice da versão atual
+    gravadas = escritas.aplicar()
+    aplicacao.carregar_dados()
+
+    escritas.conferir_derivado('busca', busca_textual.construir_indice,
+                               lambda indice: (indice.postagens, indice.tamanhos, indice.total_termos))
+    indice = aplicacao._derivados['busca'][1]
+    completo = busca_textual.construir_indice(banco.recarga_completa())
+    for consulta in CONSULTAS:
+        assert busca_textual.buscar(indice, consulta) == pytest.approx(busca_textual.buscar(completo, consulta))
+
+    for escrita, termo in (('inserir', 'trombone'), ('editar', 'xilofone')):
+        if escrita in gravadas:
+            encontrados = aplicacao.buscar_ocorrencias_texto(termo)['Nº Ocorrência'].tolist()
+            assert encontrados == [gravadas[escrita][0]['ID']]
+
+
+def test_index_pagina_a_busca_por_relevancia(banco, navegador):
+    filtros = {'q': 'agressao colega', 'status': 'ATENDIMENTO', 'por_pagina': 5}
+    esperado = aplicacao.buscar_ocorrencias_texto(
+        filtros['q'], status=filtros['status'], status_df=aplicacao.obter_status_ocorrencias()
+    )['Nº Ocorrência'].tolist()
+    assert len(esperado) > 5
+    assert esperado != sorted(esperado, reverse=True)  # a ordem é a da relevância, não a do Nº
+
+    exibidos, pagina = [], 1
+    while True:
+        html = navegador.get('/index', query_string=dict(filtros, pagina=pagina)).get_data(as_text=True)
+        exibidos += [int(i) for i in re.findall(r'/editar/(\d+)\?papel=ver', html)]
+        assert ('Mais relevantes' in html) == (pagina > 1)
+        if 'Menos relevantes' not in html:
+            break
+        pagina += 1
+    assert exibidos == esperado
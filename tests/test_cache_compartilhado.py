@@ -0,0 +1,92 @@
+"""Cache compartilhado entre workers: o snapshot publicado depois das escritas deve dar o mesmo que uma carga do zero.
+
+Os dois "workers" rodam no mesmo processo: o que separa um do outro é o estado
+por processo do app (_ESTADO_INICIAL do conftest), trocado pelo teste entre
+uma etapa e outra.
+"""
+import copy
+import os
+
+import pytest
+
+import app as aplicacao
+import cache_compartilhado
+from conftest import assert_mesmas_ocorrencias, estado_inicial
+
+
+@pytest.fixture
+def compartilhado(banco, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache_compartilhado, 'HABILITADO', True)
+    monkeypatch.setattr(cache_compartilhado, 'DIRETORIO', str(tmp_path / 'compartilhado'))
+    monkeypatch.setattr(cache_compartilhado, '_mapa_estado', None)
+    return banco
+
+
+def estado_do_worker() -> dict:
+    return {nome: copy.copy(getattr(aplicacao, nome)) for nome in estado_inicial()}
+
+
+def assumir_worker(monkeypatch, estado: dict):
+    for nome, valor in estado.items():
+        monkeypatch.setattr(aplicacao, nome, valor)
+
+
+@pytest.mark.parametrize('outro', ['ja_carregado', 'recem_iniciado'])
+def test_outro_worker_adota_o_snapshot_publicado(compartilhado, escritas, monkeypatch, outro):
+    aplicacao.carregar_dados()
+    estado_outro = estado_do_worker() if outro == 'ja_carregado' else estado_inicial()
+    versao_anterior = cache_compartilhado.ler_estado().versao
+    intervalo = aplicacao.DELTA_INTERVALO_SEG
+
+    escritas.aplicar()
+    aplicacao.carregar_dados()  # este worker sincroniza e publica
+    monkeypatch.setattr(aplicacao, 'DELTA_INTERVALO_SEG', intervalo)
+    assert cache_compartilhado.ler_estado().versao > versao_anterior
+
+    assumir_worker(monkeypatch, estado_outro)
+    chamadas = compartilhado.chamadas
+    df = aplicacao.carregar_dados()
+
+    assert compartilhado.chamadas == chamadas  # adotou o snapshot, sem ir ao banco
+    assert aplicacao._df_versao == cache_compartilhado.ler_estado().versao
+    assert_mesmas_ocorrencias(df, compartilhado.recarga_completa())
+
+
+def test_recarga_forcada_vale_para_todos_os_workers(compartilhado, monkeypatch):
+    aplicacao.carregar_dados()
+    estado_outro = estado_do_worker()
+    compartilhado.inserir()
+    aplicacao.limpar_caches()
+    aplicacao.carregar_dados()
+
+    assumir_worker(monkeypatch, estado_outro)
+    chamadas = compartilhado.chamadas
+    assert_mesmas_ocorrencias(aplicacao.carregar_dados(), compartilhado.recarga_completa())
+    assert compartilhado.chamadas == chamadas
+
+
+
+def test_snapshot_de_outra_origem_nao_e_adotado(compartilhado, monkeypatch):
+    df = aplicacao.carregar_dados()
+    # Outro app (outro banco), do mesmo usuário, publica no mesmo diretório
+    with cache_compartilhado.trava():
+        cache_compartilhado.publicar(df.iloc[:3], {'marca': {}, 'origem': 'sqlite:/outro/banco.db'}, completo=True)
+
+    chamadas = compartilhado.chamadas
+    assert_mesmas_ocorrencias(aplicacao.carregar_dados(), compartilhado.recarga_completa())
+    assert compartilhado.chamadas > chamadas  # foi ao banco em vez de adotar
+    meta, _ = cache_compartilhado.carregar_snapshot(aplicacao.ORIGEM_DADOS)
+    assert meta['versao'] == aplicacao._df_versao
+
+
+def test_diretorio_privado_do_usuario(compartilhado, monkeypatch):
+    aplicacao.carregar_dados()
+    assert os.stat(cache_compartilhado.DIRETORIO).st_mode & 0o777 == 0o700
+
+    # Diretório de outro usuário: nada é lido dele e o cache compartilhado desliga
+    dono = os.getuid()
+    monkeypatch.setattr(cache_compartilhado, '_mapa_estado', None)
+    monkeypatch.setattr(cache_compartilhado.os, 'getuid', lambda: dono + 1)
+    with pytest.raises(PermissionError):
+        cache_compartilhado.ler_estado()
+    assert not cache_compartilhado.HABILITADO
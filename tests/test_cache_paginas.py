@@ -0,0 +1,77 @@
+"""Cache de páginas renderizadas: o HTML guardado vale enquanto a versão dos dados não muda, com ETag/304."""
+import pytest
+
+import app as aplicacao
+import cache_paginas
+
+
+@pytest.fixture
+def paginas(banco, monkeypatch):
+    monkeypatch.setattr(cache_paginas, 'HABILITADO', True)
+    monkeypatch.setattr(aplicacao, '_cache_paginas', cache_paginas.CachePaginas(1024 * 1024))
+    return aplicacao._cache_paginas
+
+
+def renderizar_sem_cache(navegador, monkeypatch, url, **parametros) -> bytes:
+    with monkeypatch.context() as m:
+        m.setattr(cache_paginas, 'HABILITADO', False)
+        return navegador.get(url, query_string=parametros).get_data()
+
+
+@pytest.mark.parametrize('url, parametros', [
+    ('/index', {'status': 'ATENDIMENTO'}),
+    ('/relatorio_geral', {'data_inicio': '2024-04-01'}),
+    ('/relatorio_aluno', {'sala': '6B', 'aluno': 'DÉBORA ARAÚJO'}),
+])
+def test_mesma_consulta_sai_do_cache_com_etag(paginas, navegador, monkeypatch, url, parametros):
+    primeira = navegador.get(url, query_string=parametros)
+    assert primeira.status_code == 200 and primeira.headers['ETag']
+    assert primeira.cache_control.private and primeira.cache_control.no_cache
+
+    # Argumentos vazios equivalem a ausentes
+    segunda = navegador.get(url, query_string=dict(parametros, tutor=''))
+    assert segunda.get_data() == primeira.get_data() and segunda.headers['ETag'] == primeira.headers['ETag']
+    assert paginas.estatisticas()['acertos'] == 1
+    assert segunda.get_data() == renderizar_sem_cache(navegador, monkeypatch, url, **parametros)
+
+    revalidada = navegador.get(url, query_string=parametros, headers={'If-None-Match': primeira.headers['ETag']})
+    assert revalidada.status_code == 304 and not revalidada.get_data()
+
+
+@pytest.mark.parametrize('no_banco', [True, False], ids=['sql', 'dataframe'])
+def test_escrita_troca_a_versao(paginas, banco, navegador, monkeypatch, no_banco):
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', no_banco)
+    antes = navegador.get('/index')
+
+    # Como o POST de /nova neste worker
+    nova, = banco.inserir()
+    aplicacao.registrar_escrita_ocorrencias([nova['ID']])
+    depois = navegador.get('/index', headers={'If-None-Match': antes.headers['ETag']})
+
+    assert depois.status_code == 200 and depois.headers['ETag'] != antes.headers['ETag']
+    link = f"/editar/{nova['ID']}?papel=ver"
+    assert link not in antes.get_data(as_text=True) and link in depois.get_data(as_text=True)
+    assert depois.get_data() == renderizar_sem_cache(navegador, monkeypatch, '/index')
+
+
+def test_pagina_com_flash_nao_e_guardada(paginas, navegador):
+    with navegador.session_transaction() as sessao:
+        sessao['_flashes'] = [('success', 'Ocorrência salva.')]
+    resposta = navegador.get('/index')
+    assert 'ETag' not in resposta.headers and 'Ocorrência salva.' in resposta.get_data(as_text=True)
+    assert paginas.estatisticas()['entradas'] == 0
+
+
+def test_lru_por_bytes_e_por_versao():
+    cache = cache_paginas.CachePaginas(limite_bytes=10)
+    cache.guardar(('a', 1), b'1234', 'text/html')
+    cache.guardar(('b', 1), b'5678', 'text/html')
+    assert cache.obter(('a', 1)) == (b'1234', 'text/html')  # 'a' passa a ser o mais recente
+    cache.guardar(('c', 1), b'90', 'text/html')
+    cache.guardar(('d', 1), b'xy', 'text/html')
+    assert cache.obter(('b', 1)) is None and cache.obter(('a', 1))
+    cache.guardar(('grande', 1), b'x' * 11, 'text/html')
+    assert cache.obter(('grande', 1)) is None
+
+    assert cache.obter(('a', 2)) is None  # versão nova descarta tudo
+    assert cache.estatisticas()['entradas'] == 0
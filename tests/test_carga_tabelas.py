@@ -0,0 +1,75 @@
+"""Carga das tabelas num worker frio: as que faltam em cache vêm em paralelo, cada uma uma vez."""
+import threading
+
+import pytest
+
+import app as aplicacao
+
+TABELAS = ['professores', 'salas', 'alunos', 'ocorrencias']
+
+
+class Cargas:
+    """Tabelas carregadas durante o teste; com a barreira, cada carregador só segue quando todos começaram."""
+
+    def __init__(self):
+        self.feitas = []
+        self.barreira = None
+
+    def embrulhar(self, nome, carregar):
+        def carregador():
+            if self.barreira:
+                self.barreira.wait(timeout=5)
+            self.feitas.append(nome)
+            return carregar()
+        return carregador
+
+
+@pytest.fixture
+def cargas(banco, monkeypatch):
+    cargas = Cargas()
+    for nome, carregar in list(aplicacao._CARREGADORES.items()):
+        monkeypatch.setitem(aplicacao._CARREGADORES, nome, cargas.embrulhar(nome, carregar))
+    return cargas
+
+
+def test_tabelas_frias_carregadas_em_paralelo(banco, cargas, monkeypatch):
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    cargas.barreira = threading.Barrier(len(TABELAS))
+    aplicacao.carregar_tabelas()
+    # Em série, o primeiro carregador esperaria pelos outros até o tempo da barreira acabar
+    assert not cargas.barreira.broken
+    assert sorted(cargas.feitas) == sorted(TABELAS)
+    assert all(aplicacao._tabelas_em_cache().values())
+
+    # Tudo em cache: nenhuma ida ao banco
+    chamadas = banco.chamadas
+    aplicacao.carregar_tabelas()
+    assert banco.chamadas == chamadas and len(cargas.feitas) == len(TABELAS)
+
+
+def test_so_as_que_faltam(banco, cargas):
+    aplicacao.carregar_salas()
+    aplicacao.carregar_tabelas()
+    # SQLite filtra no banco: as ocorrências ficam de fora
+    assert sorted(cargas.feitas) == ['alunos', 'professores']
+    assert aplicacao._df_cache is None
+
+
+def test_erro_numa_tabela_nao_derruba_as_outras(banco, cargas, monkeypatch, capsys):
+    def falhar():
+        raise RuntimeError('tempo esgotado')
+    monkeypatch.setitem(aplicacao._CARREGADORES, 'salas', falhar)
+    aplicacao.carregar_tabelas('professores', 'salas', 'alunos')
+    assert sorted(cargas.feitas) == ['alunos', 'professores']
+    assert "Erro na carga paralela de 'salas': tempo esgotado" in capsys.readouterr().out
+
+
+def test_aquecimento_fora_da_requisicao(banco, monkeypatch, capsys):
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    aplicacao.aquecer_caches()
+    assert all(aplicacao._tabelas_em_cache().values())
+    assert 'Caches aquecidos' in capsys.readouterr().out
+
+    # Sem contexto de requisição, o aviso vai para o log em vez do flash()
+    aplicacao.avisar('Erro de teste.')
+    assert 'Erro de teste.' in capsys.readouterr().out
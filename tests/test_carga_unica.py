@@ -0,0 +1,104 @@
+"""Carga única por tabela: uma thread busca, as outras esperam ou seguem com o valor anterior."""
+import threading
+import time
+
+import pytest
+
+import app as aplicacao
+
+
+class LeituraRetida:
+    """Leitura das ocorrências que lê o banco e só entrega as linhas quando 'liberar' for acionado."""
+
+    def __init__(self, repo, monkeypatch):
+        self.chamadas = 0
+        self.entrou = threading.Event()
+        self.liberar = threading.Event()
+        original = repo.listar_ocorrencias_em_blocos
+
+        def listar():
+            self.chamadas += 1
+            blocos = list(original())  # o que o banco tinha no começo da leitura
+            self.entrou.set()
+            assert self.liberar.wait(timeout=5)
+            yield from blocos
+        monkeypatch.setattr(repo, 'listar_ocorrencias_em_blocos', listar)
+
+
+@pytest.fixture
+def leitura(banco, monkeypatch):
+    return LeituraRetida(banco.repo, monkeypatch)
+
+
+def em_thread(funcao, *args):
+    resultado = {}
+    thread = threading.Thread(target=lambda: resultado.setdefault('valor', funcao(*args)))
+    thread.start()
+    return thread, resultado
+
+
+def test_carga_fria_feita_uma_vez(banco, leitura):
+    threads = [em_thread(aplicacao.carregar_dados) for _ in range(8)]
+    assert leitura.entrou.wait(timeout=5)
+    time.sleep(0.05)  # as outras chegam na trava
+    leitura.liberar.set()
+    for thread, _ in threads:
+        thread.join()
+    assert leitura.chamadas == 1
+    assert len({id(resultado['valor']) for _, resultado in threads}) == 1
+
+
+def test_valor_vencido_servido_durante_a_recarga(banco, leitura):
+    leitura.liberar.set()
+    antigo = aplicacao.carregar_dados()
+    leitura.liberar.clear()
+    leitura.entrou.clear()
+
+    aplicacao.limpar_caches()
+    thread, resultado = em_thread(aplicacao.carregar_dados)
+    assert leitura.entrou.wait(timeout=5)
+    # A recarga está em andamento: as outras leituras não esperam por ela
+    assert aplicacao.carregar_dados() is antigo
+
+    leitura.liberar.set()
+    thread.join()
+    assert resultado['valor'] is not antigo
+    assert aplicacao.carregar_dados() is resultado['valor']
+    assert leitura.chamadas == 2
+
+
+def test_escrita_durante_a_carga_continua_pendente(banco, leitura):
+    thread, _ = em_thread(aplicacao.carregar_dados)
+    assert leitura.entrou.wait(timeout=5)
+    editada = banco.editar()[0]  # gravada depois que a leitura passou pelo banco
+    aplicacao.registrar_escrita_ocorrencias([editada['ID']])
+    leitura.liberar.set()
+    thread.join()
+
+    assert aplicacao._df_pendente
+    df = aplicacao.carregar_dados()
+    linha = df[df['Nº Ocorrência'] == editada['ID']].iloc[0]
+    assert linha['ATT'] == editada['ATT']
+
+
+def test_derivado_construido_uma_vez_por_versao(banco, monkeypatch):
+    aplicacao.carregar_dados()
+    construcoes = []
+
+    def construir(df):
+        construcoes.append(df)
+        time.sleep(0.05)
+        return len(df)
+
+    threads = [em_thread(aplicacao.obter_derivado, 'teste', construir) for _ in range(6)]
+    for thread, _ in threads:
+        thread.join()
+    assert len(construcoes) == 1
+    assert {resultado['valor'] for _, resultado in threads} == {len(aplicacao._df_cache)}
+
+    # Dados trocados durante a construção: o valor não fica guardado para a versão nova
+    def construir_enquanto_troca(df):
+        monkeypatch.setattr(aplicacao, '_df_versao', aplicacao._df_versao + 1)
+        return len(df)
+    aplicacao.obter_derivado('outro', construir_enquanto_troca)
+    assert 'outro' not in aplicacao._derivados
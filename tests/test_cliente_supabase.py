@@ -0,0 +1,106 @@
+"""Cliente Supabase compartilhado: criado uma vez por processo e recriado só quando preciso."""
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import repositorio
+
+
+class ClienteFalso:
+    """Cliente com a cadeia table().select()...execute() do SDK; falha se falha for definida."""
+
+    def __init__(self):
+        self.falha = None
+        self.consultas = 0
+
+    def table(self, nome):
+        return self
+
+    def __getattr__(self, nome):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.consultas += 1
+        if self.falha:
+            raise self.falha
+        return SimpleNamespace(data=[], count=None)
+
+
+@pytest.fixture
+def criados(monkeypatch):
+    """Clientes criados por _criar_cliente_supabase durante o teste, a partir de um processo sem cliente."""
+    lista = []
+
+    def criar(url, key):
+        lista.append(ClienteFalso())
+        return lista[-1]
+
+    monkeypatch.setattr(repositorio, '_criar_cliente_supabase', criar)
+    monkeypatch.setattr(repositorio, '_cliente_supabase', None)
+    monkeypatch.setattr(repositorio, '_cliente_pid', None)
+    monkeypatch.setattr(repositorio, '_cliente_verificado_em', 0.0)
+    return lista
+
+
+def obter():
+    return repositorio.obter_cliente_supabase('http://supabase.invalid', 'chave')
+
+
+def test_um_cliente_por_processo(criados, monkeypatch):
+    assert obter() is obter() is criados[0]
+    assert criados[0].consultas == 0  # uso recente: sem verificação
+
+    # Processo filho (fork do gunicorn --preload) não herda o cliente do pai
+    monkeypatch.setattr(repositorio.os, 'getpid', lambda: -1)
+    assert obter() is criados[1]
+
+
+@pytest.mark.parametrize('saudavel', [True, False])
+def test_cliente_ocioso_e_verificado(criados, monkeypatch, saudavel):
+    primeiro = obter()
+    monkeypatch.setattr(repositorio, '_cliente_verificado_em', -repositorio.SUPABASE_VERIFICACAO_SEG - 1)
+    if not saudavel:
+        primeiro.falha = RuntimeError('conexão fechada pelo servidor')
+
+    assert (obter() is primeiro) == saudavel
+    assert primeiro.consultas == 1
+    assert len(criados) == (1 if saudavel else 2)
+
+
+def test_falha_de_rede_descarta_o_cliente(criados):
+    repo = repositorio.RepositorioSupabase(obter())
+    repo.cliente.falha = httpx.ConnectError('sem rota')
+    with pytest.raises(httpx.ConnectError):
+        repo.listar_salas()
+    assert obter() is criados[1]
+
+    # Erro da consulta (não de conexão) mantém o cliente
+    repo = repositorio.RepositorioSupabase(obter())
+    repo.cliente.falha = ValueError('coluna inexistente')
+    with pytest.raises(ValueError):
+        repo.listar_salas()
+    assert obter() is criados[1]
+
+
+def test_verificacao_fora_da_trava(criados, monkeypatch):
+    primeiro = obter()
+    monkeypatch.setattr(repositorio, '_cliente_verificado_em', -repositorio.SUPABASE_VERIFICACAO_SEG - 1)
+    em_verificacao, liberar = threading.Event(), threading.Event()
+
+    def verificar_devagar(cliente):
+        em_verificacao.set()
+        liberar.wait(timeout=5)
+        return False
+    monkeypatch.setattr(repositorio, '_cliente_saudavel', verificar_devagar)
+
+    resultado = []
+    verificador = threading.Thread(target=lambda: resultado.append(obter()))
+    verificador.start()
+    assert em_verificacao.wait(timeout=5)
+    # Enquanto a verificação demora, as outras threads seguem com o cliente atual
+    assert obter() is primeiro
+    liberar.set()
+    verificador.join(timeout=5)
+    assert resultado == [criados[1]] and obter() is criados[1]
@@ -0,0 +1,48 @@
+"""Tipos compactos do cache (categorias, strings Arrow, datas com fuso), também depois das mesclas incrementais."""
+import pandas as pd
+
+import app as aplicacao
+from conftest import assert_mesmas_ocorrencias
+
+
+def assert_tipos_compactos(df: pd.DataFrame):
+    for col in aplicacao.COLUNAS_CATEGORICAS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    for col in aplicacao.COLUNAS_TEXTO_LIVRE:
+        assert df[col].dtype == aplicacao.TIPO_TEXTO_LIVRE, col
+    for col in aplicacao.COLUNAS_DATA:
+        assert isinstance(df[col].dtype, pd.DatetimeTZDtype), col
+
+
+def test_mescla_mantem_os_tipos_da_carga_completa(banco, escritas):
+    aplicacao.carregar_dados()
+    escritas.aplicar()
+    df = aplicacao.carregar_dados()
+
+    completo = banco.recarga_completa()
+    assert_tipos_compactos(df)
+    assert_mesmas_ocorrencias(df, completo)
+    if 'inserir' in escritas.cenario:
+        # Valores novos entram nas categorias do cache (união com as da linha nova)
+        assert 'TUTOR NOVO' in df['Tutor'].cat.categories
+        assert (df['Sala'] == '9Z').sum() == 1
+    # As categorias podem guardar valores sem linhas, mas o cache não cresce além da carga completa
+    assert aplicacao.relatorio_memoria(df)['total_bytes'] <= 1.05 * aplicacao.relatorio_memoria(completo)['total_bytes']
+
+
+def test_memoria_menor_que_com_objetos(banco, navegador):
+    df = aplicacao.carregar_dados()
+    como_objetos = df.astype({c: object for c in aplicacao.COLUNAS_CATEGORICAS + aplicacao.COLUNAS_TEXTO_LIVRE})
+    relatorio = navegador.get('/api/memoria').get_json()
+    assert relatorio['linhas'] == len(df)
+    assert relatorio['colunas']['Aluno']['tipo'] == 'category'
+    assert relatorio['total_bytes'] < aplicacao.relatorio_memoria(como_objetos)['total_bytes'] / 2
+
+
+def test_datas_viram_texto_so_na_exibicao(banco):
+    df = aplicacao.carregar_dados()
+    exibicao = aplicacao.formatar_exibicao(df)
+    assert exibicao['DCO'].tolist() == df['DCO'].dt.strftime('%d/%m/%Y').tolist()
+    assert exibicao['HCO'].str.fullmatch(r'\d\d:\d\d').all()
+    assert set(exibicao.loc[df['DT'].isna(), 'DT']) == {''}
+    assert isinstance(df['DCO'].dtype, pd.DatetimeTZDtype)  # o cache não é alterado
@@ -0,0 +1,42 @@
+"""Conversão das datas do banco: caminho ISO-8601 por valor distinto, com fallback para os outros formatos."""
+import pandas as pd
+import pytest
+
+import app as aplicacao
+
+SP = 'America/Sao_Paulo'
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('2024-03-11T01:00:00+00:00', '2024-03-10 22:00'),
+    ('2024-03-11T01:00:00.250000+00:00', '2024-03-10 22:00:00.25'),
+    ('2024-03-10T22:00:00-03:00', '2024-03-10 22:00'),
+    ('2024-03-11T06:30:00+05:30', '2024-03-10 22:00'),
+    ('2024-03-11T01:00:00Z', '2024-03-10 22:00'),
+    ('2024-03-11 01:00:00', '2024-03-10 22:00'),  # sem fuso (SQLite): UTC
+    ('10/03/2024 22:00', '2024-03-10 19:00'),  # fora do ISO: dia primeiro, UTC
+    ('2024-03-11T01:00:00+xx:00', None),
+    ('', None), (None, None), ('lixo', None),
+])
+def test_formatos(texto, esperado):
+    convertida = aplicacao.converter_datas([texto, texto]).tolist()
+    assert convertida == [pd.Timestamp(esperado, tz=SP) if esperado else pd.NaT] * 2
+
+
+def test_formatos_misturados_na_mesma_coluna():
+    # A inferência pelo primeiro valor (com microssegundos) descartava os demais
+    textos = ['2024-03-01T10:00:00.123456+00:00', '2024-03-02T10:00:00+00:00', '2024-03-03T07:00:00-03:00',
+              None, '04/03/2024 10:00']
+    convertidas = aplicacao.converter_datas(pd.Series(textos, index=[5, 6, 7, 8, 9]))
+    assert list(convertidas.index) == [5, 6, 7, 8, 9]
+    assert [None if pd.isna(d) else d.tz_convert('UTC').strftime('%d %H:%M:%S') for d in convertidas] == \
+        ['01 10:00:00', '02 10:00:00', '03 10:00:00', None, '04 10:00:00']
+
+
+def test_carga_igual_a_conversao_elemento_a_elemento(banco):
+    df = aplicacao.carregar_dados()
+    linhas = {r['ID']: r for r in banco.memoria.listar_ocorrencias()}
+    for col in aplicacao.COLUNAS_DATA:
+        esperado = pd.to_datetime([linhas[i][col] for i in df['Nº Ocorrência']], format='mixed', utc=True)
+        pd.testing.assert_series_equal(df[col].dt.tz_convert('UTC'),
+                                       pd.Series(esperado, index=df.index, name=col).astype(df[col].dtype).dt.tz_convert('UTC'))
@@ -0,0 +1,49 @@
+"""Rotas de escrita: a linha devolvida pelo banco vai direto para o cache, sem reler a tabela."""
+import app as aplicacao
+from conftest import assert_mesmas_ocorrencias
+
+
+def test_sem_cache_carregado_nao_aplica(banco):
+    assert not aplicacao.aplicar_escrita_no_cache(banco.inserir())
+    assert aplicacao._df_cache is None
+
+
+def test_rotas_de_escrita(banco, navegador):
+    aplicacao.carregar_dados()
+    versao = aplicacao._df_versao
+    linhas = banco.repo.listar_ocorrencias()
+
+    def chamadas_na_rota(url, **dados):
+        antes = banco.chamadas
+        resposta = navegador.post(url, data=dados)
+        assert resposta.status_code == 302, url
+        assert not aplicacao._df_pendente  # nada a sincronizar: o cache já tem a linha
+        return banco.chamadas - antes
+
+    # Inserção: só o INSERT
+    assert chamadas_na_rota('/nova', professor='PROFESSOR NOVO', sala='9Z', aluno='ALUNO NOVO', tutor='TUTOR NOVO',
+                            descricao='Trombone tocado durante a prova.', atp='', ft='SIM', fc='NÃO', fg='NÃO') == 1
+    # Edição: a leitura da linha no banco e o UPDATE
+    oid = max(r['ID'] for r in linhas if r['FT'] == 'SIM')
+    assert chamadas_na_rota(f'/editar/{oid}', DESCRICAO='Descrição revisada.', ATP='', ATT='Xilofone devolvido.') == 2
+
+    # A listagem depois do redirect sai do cache, que ficou igual a uma carga do zero
+    antes = banco.chamadas
+    df = aplicacao.carregar_dados()
+    assert banco.chamadas == antes
+    assert aplicacao._df_versao == versao + 2
+    assert_mesmas_ocorrencias(df, banco.recarga_completa())
+    assert (df['Sala'] == '9Z').sum() == 1
+    assert df.loc[df['Nº Ocorrência'] == oid, 'ATT'].item() == 'Xilofone devolvido.'
+
+
+def test_escrita_sem_delta_nao_vence_as_tabelas_de_referencia(banco, monkeypatch):
+    monkeypatch.setattr(aplicacao, 'SINCRONIZACAO_DELTA', False)
+    aplicacao.carregar_tabelas()
+    aplicacao.registrar_escrita_ocorrencias([1])
+    assert aplicacao._recarga_forcada
+    assert not aplicacao._tabelas_vencidas
+
+    # A recarga manual continua vencendo tudo
+    aplicacao.limpar_caches()
+    assert aplicacao._tabelas_vencidas == {'alunos', 'professores', 'salas'}
@@ -0,0 +1,73 @@
+"""Exportação em CSV, Parquet e XLSX: os arquivos saem por streaming e trazem as ocorrências filtradas."""
+from io import BytesIO
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import app as aplicacao
+import exportacao_dados
+from conftest import ids
+
+LEITORES = {
+    'csv': lambda dados: pd.read_csv(BytesIO(dados), encoding='utf-8-sig', dtype=str, keep_default_na=False),
+    'parquet': lambda dados: pd.read_parquet(BytesIO(dados)),
+    'xlsx': lambda dados: pd.read_excel(BytesIO(dados), dtype=str, keep_default_na=False),
+}
+FILTROS = [
+    ({}, {}),
+    ({'tutor': 'ANA PAULA', 'status': 'ATENDIMENTO'}, {'tutor': 'ANA PAULA', 'status': 'ATENDIMENTO'}),
+    ({'sala': '8A', 'data_inicio': '2024-04-10', 'data_fim': '2024-09-30'}, {'sala': '8A'}),
+]
+
+
+@pytest.fixture(params=[True, False], ids=['sql', 'dataframe'])
+def no_banco(request, banco, monkeypatch):
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', request.param)
+    return request.param
+
+
+def ids_esperados(banco, parametros: dict, filtros: dict) -> list[int]:
+    linhas = banco.memoria.consultar_ocorrencias(**filtros)
+    if 'data_inicio' in parametros:
+        # DCO em UTC; as datas de filtro são dias de São Paulo
+        dias = pd.to_datetime([r['DCO'] for r in linhas], utc=True).tz_convert('America/Sao_Paulo').normalize()
+        dentro = (dias >= pd.Timestamp(parametros['data_inicio'], tz='America/Sao_Paulo')) & \
+                 (dias <= pd.Timestamp(parametros['data_fim'], tz='America/Sao_Paulo'))
+        linhas = [r for r, ok in zip(linhas, dentro) if ok]
+    return ids(linhas)
+
+
+@pytest.mark.parametrize('parametros, filtros', FILTROS, ids=['tudo', 'tutor+status', 'sala+periodo'])
+@pytest.mark.parametrize('formato', list(LEITORES))
+def test_exportacao_filtrada(banco, navegador, no_banco, formato, parametros, filtros):
+    resposta = navegador.get(f'/exportar/ocorrencias.{formato}', query_string=parametros)
+    assert resposta.status_code == 200 and resposta.is_streamed
+    assert resposta.headers['Content-Disposition'].endswith(f'.{formato}"')
+
+    df = LEITORES[formato](resposta.get_data())
+    assert list(df.columns) == aplicacao.COLUNAS_EXPORTACAO
+    assert [int(i) for i in df['Nº Ocorrência']] == ids_esperados(banco, parametros, filtros)
+    assert set(df['Aluno']) <= {a['Aluno'] for a in banco.tabelas['Alunos']}
+
+
+def test_mesmo_csv_nos_dois_caminhos(banco, navegador, monkeypatch):
+    parametros = {'tutor': 'MÁRCIA LIMA', 'data_inicio': '2024-06-01'}
+    no_banco = navegador.get('/exportar/ocorrencias.csv', query_string=parametros).get_data()
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    assert navegador.get('/exportar/ocorrencias.csv', query_string=parametros).get_data() == no_banco
+
+
+def test_um_row_group_por_bloco(banco, no_banco):
+    blocos = aplicacao.blocos_exportacao(status='FINALIZADA', tamanho=37)
+    dados = b''.join(exportacao_dados.gerar_parquet(blocos, aplicacao.COLUNAS_EXPORTACAO, ['Nº Ocorrência']))
+    arquivo = pq.ParquetFile(BytesIO(dados))
+    total = len(banco.memoria.consultar_ocorrencias(status='FINALIZADA'))
+    assert arquivo.metadata.num_rows == total
+    assert arquivo.num_row_groups == -(-total // 37)
+
+
+def test_formato_desconhecido_ou_indisponivel(banco, navegador, monkeypatch):
+    assert navegador.get('/exportar/ocorrencias.docx').status_code == 404
+    monkeypatch.setitem(exportacao_dados.FORMATOS, 'xlsx', ('application/octet-stream', False))
+    assert navegador.get('/exportar/ocorrencias.xlsx').status_code == 501
@@ -0,0 +1,107 @@
+"""Exportação de PDFs em lote: o job roda fora da requisição e o estado fica em disco para qualquer worker."""
+import time
+import zipfile
+from io import BytesIO
+
+import pytest
+
+import app as aplicacao
+import exportacao_pdf
+import repositorio
+from pool_processos import PoolProcessos
+
+
+@pytest.fixture
+def exportacoes(banco, tmp_path, monkeypatch):
+    monkeypatch.setattr(exportacao_pdf, 'DIRETORIO', str(tmp_path / 'exportacoes'))
+    monkeypatch.setattr(exportacao_pdf, '_pool', PoolProcessos(2))
+    yield banco
+    exportacao_pdf._pool.descartar()
+
+
+def aguardar(navegador, url_status: str, limite_seg: float = 60) -> dict:
+    fim = time.monotonic() + limite_seg
+    while True:
+        estado = navegador.get(url_status).get_json()
+        if estado['estado'] != 'processando' or time.monotonic() > fim:
+            return estado
+        time.sleep(0.05)
+
+
+def test_zip_com_um_pdf_por_aluno(exportacoes, navegador):
+    resposta = navegador.post('/exportar_pdf', data={'sala': '7A', 'formato': 'zip'})
+    assert resposta.status_code == 202
+    job = resposta.get_json()
+
+    estado = aguardar(navegador, job['status'])
+    alunos = {r['ALUNO'] for r in exportacoes.memoria.consultar_ocorrencias(sala='7A')}
+    assert estado['estado'] == 'concluido', estado
+    assert estado['total'] == estado['concluidos'] == len(alunos)
+
+    arquivo = navegador.get(job['arquivo'])
+    assert arquivo.status_code == 200 and arquivo.mimetype == 'application/zip'
+    with zipfile.ZipFile(BytesIO(arquivo.data)) as pacote:
+        nomes = pacote.namelist()
+        assert sorted(nomes) == sorted(f"{exportacao_pdf.nome_arquivo('7A', a)}.pdf" for a in alunos)
+        assert all(pacote.read(n).startswith(b'%PDF') for n in nomes)
+
+
+def test_pdf_unico_do_periodo(exportacoes, navegador):
+    job = navegador.post('/exportar_pdf', data={
+        'tutor': 'ANA PAULA', 'data_inicio': '2024-03-01', 'data_fim': '2024-03-31', 'formato': 'pdf',
+    }).get_json()
+    assert aguardar(navegador, job['status'])['estado'] == 'concluido'
+    arquivo = navegador.get(job['arquivo'])
+    assert arquivo.mimetype == 'application/pdf' and arquivo.data.startswith(b'%PDF')
+
+
+def nomes_no_zip(navegador, dados: dict) -> list[str]:
+    job = navegador.post('/exportar_pdf', data=dict(dados, formato='zip')).get_json()
+    assert aguardar(navegador, job['status'])['estado'] == 'concluido'
+    with zipfile.ZipFile(BytesIO(navegador.get(job['arquivo']).data)) as pacote:
+        return sorted(pacote.namelist())
+
+
+def test_nomes_repetidos_ganham_contador(exportacoes, navegador):
+    modelo = next(r for r in exportacoes.repo.listar_ocorrencias() if r['SALA'] == '7A')
+    for aluno in ('ANA M.', 'ANA M'):  # o mesmo nome de arquivo
+        exportacoes.repo.inserir_ocorrencia(
+            {c: v for c, v in modelo.items() if c in repositorio.COLUNAS_OCORRENCIAS and c != 'ID'} | {'ALUNO': aluno}
+        )
+    nomes = nomes_no_zip(navegador, {'sala': '7A'})
+    alunos = {r['ALUNO'] for r in exportacoes.memoria.consultar_ocorrencias(sala='7A')}
+    assert len(nomes) == len(alunos) + 2
+    assert {'7A_ANA_M.pdf', '7A_ANA_M_2.pdf'} <= set(nomes)
+
+
+@pytest.mark.parametrize('filtros_no_banco', [True, False], ids=['banco', 'cache'])
+def test_filtros_em_qualquer_grafia(exportacoes, navegador, monkeypatch, filtros_no_banco):
+    monkeypatch.setattr(exportacoes.repo, 'filtros_no_banco', filtros_no_banco)
+    alunos = {r['ALUNO'] for r in exportacoes.memoria.consultar_ocorrencias(sala='7A', tutor='ANA PAULA')}
+    assert alunos
+    assert nomes_no_zip(navegador, {'sala': '7a', 'tutor': 'Ana Paula'}) == sorted(
+        f"{exportacao_pdf.nome_arquivo('7A', a)}.pdf" for a in alunos
+    )
+
+
+@pytest.mark.parametrize('dados, codigo', [
+    ({'sala': '7A', 'formato': 'docx'}, 400),
+    ({'formato': 'zip'}, 400),
+    ({'sala': '5X', 'formato': 'zip'}, 404),
+])
+def test_pedidos_invalidos(exportacoes, navegador, dados, codigo):
+    assert navegador.post('/exportar_pdf', data=dados).status_code == codigo
+
+
+def test_job_inexistente(exportacoes, navegador):
+    assert navegador.get('/exportar_pdf/' + 'f' * 32).status_code == 404
+    assert navegador.get('/exportar_pdf/../../etc/passwd').status_code == 404
+    assert navegador.get('/exportar_pdf/' + 'f' * 32 + '/arquivo').status_code == 404
+
+
+def test_falha_na_renderizacao_vira_erro(exportacoes, navegador):
+    job_id = exportacao_pdf.iniciar({'ALUNO_A': [{'Aluno': lambda: None}]}, 'zip')  # não serializável
+    estado = aguardar(navegador, f'/exportar_pdf/{job_id}')
+    assert estado['estado'] == 'erro' and estado['erro']
+    assert exportacao_pdf.caminho_resultado(job_id) is None
+    assert navegador.get(f'/exportar_pdf/{job_id}/arquivo').status_code == 404
@@ -0,0 +1,99 @@
+"""Gráficos dos relatórios: desenhados fora da requisição, memoizados por versão dos dados e servidos com ETag."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import app as aplicacao
+import graficos
+
+PNG = b'\x89PNG\r\n\x1a\n'
+
+
+@pytest.fixture
+def memoizacao(banco, monkeypatch):
+    """Memoização vazia e o desenho numa thread (o pool de processos fica para test_pool_de_processos)."""
+    monkeypatch.setattr(graficos, '_cache', graficos.CacheGraficos(graficos.MAX_ENTRADAS))
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(graficos._pool, 'obter', lambda: pool)
+    yield graficos._cache
+    pool.shutdown(wait=True)
+
+
+def test_lru_descarta_versoes_anteriores():
+    cache = graficos.CacheGraficos(max_entradas=2)
+    for nome in ('mes', 'sala', 'tutor'):
+        cache.guardar((nome, None, None, 1), nome.encode())
+    assert cache.obter(('mes', None, None, 1)) is None  # a mais antiga saiu
+    assert cache.obter(('sala', None, None, 1)) == b'sala'
+
+    assert cache.obter(('sala', None, None, 2)) is None
+    assert cache.estatisticas()['entradas'] == 0  # nenhuma da versão 1 pode mais ser servida
+    cache.guardar(('tutor', None, None, 1), b'atrasado')
+    assert cache.estatisticas()['entradas'] == 0
+
+
+def test_pedidos_simultaneos_desenham_uma_vez(memoizacao, monkeypatch):
+    liberar, desenhos, series = threading.Event(), [], []
+
+    def desenhar(**argumentos):
+        desenhos.append(argumentos)
+        assert liberar.wait(timeout=5)
+        return PNG
+    monkeypatch.setattr(graficos, 'desenhar', desenhar)
+
+    def montar():
+        series.append(1)
+        return {'titulo': 'T', 'rotulos': ['a'], 'series': {'Total': [1]}}
+
+    chave = ('mes', None, None, 1)
+    futuros = [memoizacao.agendar(chave, montar) for _ in range(3)]
+    assert futuros[0] is futuros[1] is futuros[2]
+    liberar.set()
+    assert graficos.obter(chave, montar) == PNG
+    assert len(desenhos) == len(series) == 1
+    assert graficos.obter(chave, montar) == PNG  # guardado: nem séries nem desenho
+    assert len(series) == 1
+
+
+def test_rota_do_grafico(banco, navegador, memoizacao):
+    resposta = navegador.get('/grafico/prazo_setor.png')
+    assert resposta.status_code == 200 and resposta.mimetype == 'image/png'
+    assert Image.open(BytesIO(resposta.data)).mode == 'RGB'  # sem alfa: o FPDF também usa
+    etag = resposta.headers['ETag']
+
+    assert navegador.get('/grafico/prazo_setor.png', headers={'If-None-Match': etag}).status_code == 304
+    # Dados novos: outra versão, outro ETag
+    banco.inserir()
+    aplicacao.registrar_escrita_ocorrencias()
+    nova = navegador.get('/grafico/prazo_setor.png', headers={'If-None-Match': etag})
+    assert nova.status_code == 200 and nova.headers['ETag'] != etag
+
+    assert navegador.get('/grafico/inexistente.png').status_code == 404
+
+
+def test_relatorios_com_graficos(banco, navegador, memoizacao):
+    html = navegador.get('/relatorio_geral').get_data(as_text=True)
+    assert all(f'/grafico/{nome}.png' in html for nome in ('mes', 'sala', 'prazo_setor'))
+    # A página já agendou os desenhos; o PDF usa os mesmos PNGs
+    assert memoizacao.estatisticas()['entradas'] + memoizacao.estatisticas()['em_andamento'] == 3
+
+    resposta = navegador.get('/relatorio_geral/pdf')
+    assert resposta.mimetype == 'application/pdf' and resposta.data.startswith(b'%PDF')
+    assert resposta.data.count(b'/Subtype /Image') == 3
+    assert memoizacao.estatisticas()['entradas'] == 3
+
+    resposta = navegador.get('/relatorio_tutor/pdf')
+    assert resposta.data.count(b'/Subtype /Image') == 1
+
+
+def test_pool_de_processos(monkeypatch):
+    monkeypatch.setattr(graficos, '_cache', graficos.CacheGraficos(graficos.MAX_ENTRADAS))
+    try:
+        png = graficos.obter(('teste', None, None, 1),
+                             lambda: {'titulo': 'Teste', 'rotulos': ['a', 'b'], 'series': {'Total': [1, 2]}})
+    finally:
+        graficos._pool.descartar()
+    assert png.startswith(PNG)
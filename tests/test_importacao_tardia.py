@@ -0,0 +1,50 @@
+"""Importação tardia: o app sobe sem os módulos pesados, que vêm no primeiro uso ou no precarregamento."""
+import json
+import subprocess
+import sys
+
+import app as aplicacao
+import importacao_tardia
+from conftest import RAIZ
+
+PESADOS = ['pandas', 'numpy', 'matplotlib', 'fpdf', 'pyarrow', 'xlsxwriter']
+
+
+def modulos_carregados(codigo: str, tmp_path) -> list[str]:
+    """Roda 'codigo' num interpretador novo e devolve quais dos PESADOS ficaram importados."""
+    script = f'import json, sys\n{codigo}\nprint(json.dumps([m for m in {PESADOS!r} if m in sys.modules]))'
+    ambiente = {'IDR_BACKEND': 'sqlite', 'IDR_SQLITE_PATH': str(tmp_path / 'sgce.db'), 'PATH': ''}
+    saida = subprocess.run([sys.executable, '-c', script], cwd=RAIZ, env=ambiente,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.splitlines()[-1])
+
+
+def test_app_sobe_sem_os_modulos_pesados(tmp_path):
+    assert modulos_carregados('import app', tmp_path) == []
+    # O primeiro uso do pandas não traz os módulos de PDF, gráficos e planilhas
+    carregados = modulos_carregados('import app\napp.pd.DataFrame', tmp_path)
+    assert {'pandas', 'numpy'} <= set(carregados) and not {'matplotlib', 'fpdf', 'xlsxwriter'} & set(carregados)
+
+
+def test_precarregar_no_mestre(tmp_path):
+    assert modulos_carregados('import app\napp.criar_app(precarregar=True)', tmp_path) == PESADOS
+
+
+def test_modulo_tardio(monkeypatch):
+    carregados = []
+    monkeypatch.setattr(importacao_tardia, '_registrados', {})
+    tardio = importacao_tardia.modulo_tardio('colorsys', ao_carregar=carregados.append)
+    assert importacao_tardia.modulo_tardio('colorsys') is tardio
+    assert not carregados
+
+    assert tardio.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert tardio.hsv_to_rgb(0, 0, 0) == (0, 0, 0)
+    assert [m.__name__ for m in carregados] == ['colorsys']  # ao_carregar uma única vez
+    assert importacao_tardia.disponivel('colorsys') and not importacao_tardia.disponivel('modulo_que_nao_existe')
+
+
+def test_criar_app_registra_todas_as_rotas():
+    nova = aplicacao.criar_app(precarregar=False)
+    regras = lambda a: sorted((r.rule, r.endpoint, tuple(sorted(r.methods))) for r in a.url_map.iter_rules())
+    assert regras(nova) == regras(aplicacao.app)
+    assert len(aplicacao._rotas) == len(regras(nova)) - 1  # mais o /static do Flask
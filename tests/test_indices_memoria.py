@@ -0,0 +1,68 @@
+"""Índices em memória sobre o cache: as rotas que leem uma ocorrência, um aluno ou uma sala não vão ao banco."""
+import re
+
+import pytest
+
+import app as aplicacao
+from conftest import ids
+
+
+@pytest.fixture
+def carregado(banco, monkeypatch):
+    """Motor sem filtros no banco (como o Supabase), com o cache de ocorrências e o cadastro de
+    alunos já lidos; zera a contagem de chamadas ao banco."""
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    aplicacao.carregar_dados()
+    aplicacao.carregar_dados_alunos()
+    banco.chamadas = 0
+    return banco
+
+
+def test_ocorrencia_do_cache_igual_a_do_banco(carregado):
+    for oid in (1, 137, 400):
+        do_banco = carregado.repo.buscar_ocorrencia(oid)
+        do_cache = aplicacao.ocorrencia_do_cache(oid)
+        # Texto livre com a grafia original; os campos de cadastro normalizados
+        for coluna in ('DESCRICAO', 'ATP', 'ATT', 'ATC', 'ATG'):
+            assert do_cache[coluna] == do_banco[coluna].strip()
+        for coluna in ('SALA', 'ALUNO', 'TUTOR', 'STATUS', 'FT', 'FC', 'FG'):
+            assert do_cache[coluna] == do_banco[coluna].strip().upper()
+    assert aplicacao.ocorrencia_do_cache(10**6) is None
+    assert carregado.chamadas == 0
+
+
+def test_editar_abre_pelo_cache(carregado, navegador):
+    oid = 250
+    resposta = navegador.get(f'/editar/{oid}', query_string={'papel': 'ver'})
+    assert resposta.status_code == 200
+    assert carregado.repo.buscar_ocorrencia(oid)['DESCRICAO'] in resposta.get_data(as_text=True)
+    assert carregado.chamadas == 0
+
+
+def test_alunos_por_sala(carregado, navegador):
+    esperado = [{'Aluno': a['Aluno'], 'Tutor': a['Tutor']} for a in carregado.tabelas['Alunos'] if a['Sala'] == '7B']
+    assert navegador.get('/api/alunos_por_sala/ 7b').get_json() == esperado
+    assert navegador.get('/api/alunos_por_sala/5X').get_json() == []
+    assert carregado.chamadas == 0
+
+
+@pytest.mark.parametrize('sala, aluno', [('6B', 'DÉBORA ARAÚJO'), ('9A', 'ÍRIS BARROS'), ('9A', 'NINGUÉM')])
+def test_relatorio_aluno_pelo_indice(carregado, navegador, sala, aluno):
+    resposta = navegador.get('/relatorio_aluno', query_string={'sala': sala, 'aluno': aluno})
+    assert resposta.status_code == 200
+    exibidos = [int(i) for i in re.findall(r'name="ocorrencias\[\]" value="(\d+)"', resposta.get_data(as_text=True))]
+    assert exibidos == ids(carregado.memoria.consultar_ocorrencias(sala=sala, aluno=aluno))
+    assert carregado.chamadas == 0
+
+
+def test_editar_grava_a_partir_da_linha_do_banco(carregado, navegador):
+    # Outro worker registrou o atendimento do tutor depois que este carregou o cache
+    oid = max(r['ID'] for r in carregado.repo.listar_ocorrencias() if r['FT'] == 'SIM' and r['FC'] == 'NÃO'
+              and r['FG'] == 'NÃO')
+    carregado.repo.atualizar_ocorrencia(oid, {'ATT': 'Responsável avisado.', 'FT': 'NÃO', 'DT': '2024-05-02T10:00:00'})
+    assert aplicacao.ocorrencia_do_cache(oid)['FT'] == 'SIM'
+
+    navegador.post(f'/editar/{oid}', data={'DESCRICAO': 'Descrição revisada.', 'ATP': '', 'ATT': 'Sobrescrito.'})
+    gravada = carregado.repo.buscar_ocorrencia(oid)
+    assert (gravada['ATT'], gravada['DT']) == ('Responsável avisado.', '2024-05-02T10:00:00')
+    assert gravada['DESCRICAO'] == 'Descrição revisada.' and gravada['STATUS'] == 'FINALIZADA'
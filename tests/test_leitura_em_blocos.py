@@ -0,0 +1,151 @@
+"""Leitura em blocos: tabelas maiores que o limite de linhas por resposta do PostgREST vêm inteiras."""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import app as aplicacao
+import repositorio
+from conftest import assert_mesmas_ocorrencias, ids
+
+LIMITE = 20  # db-max-rows do PostgREST falso
+
+
+class Consulta:
+    """Cadeia table().select()...execute() do SDK sobre listas em memória; cada filtro gera uma nova consulta."""
+
+    def __init__(self, servidor, tabela, passos=(), contar=False):
+        self.servidor, self.tabela, self.passos, self.contar = servidor, tabela, passos, contar
+
+    def _com(self, *passo, contar=None):
+        return Consulta(self.servidor, self.tabela, self.passos + (passo,), self.contar if contar is None else contar)
+
+    def select(self, colunas, count=None):
+        return self._com('select', colunas, contar=count == 'exact')
+
+    def order(self, coluna, desc=False):
+        return self._com('order', coluna, desc)
+
+    def limit(self, n):
+        return self._com('range', 0, n - 1)
+
+    def range(self, inicio, fim):
+        return self._com('range', inicio, fim)
+
+    def lt(self, coluna, valor):
+        return self._com('filtro', lambda r: r[coluna] < valor)
+
+    def lte(self, coluna, valor):
+        return self._com('filtro', lambda r: r[coluna] <= valor)
+
+    def gt(self, coluna, valor):
+        return self._com('filtro', lambda r: r[coluna] > valor)
+
+    def execute(self):
+        return self.servidor.responder(self)
+
+
+class PostgRESTFalso:
+    """Responde no máximo LIMITE linhas por consulta, como o db-max-rows do PostgREST, e registra as consultas."""
+
+    def __init__(self, tabelas):
+        self.tabelas = tabelas
+        self.respostas = []
+        self.antes_de_responder = None
+        self._trava = threading.Lock()
+
+    def table(self, nome):
+        return Consulta(self, nome)
+
+    def responder(self, consulta):
+        if self.antes_de_responder:
+            self.antes_de_responder(consulta)
+        linhas = list(self.tabelas[consulta.tabela])
+        ordem, faixa = [], (0, None)
+        for passo in consulta.passos:
+            if passo[0] == 'filtro':
+                linhas = [r for r in linhas if passo[1](r)]
+            elif passo[0] == 'order':
+                ordem.append(passo[1:])
+            elif passo[0] == 'range':
+                faixa = passo[1:]
+        for coluna, desc in reversed(ordem):
+            linhas.sort(key=lambda r: r[coluna], reverse=desc)
+        total = len(linhas)
+        inicio, fim = faixa
+        linhas = linhas[inicio:(fim + 1 if fim is not None else None)][:LIMITE]
+        with self._trava:
+            self.respostas.append(len(linhas))
+        return SimpleNamespace(data=[dict(r) for r in linhas], count=total if consulta.contar else None)
+
+
+@pytest.fixture
+def supabase(banco, monkeypatch):
+    """Repositório Supabase sobre as tabelas do teste, com IDs espaçados (há buracos na sequência)."""
+    monkeypatch.setattr(repositorio, 'SUPABASE_MAX_LINHAS', LIMITE)
+    monkeypatch.setattr(repositorio, 'marcar_cliente_usado', lambda: None)
+    ocorrencias = [dict(r, ID=r['ID'] * 3) for r in banco.memoria.listar_ocorrencias()]
+    servidor = PostgRESTFalso({
+        'ocorrencias': ocorrencias,
+        'Alunos': [{'Sala': a['Sala'], 'Aluno': a['Aluno'], 'Tutor': a['Tutor']} for a in banco.memoria.listar_alunos()],
+        'Professores': banco.memoria.listar_professores(),
+        'Salas': banco.memoria.listar_salas(),
+    })
+    assert len(ocorrencias) > 3 * LIMITE
+    return repositorio.RepositorioSupabase(servidor)
+
+
+def test_tabelas_inteiras_acima_do_limite(supabase):
+    servidor = supabase.cliente
+    ocorrencias = supabase.listar_ocorrencias()
+    assert ids(ocorrencias) == sorted(ids(servidor.tabelas['ocorrencias']), reverse=True)
+    assert max(servidor.respostas) <= LIMITE
+
+    alunos = supabase.listar_alunos()
+    assert len(alunos) == len(servidor.tabelas['Alunos']) > LIMITE
+    assert sorted(map(str, alunos)) == sorted(map(str, servidor.tabelas['Alunos']))
+
+
+def test_delta_grande_em_paginas(supabase):
+    servidor = supabase.cliente
+    marca = sorted(ids(servidor.tabelas['ocorrencias']))[-2 * LIMITE - 7]
+    delta = supabase.listar_ocorrencias_desde(marca)
+    assert ids(delta) == [i for i in sorted(ids(servidor.tabelas['ocorrencias']), reverse=True) if i > marca]
+
+
+def test_resposta_truncada_e_detectada(supabase, monkeypatch):
+    # O servidor corta abaixo do tamanho das faixas (IDs sem buracos): faltam linhas e o count denuncia
+    tabela = supabase.cliente.tabelas['ocorrencias']
+    tabela[:] = [dict(r, ID=r['ID'] // 3) for r in tabela]
+    monkeypatch.setattr(repositorio, 'SUPABASE_MAX_LINHAS', 2 * LIMITE)
+    with pytest.raises(repositorio.CargaIncompleta):
+        supabase.listar_ocorrencias()
+
+
+def test_linha_apagada_durante_a_carga(supabase):
+    servidor = supabase.cliente
+    tabela = servidor.tabelas['ocorrencias']
+
+    apagada = []
+
+    def apagar_uma(consulta):
+        with servidor._trava:  # depois do primeiro bloco, antes das faixas
+            if len(servidor.respostas) == 1 and not apagada:
+                apagada.append(min(tabela, key=lambda r: r['ID']))
+                tabela.remove(apagada[0])
+    servidor.antes_de_responder = apagar_uma
+
+    # O count do primeiro bloco ainda tinha a apagada; a recontagem até o maior ID lido não
+    assert ids(supabase.listar_ocorrencias()) == sorted(ids(tabela), reverse=True)
+
+
+def test_carga_do_cache_em_blocos(banco, monkeypatch):
+    monkeypatch.setattr(repositorio, 'BLOCO_SQLITE', 97)
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    df = aplicacao.carregar_dados()
+    completo = banco.recarga_completa()
+    assert_mesmas_ocorrencias(df, completo)
+    assert df['Nº Ocorrência'].tolist() == completo['Nº Ocorrência'].tolist()  # ID decrescente, como numa leitura só
+    for coluna in aplicacao.COLUNAS_CATEGORICAS:
+        assert isinstance(df[coluna].dtype, aplicacao.pd.CategoricalDtype), coluna
+    assert aplicacao._df_marca['id'] == max(ids(banco.memoria.listar_ocorrencias()))
@@ -0,0 +1,78 @@
+"""Métricas no formato do Prometheus: rotas, banco, cargas e caches medidos, somados entre os workers."""
+import json
+import re
+
+import pytest
+
+import metricas
+
+
+@pytest.fixture
+def zeradas(monkeypatch):
+    """Contadores e histogramas vazios, sem diretório compartilhado."""
+    monkeypatch.setattr(metricas, '_contadores', {})
+    monkeypatch.setattr(metricas, '_histogramas', {})
+    monkeypatch.setattr(metricas, 'DIRETORIO', None)
+
+
+def amostras(texto: str) -> dict[str, float]:
+    """'nome{rótulos}' -> valor das linhas de amostra da exposição."""
+    return {
+        chave: float(valor)
+        for chave, valor in (linha.rsplit(' ', 1) for linha in texto.splitlines() if not linha.startswith('#'))
+    }
+
+
+def test_histograma_acumula_as_faixas(zeradas):
+    for segundos in (0.002, 0.002, 0.3, 60.0):
+        metricas.observar('sgce_pdf_segundos', segundos, origem='aluno')
+    valores = amostras(metricas.exposicao())
+    assert valores['sgce_pdf_segundos_bucket{origem="aluno",le="0.001"}'] == 0
+    assert valores['sgce_pdf_segundos_bucket{origem="aluno",le="0.0025"}'] == 2
+    assert valores['sgce_pdf_segundos_bucket{origem="aluno",le="0.5"}'] == 3
+    assert valores['sgce_pdf_segundos_bucket{origem="aluno",le="30.0"}'] == 3
+    assert valores['sgce_pdf_segundos_bucket{origem="aluno",le="+Inf"}'] == 4
+    assert valores['sgce_pdf_segundos_count{origem="aluno"}'] == 4
+    assert valores['sgce_pdf_segundos_sum{origem="aluno"}'] == pytest.approx(60.304)
+
+
+def test_metrics_mede_rotas_banco_e_caches(banco, navegador, zeradas, monkeypatch):
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)  # listagem a partir do cache
+    navegador.get('/index')
+    navegador.get('/index')
+    resposta = navegador.get('/metrics')
+    assert resposta.mimetype == 'text/plain'
+    valores = amostras(resposta.get_data(as_text=True))
+
+    assert valores['sgce_requisicao_segundos_count{metodo="GET",rota="/index",status="200"}'] == 2
+    assert valores['sgce_cache_total{cache="ocorrencias",resultado="falta"}'] == 1
+    assert valores['sgce_cache_total{cache="ocorrencias",resultado="acerto"}'] >= 1
+    # A carga do cache leu a tabela inteira, com as fases medidas
+    assert valores['sgce_banco_linhas_total{motor="sqlite",operacao="select",tabela="ocorrencias"}'] >= len(
+        banco.memoria.listar_ocorrencias())
+    for fase in ('busca', 'montagem', 'datas', 'texto'):
+        assert valores[f'sgce_carga_segundos_count{{carga="ocorrencias",fase="{fase}"}}'] == 1
+
+
+def test_soma_os_workers(tmp_path, zeradas, monkeypatch):
+    monkeypatch.setattr(metricas, 'DIRETORIO', str(tmp_path))
+    outro = {
+        'contadores': [['sgce_cache_total', [['cache', 'salas'], ['resultado', 'acerto']], 5]],
+        'histogramas': [['sgce_pdf_segundos', [['origem', 'lote']], [1] + [0] * len(metricas.FAIXAS) + [0.0005]]],
+    }
+    (tmp_path / '1.json').write_text(json.dumps(outro))
+    metricas.cache('salas', True)
+    metricas.observar('sgce_pdf_segundos', 0.0005, origem='lote')
+    metricas.gravar(forcar=True)
+
+    valores = amostras(metricas.exposicao())
+    assert valores['sgce_cache_total{cache="salas",resultado="acerto"}'] == 6
+    assert valores['sgce_pdf_segundos_count{origem="lote"}'] == 2
+
+
+def test_server_timing(banco, navegador, zeradas, monkeypatch):
+    assert 'Server-Timing' not in navegador.get('/index').headers
+    monkeypatch.setattr(metricas, 'SERVER_TIMING', True)
+    resposta = navegador.get('/index', query_string={'tutor': 'ANA PAULA'})
+    etapas = dict(re.findall(r'([\w]+);dur=([\d.]+)', resposta.headers['Server-Timing']))
+    assert 'total' in etapas and 'banco' in etapas
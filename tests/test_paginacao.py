@@ -0,0 +1,79 @@
+"""Paginação por keyset do /index: as páginas, para a frente e para trás, cobrem a listagem sem buracos nem repetições."""
+import re
+
+import pytest
+
+import app as aplicacao
+from conftest import ids
+
+FILTROS = [{}, {'tutor': 'ANA PAULA'}, {'status': 'ATENDIMENTO'}, {'tutor': 'JOÃO SILVA', 'status': 'ASSINADA'}]
+POR_PAGINA = 17
+
+
+def ler_pagina(navegador, **parametros) -> tuple[list[int], int | None, int | None]:
+    """IDs exibidos e os cursores dos links 'Mais recentes' (antes) e 'Mais antigas' (apos)."""
+    resposta = navegador.get('/index', query_string=dict(parametros, por_pagina=POR_PAGINA))
+    assert resposta.status_code == 200
+    html = resposta.get_data(as_text=True)
+    antes = re.search(r'[?&;]antes=(\d+)', html)
+    apos = re.search(r'[?&;]apos=(\d+)', html)
+    return ([int(i) for i in re.findall(r'/editar/(\d+)\?papel=ver', html)],
+            int(antes.group(1)) if antes else None, int(apos.group(1)) if apos else None)
+
+
+@pytest.fixture(params=[True, False], ids=['sql', 'dataframe'])
+def no_banco(request, banco, monkeypatch):
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('filtros', FILTROS, ids=lambda f: '+'.join(f.values()) or 'sem_filtro')
+def test_paginas_cobrem_a_listagem(banco, navegador, no_banco, filtros):
+    esperado = ids(banco.memoria.consultar_ocorrencias(**filtros))
+    assert len(esperado) > POR_PAGINA
+
+    # Para a frente, pelo cursor 'apos'
+    paginas, cursor = [], None
+    while True:
+        pagina, antes, apos = ler_pagina(navegador, **filtros, **({'apos': cursor} if cursor else {}))
+        assert (antes is None) == (cursor is None)
+        assert antes in (None, pagina[0]) and apos in (None, pagina[-1])
+        paginas.append(pagina)
+        if apos is None:
+            break
+        cursor = apos
+    assert [i for p in paginas for i in p] == esperado
+    assert all(len(p) == POR_PAGINA for p in paginas[:-1])
+
+    # E de volta, pelo cursor 'antes' da última página
+    cursor = ler_pagina(navegador, **filtros, apos=paginas[-2][-1])[1]
+    for esperada in reversed(paginas[:-1]):
+        pagina, antes, apos = ler_pagina(navegador, **filtros, antes=cursor)
+        assert pagina == esperada
+        assert apos == pagina[-1]
+        cursor = antes
+    assert cursor is None  # a primeira página não tem 'Mais recentes'
+
+
+@pytest.mark.parametrize('filtros', FILTROS, ids=lambda f: '+'.join(f.values()) or 'sem_filtro')
+def test_pagina_anterior_sem_mais_antigas(banco, navegador, no_banco, filtros):
+    # Cursor abaixo do menor Nº do filtro (ex.: a linha do cursor foi excluída): a página
+    # traz as mais antigas e não há 'Mais antigas'
+    esperado = ids(banco.memoria.consultar_ocorrencias(**filtros))
+    pagina, antes, apos = ler_pagina(navegador, **filtros, antes=esperado[-1] - 1)
+    assert pagina == esperado[-POR_PAGINA:]
+    assert antes == pagina[0] and apos is None
+
+
+@pytest.mark.parametrize('filtros', FILTROS[1:], ids=lambda f: '+'.join(f.values()))
+def test_total_sob_demanda(banco, navegador, no_banco, filtros):
+    html = navegador.get('/index', query_string=dict(filtros, total='1')).get_data(as_text=True)
+    assert f'{len(banco.memoria.consultar_ocorrencias(**filtros))} ocorrência(s)' in html
+    assert 'ocorrência(s)' not in navegador.get('/index', query_string=filtros).get_data(as_text=True)
+
+
+def test_pagina_no_dataframe_para_no_limite(banco):
+    df = aplicacao.carregar_dados()
+    pagina = aplicacao.paginar_ocorrencias(df, status='FINALIZADA', apos=300, limite=5)
+    esperado = [i for i in ids(banco.memoria.consultar_ocorrencias(status='FINALIZADA')) if i < 300][:5]
+    assert pagina['Nº Ocorrência'].tolist() == esperado
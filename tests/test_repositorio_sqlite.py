@@ -0,0 +1,166 @@
+"""Motor SQLite: as consultas em SQL devem dar o mesmo que as implementações genéricas em Python."""
+import re
+import sqlite3
+
+import flask
+import pytest
+
+import app as aplicacao
+from conftest import TUTORES, ids
+from repositorio import RepositorioSQLite
+
+FILTROS = [
+    {'tutor': 'JOÃO SILVA'},
+    {'tutor': 'MÁRCIA LIMA', 'status': 'ATENDIMENTO'},
+    {'status': 'ASSINADA'},
+    {'status': 'FINALIZADA'},
+    {'sala': '7A'},
+    {'sala': '6B', 'aluno': 'DÉBORA ARAÚJO'},
+    {'aluno': 'ÍRIS BARROS'},
+    {'sala': ' 6b', 'aluno': 'débora barros '},
+    {'tutor': 'NINGUÉM'},
+]
+
+
+@pytest.mark.parametrize('filtros', FILTROS, ids=lambda f: '+'.join(f'{k}={v}' for k, v in f.items()))
+def test_consulta_filtrada_igual_a_generica(banco, filtros):
+    assert ids(banco.repo.consultar_ocorrencias(**filtros)) == ids(banco.memoria.consultar_ocorrencias(**filtros))
+
+
+def test_agregados_iguais_aos_genericos(banco):
+    assert banco.repo.listar_tutores() == banco.memoria.listar_tutores() == sorted(TUTORES)
+    assert banco.repo.contar_ocorrencias_por_aluno() == banco.memoria.contar_ocorrencias_por_aluno()
+    assert banco.repo.listar_alunos_por_sala() == banco.memoria.listar_alunos_por_sala()
+
+
+@pytest.mark.parametrize('coluna, filtros, indice', [
+    ('TUTOR', {'tutor': 'ANA PAULA'}, 'ix_ocorrencias_tutor_norm'),
+    ('STATUS', {'status': 'ATENDIMENTO'}, 'ix_ocorrencias_exibicao'),
+    ('SALA', {'sala': '8A', 'aluno': 'ANA DUARTE'}, 'ix_ocorrencias_sala_aluno_norm'),
+])
+def test_filtros_usam_indices(banco, monkeypatch, coluna, filtros, indice):
+    planos = []
+    executar = banco.repo._consultar
+
+    def consultar_com_plano(sql, params=()):
+        planos.extend(r['detail'] for r in executar(f'EXPLAIN QUERY PLAN {sql}', params))
+        return executar(sql, params)
+
+    monkeypatch.setattr(banco.repo, '_consultar', consultar_com_plano)
+    banco.repo.consultar_ocorrencias(**filtros)
+    assert any(indice in detalhe for detalhe in planos), coluna
+
+
+def test_escritas_retornam_a_linha_e_mantem_os_indices(banco):
+    nova = banco.repo.inserir_ocorrencia({
+        'PROFESSOR': 'CARLOS MENDES', 'SALA': '9A', 'ALUNO': 'ALUNO NOVO', 'TUTOR': ' joão silva',
+        'DESCRICAO': 'Teste.', 'FT': 'SIM', 'FC': 'NÃO', 'FG': 'NÃO', 'STATUS': 'ATENDIMENTO',
+    })
+    assert nova['ID'] > max(ids(banco.memoria.listar_ocorrencias()))
+    assert nova['ID'] in ids(banco.repo.consultar_ocorrencias(tutor='JOÃO SILVA', status='ATENDIMENTO'))
+
+    assinada = banco.repo.atualizar_ocorrencia(nova['ID'], {'STATUS': 'ASSINADA'})
+    assert assinada['STATUS'] == 'ASSINADA'
+    assert nova['ID'] in ids(banco.repo.consultar_ocorrencias(status='ASSINADA'))
+    assert nova['ID'] not in ids(banco.repo.consultar_ocorrencias(status='ATENDIMENTO'))
+
+
+def test_arquivo_gravavel_por_outro_cliente(banco):
+    # Sem as funções do app registradas (como no sqlite3 da linha de comando)
+    with sqlite3.connect(banco.repo.caminho) as outro:
+        outro.execute("INSERT INTO ocorrencias (SALA, ALUNO, TUTOR, FT, FC, FG, STATUS) "
+                      "VALUES ('9A', 'ALUNO EXTERNO', 'márcia lima ', 'NÃO', 'NÃO', 'NÃO', 'ATENDIMENTO')")
+        nova = outro.execute('SELECT MAX(ID) FROM ocorrencias').fetchone()[0]
+        pendente = banco.repo.consultar_ocorrencias(tutor='ANA PAULA', status='FINALIZADA')[0]['ID']
+        outro.execute("UPDATE ocorrencias SET FT = 'SIM' WHERE ID = ?", (pendente,))
+
+    # As colunas derivadas vazias são completadas antes da consulta filtrada
+    assert nova in ids(banco.repo.consultar_ocorrencias(tutor='MÁRCIA LIMA', status='FINALIZADA'))
+    assert pendente in ids(banco.repo.consultar_ocorrencias(tutor='ANA PAULA', status='ATENDIMENTO'))
+    assert banco.repo.contar_ocorrencias_por_aluno()['ALUNO EXTERNO'] == 1
+    assert 'TUTOR_NORM' not in banco.repo.buscar_ocorrencia(nova)
+
+
+def test_arquivo_com_os_indices_de_expressao_antigos(tmp_path):
+    caminho = str(tmp_path / 'antigo.db')
+    with sqlite3.connect(caminho) as antigo:
+        antigo.create_function('NORM', 1, lambda v: str(v).strip().upper(), deterministic=True)
+        antigo.executescript("""
+            CREATE TABLE ocorrencias (ID INTEGER PRIMARY KEY AUTOINCREMENT, PROFESSOR TEXT, SALA TEXT, ALUNO TEXT,
+                TUTOR TEXT, DESCRICAO TEXT, ATP TEXT, ATT TEXT, ATC TEXT, ATG TEXT, FT TEXT, FC TEXT, FG TEXT,
+                DCO TEXT, HCO TEXT, DT TEXT, DC TEXT, DG TEXT, STATUS TEXT, ATUALIZADO_EM TEXT);
+            CREATE INDEX ix_ocorrencias_tutor ON ocorrencias (NORM(TUTOR), ID);
+            INSERT INTO ocorrencias (TUTOR, ALUNO, FT, FC, FG, STATUS) VALUES ('joão silva', 'ÍRIS', 'SIM', 'NÃO', 'NÃO', 'ATENDIMENTO');
+        """)
+
+    repo = RepositorioSQLite(caminho)
+    assert ids(repo.consultar_ocorrencias(tutor='JOÃO SILVA', status='ATENDIMENTO')) == [1]
+    with sqlite3.connect(caminho) as outro:  # sem o índice sobre NORM(), outro cliente grava
+        outro.execute("UPDATE ocorrencias SET TUTOR = 'ANA PAULA' WHERE ID = 1")
+    assert repo.listar_tutores() == ['ANA PAULA']
+
+
+def test_relatorio_por_tutor_no_banco_igual_ao_do_dataframe(banco, monkeypatch):
+    no_banco = aplicacao.calcular_relatorio_tutor_ocorrencias()
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    assert no_banco == aplicacao.calcular_relatorio_tutor_ocorrencias()
+    assert sum(a['Quantidade Ocorrências'] for alunos in no_banco.values() for a in alunos) > 0
+
+
+def ids_na_pagina(resposta) -> list[int]:
+    assert resposta.status_code == 200
+    return [int(i) for i in re.findall(r'/editar/(\d+)\?papel=ver', resposta.get_data(as_text=True))]
+
+
+@pytest.mark.parametrize('filtros', [{'tutor': 'JOSÉ ROCHA', 'status': 'ASSINADA'}, {'status': 'ATENDIMENTO'}])
+def test_index_filtrado_no_banco_igual_ao_do_dataframe(banco, navegador, monkeypatch, filtros):
+    filtros = dict(filtros, por_pagina=aplicacao.POR_PAGINA_MAX)  # tudo numa página
+    no_banco = ids_na_pagina(navegador.get('/index', query_string=filtros))
+    assert no_banco
+    assert no_banco == ids(banco.memoria.consultar_ocorrencias(tutor=filtros.get('tutor'), status=filtros['status']))
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    assert ids_na_pagina(navegador.get('/index', query_string=filtros)) == no_banco
+
+
+def test_relatorio_aluno_no_banco_marca_as_assinadas(banco, navegador):
+    linha = next(r for r in banco.memoria.listar_ocorrencias() if r['STATUS'] == 'ASSINADA')
+    html = navegador.get('/relatorio_aluno', query_string={'sala': linha['SALA'], 'aluno': linha['ALUNO']}).get_data(
+        as_text=True)
+    desabilitados = re.findall(r'name="ocorrencias\[\]" value="(\d+)"\s+disabled', html)
+    esperado = [r['ID'] for r in banco.memoria.consultar_ocorrencias(sala=linha['SALA'], aluno=linha['ALUNO'])
+                if r['STATUS'] == 'ASSINADA']
+    assert [int(i) for i in desabilitados] == esperado
+    assert html.count('bg-success') == len(esperado)
+
+
+@pytest.fixture
+def contexto_do_template():
+    """Variáveis passadas ao render_template na requisição."""
+    contextos = []
+
+    def guardar(app, template, context, **extra):
+        contextos.append(context)
+    with flask.template_rendered.connected_to(guardar, aplicacao.app):
+        yield contextos
+
+
+@pytest.mark.parametrize('sala, aluno', [('6b', ' débora barros'), ('7A', ''), ('', '')])
+def test_relatorio_aluno_igual_nos_dois_caminhos(banco, navegador, monkeypatch, contexto_do_template, sala, aluno):
+    consultas = []
+    consultar = banco.repo.consultar_ocorrencias
+    with monkeypatch.context() as m:
+        m.setattr(banco.repo, 'consultar_ocorrencias', lambda **f: consultas.append(f) or consultar(**f))
+        m.setattr(banco.repo, 'listar_ocorrencias', lambda: pytest.fail('tabela inteira lida'))
+        navegador.get('/relatorio_aluno', query_string={'sala': sala, 'aluno': aluno})
+    no_banco = contexto_do_template.pop()
+    # Só as linhas do aluno escolhido; sem aluno, nenhuma
+    assert consultas == ([{'sala': sala.strip().upper(), 'aluno': aluno.strip().upper()}] if aluno else [])
+
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    navegador.get('/relatorio_aluno', query_string={'sala': sala, 'aluno': aluno})
+    no_cache = contexto_do_template.pop()
+
+    assert [r['ID'] for r in no_banco['registros']] == [r['ID'] for r in no_cache['registros']]
+    assert len(no_banco['registros']) > 0 if aluno else no_banco['registros'] == []
+    assert no_banco['salas'] == no_cache['salas'] and no_banco['alunos'] == no_cache['alunos']
+    assert bool(no_banco['alunos']) == bool(sala)
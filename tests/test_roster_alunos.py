@@ -0,0 +1,54 @@
+"""Cadastro de alunos para o formulário de nova ocorrência: mapa completo com ETag/gzip e busca por prefixo."""
+import gzip
+import json
+
+import app as aplicacao
+
+
+def mapa_esperado(alunos: list[dict]) -> dict:
+    mapa = {}
+    for aluno in alunos:
+        mapa.setdefault(aluno['Sala'], []).append({'Aluno': aluno['Aluno'], 'Tutor': aluno['Tutor']})
+    return mapa
+
+
+def test_mapa_completo_com_etag(banco, navegador):
+    resposta = navegador.get('/api/alunos')
+    assert resposta.status_code == 200 and resposta.headers['ETag']
+    assert resposta.get_json() == mapa_esperado(banco.tabelas['Alunos'])
+    assert resposta.cache_control.private and resposta.cache_control.max_age == aplicacao.ROSTER_MAX_AGE_SEG
+    assert 'Accept-Encoding' in resposta.vary
+
+    revalidada = navegador.get('/api/alunos', headers={'If-None-Match': resposta.headers['ETag']})
+    assert revalidada.status_code == 304 and not revalidada.get_data()
+
+    comprimida = navegador.get('/api/alunos', headers={'Accept-Encoding': 'gzip, br'})
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(comprimida.get_data())) == resposta.get_json()
+    assert len(comprimida.get_data()) < len(resposta.get_data())
+
+
+def test_cadastro_novo_troca_o_etag(banco, navegador):
+    etag = navegador.get('/api/alunos').headers['ETag']
+    with banco.repo._conexao() as conexao:
+        conexao.execute("INSERT INTO Alunos (Sala, Aluno, Tutor) VALUES ('7A', 'ZECA TAVARES', 'ANA PAULA')")
+    assert navegador.get('/api/alunos', headers={'If-None-Match': etag}).status_code == 304  # até a recarga
+
+    aplicacao.limpar_caches()
+    resposta = navegador.get('/api/alunos', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200 and resposta.headers['ETag'] != etag
+    assert {'Aluno': 'ZECA TAVARES', 'Tutor': 'ANA PAULA'} in resposta.get_json()['7A']
+
+
+def buscar(navegador, **parametros) -> list[dict]:
+    return navegador.get('/api/alunos/busca', query_string=parametros).get_json()
+
+
+def test_busca_por_prefixo_sem_acentos(banco, navegador):
+    esperado = sorted((a for a in banco.tabelas['Alunos'] if a['Aluno'].startswith('DÉBORA')), key=lambda a: a['Aluno'])
+    assert buscar(navegador, q='  debo') == esperado
+    assert buscar(navegador, q='Débora C') == [a for a in esperado if a['Aluno'] == 'DÉBORA CONCEIÇÃO']
+    assert buscar(navegador, q='iris', sala=esperado[0]['Sala'].lower()) == \
+        [a for a in banco.tabelas['Alunos'] if a['Aluno'].startswith('ÍRIS') and a['Sala'] == esperado[0]['Sala']]
+    assert len(buscar(navegador, q='a', limite=3)) == 3
+    assert buscar(navegador, q='') == buscar(navegador, q='xyz') == []
@@ -0,0 +1,42 @@
+"""Sincronização incremental do cache de ocorrências: o delta mesclado deve dar o mesmo que uma carga do zero."""
+import app as aplicacao
+from conftest import assert_mesmas_ocorrencias
+
+
+def test_delta_igual_a_recarga_completa(banco, escritas, monkeypatch):
+    aplicacao.carregar_dados()
+    recarregado_em = aplicacao._df_recarregado_em
+    escritas.aplicar()
+    consultas = []
+    monkeypatch.setattr(banco.repo, 'listar_ocorrencias', lambda: consultas.append('tabela inteira'))
+
+    df = aplicacao.carregar_dados()
+
+    assert aplicacao._df_recarregado_em == recarregado_em  # não houve carga completa
+    assert not consultas and not aplicacao._ids_pendentes and not aplicacao._df_pendente
+    assert df['Nº Ocorrência'].is_monotonic_decreasing
+    monkeypatch.undo()
+    assert_mesmas_ocorrencias(df, banco.recarga_completa())
+
+
+def test_recarga_completa_agendada(banco, monkeypatch):
+    aplicacao.carregar_dados()
+    banco.inserir()
+    monkeypatch.setattr(aplicacao, 'RECARGA_COMPLETA_SEG', 0)
+
+    df = aplicacao.carregar_dados()
+
+    assert_mesmas_ocorrencias(df, banco.recarga_completa())
+    assert aplicacao._df_marca['id'] == df['Nº Ocorrência'].max()
+
+
+def test_falha_na_sincronizacao_mantem_o_cache(banco, monkeypatch):
+    df = aplicacao.carregar_dados()
+    aplicacao.registrar_escrita_ocorrencias([1])
+
+    def falhar(*args):
+        raise ConnectionError('banco fora do ar')
+
+    monkeypatch.setattr(banco.repo, 'listar_ocorrencias_desde', falhar)
+    assert aplicacao.carregar_dados() is df
+    assert aplicacao._ids_pendentes == {1}  # tenta de novo na próxima leitura
@@ -0,0 +1,127 @@
+"""Snapshot em disco (partida a quente) e modo somente leitura com o banco fora do ar."""
+import os
+import threading
+
+import pytest
+
+import app as aplicacao
+import snapshot_local
+from conftest import assert_mesmas_ocorrencias, estado_inicial
+
+
+def esperar_threads(nome: str):
+    for thread in threading.enumerate():
+        if thread.name == nome:
+            thread.join(timeout=10)
+
+
+@pytest.fixture
+def snapshot(banco, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_local, 'HABILITADO', True)
+    monkeypatch.setattr(snapshot_local, 'DIRETORIO', str(tmp_path / 'snapshot'))
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+
+
+def worker_novo(monkeypatch):
+    """Caches vazios, como um processo que acabou de subir."""
+    for nome, valor in estado_inicial().items():
+        monkeypatch.setattr(aplicacao, nome, valor)
+
+
+def test_partida_a_quente(banco, snapshot, monkeypatch):
+    aplicacao.carregar_tabelas()
+    esperar_threads('snapshot-local')
+    gravado = aplicacao._df_cache
+    professores = aplicacao._professores_cache
+
+    worker_novo(monkeypatch)
+    leituras, revalidacoes = [], []
+    with monkeypatch.context() as m:
+        original = banco.repo.listar_ocorrencias_em_blocos
+        m.setattr(banco.repo, 'listar_ocorrencias_em_blocos', lambda: leituras.append(1) or original())
+        m.setattr(aplicacao, '_revalidar_em_segundo_plano', lambda: revalidacoes.append(1))
+        df = aplicacao.carregar_dados()
+    assert not leituras and revalidacoes == [1]  # do disco, sem esperar o banco
+    assert_mesmas_ocorrencias(df, gravado)
+    assert list(df.dtypes) == list(gravado.dtypes)
+    assert aplicacao._df_restaurado and aplicacao._df_marca['id'] == df['Nº Ocorrência'].max()
+    assert aplicacao._professores_cache == professores and 'professores' in aplicacao._tabelas_vencidas
+
+    # A revalidação relê do banco e encerra a restauração
+    editada = banco.editar()[0]
+    aplicacao.carregar_tabelas()
+    assert not aplicacao._df_restaurado and not aplicacao._tabelas_vencidas
+    assert_mesmas_ocorrencias(aplicacao._df_cache, banco.recarga_completa())
+    assert editada['ID'] in aplicacao._df_cache['Nº Ocorrência'].tolist()
+
+
+def test_snapshot_de_outra_origem_ignorado(banco, snapshot, monkeypatch):
+    aplicacao.carregar_dados()
+    esperar_threads('snapshot-local')
+    assert snapshot_local.carregar(aplicacao.ORIGEM_DADOS) is not None
+    assert snapshot_local.carregar('supabase:https://outro.supabase.co') is None
+
+    worker_novo(monkeypatch)
+    monkeypatch.setattr(aplicacao, 'ORIGEM_DADOS', 'sqlite:/outro/banco.db')
+    aplicacao.carregar_dados()
+    assert not aplicacao._df_restaurado
+
+
+def test_diretorio_de_outro_usuario_ignorado(banco, snapshot, monkeypatch):
+    aplicacao.carregar_dados()
+    esperar_threads('snapshot-local')
+    assert os.stat(snapshot_local.DIRETORIO).st_mode & 0o777 == 0o700
+
+    dono = os.getuid()
+    monkeypatch.setattr(snapshot_local.os, 'getuid', lambda: dono + 1)
+    assert snapshot_local.carregar(aplicacao.ORIGEM_DADOS) is None
+    with pytest.raises(PermissionError):
+        snapshot_local.gravar(aplicacao._df_cache, {}, {'origem': aplicacao.ORIGEM_DADOS})
+
+
+class BancoForaDoAr:
+    """Toda leitura de ocorrências e todo INSERT falham até voltar(); tentativas conta as idas ao banco."""
+
+    def __init__(self, repo):
+        self.tentativas = 0
+        self._patch = pytest.MonkeyPatch()
+        for metodo in ('listar_ocorrencias_desde', 'listar_ocorrencias_em_blocos', 'inserir_ocorrencia'):
+            self._patch.setattr(repo, metodo, self._falhar)
+
+    def _falhar(self, *args, **kwargs):
+        self.tentativas += 1
+        raise ConnectionError('banco indisponível')
+
+    def voltar(self):
+        self._patch.undo()
+
+
+@pytest.fixture
+def fora_do_ar(banco, monkeypatch):
+    """Cache carregado e intervalo de sincronização vencido; depois o banco cai."""
+    monkeypatch.setattr(banco.repo, 'filtros_no_banco', False)
+    aplicacao.carregar_dados()
+    monkeypatch.setattr(aplicacao, 'DELTA_INTERVALO_SEG', 0)
+    banco_fora = BancoForaDoAr(banco.repo)
+    yield banco_fora
+    banco_fora.voltar()
+
+
+def test_somente_leitura_com_o_banco_fora_do_ar(banco, navegador, fora_do_ar, monkeypatch):
+    df = aplicacao._df_cache
+    assert aplicacao.carregar_dados() is df
+    assert aplicacao.modo_somente_leitura()
+    assert fora_do_ar.tentativas == 1
+
+    # Até ESPERA_APOS_FALHA_SEG as requisições não voltam ao banco
+    html = navegador.get('/index').get_data(as_text=True)
+    assert 'somente leitura' in html
+    resposta = navegador.post('/nova', data={'professor': 'P', 'sala': '9Z', 'aluno': 'A', 'tutor': 'T', 'descricao': 'x'})
+    assert resposta.status_code == 302
+    assert fora_do_ar.tentativas == 1  # nem a sincronização nem o INSERT
+
+    # Passada a espera, o banco de volta encerra o modo
+    fora_do_ar.voltar()
+    monkeypatch.setattr(aplicacao, '_falha_remota_em', aplicacao._falha_remota_em - aplicacao.ESPERA_APOS_FALHA_SEG)
+    aplicacao.carregar_dados()
+    assert not aplicacao.modo_somente_leitura()
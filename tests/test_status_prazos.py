@@ -0,0 +1,65 @@
+"""Status de exibição e prazos por setor calculados em lote sobre o DataFrame de ocorrências."""
+import pytest
+
+import app as aplicacao
+
+
+def status_linha_a_linha(row) -> tuple[str, str]:
+    """A regra de exibição aplicada a uma linha (a referência do cálculo vetorizado)."""
+    if row['Status'] == 'ASSINADA':
+        return 'ASSINADA', 'success'
+    if any(row[flag].upper() == 'SIM' for flag in ('FT', 'FC', 'FG')):  # SIM = setor ainda sem atendimento
+        return 'ATENDIMENTO', 'danger'
+    return 'FINALIZADA', 'warning'
+
+
+def test_status_de_exibicao_igual_ao_linha_a_linha(banco):
+    df = aplicacao.carregar_dados()
+    status = aplicacao.calcular_status_exibicao(df)
+    assert list(zip(status['DisplayStatus'], status['DisplayColor'])) == [
+        status_linha_a_linha(row) for _, row in df.iterrows()
+    ]
+    assert set(status['DisplayStatus']) == {'ASSINADA', 'ATENDIMENTO', 'FINALIZADA'}
+
+
+def ocorrencia(oid, atp='', **setores) -> dict:
+    """Linha registrada em 10/03/2024 às 22h de SP (já 11/03 em UTC); setores: flag -> dias até o atendimento."""
+    linha = {'ID': oid, 'DCO': '2024-03-11T01:00:00+00:00', 'HCO': '2024-03-11T01:00:00+00:00', 'ATP': atp,
+             'STATUS': 'ATENDIMENTO', 'FT': 'NÃO', 'FC': 'NÃO', 'FG': 'NÃO', 'DT': None, 'DC': None, 'DG': None}
+    for flag, dias in setores.items():
+        linha[flag] = 'SIM'
+        if dias is not None:
+            linha['D' + flag[1]] = f'2024-03-{10 + dias:02d}T15:00:00-03:00'
+    return linha
+
+
+@pytest.mark.parametrize('linha, esperado', [
+    (ocorrencia(1), {'PROFESSOR': 'Não Atendido', 'TUTOR': '', 'COORDENAÇÃO': '', 'GESTÃO': ''}),
+    (ocorrencia(2, atp='Conversa com o aluno.', FT=7, FC=8, FG=None),
+     {'PROFESSOR': 'No Prazo', 'TUTOR': 'No Prazo', 'COORDENAÇÃO': 'Fora do Prazo', 'GESTÃO': 'Não Atendido'}),
+    (ocorrencia(3, FT=0, FG=20),
+     {'PROFESSOR': 'Não Atendido', 'TUTOR': 'No Prazo', 'COORDENAÇÃO': '', 'GESTÃO': 'Fora do Prazo'}),
+])
+def test_prazos_contam_dias_no_fuso_de_sao_paulo(linha, esperado):
+    df = aplicacao.montar_dataframe_ocorrencias([linha])
+    prazos = aplicacao.calcular_status_prazo(df).iloc[0]
+    assert {setor: prazos[f'Prazo {setor}'] for setor in aplicacao.SETORES_ATENDIMENTO} == esperado
+
+
+def test_status_do_cache_calculado_uma_vez_por_versao(banco, monkeypatch):
+    status = aplicacao.obter_status_ocorrencias()
+    assert aplicacao.obter_status_ocorrencias() is status
+
+    banco.editar()
+    monkeypatch.setattr(aplicacao, 'DELTA_INTERVALO_SEG', 0)
+    novo = aplicacao.obter_status_ocorrencias()
+    assert novo is not status
+    esperado = aplicacao.calcular_status_ocorrencias(aplicacao.carregar_dados())
+    assert novo.sort_index().equals(esperado.sort_index())
+
+
+def test_status_atualizado_igual_ao_reconstruido(banco, escritas):
+    aplicacao.obter_status_ocorrencias()  # calcula o status da versão atual
+    escritas.aplicar()
+    aplicacao.carregar_dados()
+    escritas.conferir_derivado('status', aplicacao.calcular_status_ocorrencias, lambda status: status.to_dict('index'))
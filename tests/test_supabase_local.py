@@ -0,0 +1,80 @@
+"""Ferramentas dos benchmarks: os dados sintéticos e o Supabase em processo devem se comportar como o banco real."""
+import os
+import sys
+
+import pytest
+
+import repositorio
+from conftest import RAIZ, ids
+
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+import dados_sinteticos  # noqa: E402
+from supabase_local import ClienteSupabaseLocal  # noqa: E402
+
+OCORRENCIAS = 2000
+
+
+@pytest.fixture(scope='module')
+def tabelas():
+    return dados_sinteticos.gerar(OCORRENCIAS, semente=7)
+
+
+@pytest.fixture
+def motores(tabelas, tmp_path, monkeypatch):
+    """(Supabase em processo, SQLite) sobre as mesmas tabelas sintéticas."""
+    monkeypatch.setattr(repositorio, 'marcar_cliente_usado', lambda: None)
+    cliente = ClienteSupabaseLocal({nome: [dict(r) for r in linhas] for nome, linhas in tabelas.items()},
+                                   max_linhas=OCORRENCIAS)
+    caminho = str(tmp_path / 'sintetico.db')
+    dados_sinteticos.gravar_sqlite(tabelas, caminho)
+    supabase = repositorio.RepositorioSupabase(cliente)
+    supabase.coluna_atualizacao = 'ATUALIZADO_EM'  # IDR_COLUNA_ATUALIZACAO, como no bench_rotas
+    return supabase, repositorio.RepositorioSQLite(caminho)
+
+
+def test_dados_reprodutiveis_e_realistas(tabelas):
+    assert dados_sinteticos.gerar(OCORRENCIAS, semente=7) == tabelas
+    assert dados_sinteticos.gerar(OCORRENCIAS, semente=8) != tabelas
+    linhas = tabelas['ocorrencias']
+    assert ids(linhas) == list(range(1, OCORRENCIAS + 1))
+    assert {r['STATUS'] for r in linhas} == {'ATENDIMENTO', 'FINALIZADA', 'ASSINADA'}
+    # Grafias diferentes do mesmo tutor, que o app normaliza
+    tutores = {r['TUTOR'] for r in linhas}
+    assert len({repositorio.normalizar_texto(t) for t in tutores}) < len(tutores)
+    # Poucos alunos concentram muitas ocorrências
+    por_aluno = sorted((sum(r['ALUNO'] == a for r in linhas) for a in {r['ALUNO'] for r in linhas}), reverse=True)
+    assert sum(por_aluno[:len(por_aluno) // 10]) > OCORRENCIAS / 4
+
+
+def test_mesmas_respostas_que_o_sqlite(motores, tabelas):
+    supabase, sqlite = motores
+    assert ids(supabase.listar_ocorrencias()) == ids(sqlite.listar_ocorrencias())
+    assert supabase.listar_tutores() == sqlite.listar_tutores()
+    linha = tabelas['ocorrencias'][100]
+    for filtros in ({'tutor': repositorio.normalizar_texto(linha['TUTOR'])}, {'status': 'ATENDIMENTO'},
+                    {'sala': linha['SALA'], 'aluno': linha['ALUNO']}, {'status': 'ASSINADA', 'apos': 1500, 'limite': 20},
+                    {'sala': linha['SALA'].lower(), 'aluno': f" {linha['ALUNO'].lower()}", 'limite': 3}):
+        assert ids(supabase.consultar_ocorrencias(**filtros)), filtros
+        assert ids(supabase.consultar_ocorrencias(**filtros)) == ids(sqlite.consultar_ocorrencias(**filtros)), filtros
+
+    # Delta pelo or_() do PostgREST: ID acima da marca ou modificada desde o instante
+    marca = sorted(r['ATUALIZADO_EM'] for r in tabelas['ocorrencias'])[-30]
+    esperado = [r['ID'] for r in reversed(tabelas['ocorrencias']) if r['ID'] > 1990 or r['ATUALIZADO_EM'] >= marca]
+    assert ids(supabase.listar_ocorrencias_desde(1990, marca)) == esperado
+
+
+def test_limite_de_linhas_e_escritas(motores, monkeypatch):
+    supabase, _ = motores
+    supabase.cliente.max_linhas = 300
+    monkeypatch.setattr(repositorio, 'SUPABASE_MAX_LINHAS', 300)
+    assert len(supabase.cliente.table('ocorrencias').select('*').execute().data) == 300
+    assert len(supabase.listar_ocorrencias()) == OCORRENCIAS  # o repositório lê em blocos
+
+    nova = supabase.inserir_ocorrencia({'PROFESSOR': 'P', 'SALA': '9Z', 'ALUNO': 'A', 'TUTOR': 'T', 'STATUS': 'ATENDIMENTO'})
+    assert nova['ID'] == OCORRENCIAS + 1 and nova['ATUALIZADO_EM']
+    atualizadas = supabase.atualizar_ocorrencias([1, 2, nova['ID']], {'STATUS': 'ASSINADA'})
+    assert sorted(ids(atualizadas)) == [1, 2, nova['ID']]
+    assert ids(supabase.listar_ocorrencias_desde(OCORRENCIAS, atualizadas[0]['ATUALIZADO_EM']))[-2:] == [2, 1]
+    # Como no Postgres: todas as colunas da tabela, na ordem dela, as omitidas nulas
+    assert list(nova) == list(supabase.cliente.table('ocorrencias').select('*').limit(1).execute().data[0])
+    assert nova['DESCRICAO'] is None